@@ -0,0 +1,50 @@
+"""add_pair_last_met
+
+Revision ID: 4c2f8a1d7e3b
+Revises: 9e731ff771f0
+Create Date: 2026-10-16 10:12:41.318205
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4c2f8a1d7e3b"
+down_revision: Union[str, Sequence[str], None] = "9e731ff771f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "pair_last_met",
+        sa.Column("user_low", sa.BigInteger(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("user_high", sa.BigInteger(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("last_met_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("meet_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("user_low", "user_high"),
+        sa.CheckConstraint("user_low < user_high", name="ck_pair_last_met_order"),
+    )
+    op.create_index("ix_pair_last_met_user_high", "pair_last_met", ["user_high"])
+
+    op.execute(
+        """
+        INSERT INTO pair_last_met (user_low, user_high, last_met_at, meet_count)
+        SELECT least(m.user_1_id, m.user_2_id), greatest(m.user_1_id, m.user_2_id), max(r.started_at), count(*)
+        FROM meetings m
+        JOIN rounds r ON r.id = m.round_id
+        WHERE m.user_1_id <> m.user_2_id
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_pair_last_met_user_high", table_name="pair_last_met")
+    op.drop_table("pair_last_met")
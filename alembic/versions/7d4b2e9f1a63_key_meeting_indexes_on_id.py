@@ -0,0 +1,43 @@
+"""key_meeting_indexes_on_id
+
+Revision ID: 7d4b2e9f1a63
+Revises: e5a93c41f6d2
+Create Date: 2026-10-16 23:41:08.215736
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7d4b2e9f1a63"
+down_revision: Union[str, Sequence[str], None] = "e5a93c41f6d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The history keyset is (round_id, id), so both have to be key columns for an index-only, pre-sorted scan
+    op.drop_index("ix_meetings_user_1_round", table_name="meetings")
+    op.drop_index("ix_meetings_user_2_round", table_name="meetings")
+    op.create_index(
+        "ix_meetings_user_1_round", "meetings", ["user_1_id", "round_id", "id"], postgresql_include=["user_2_id"]
+    )
+    op.create_index(
+        "ix_meetings_user_2_round", "meetings", ["user_2_id", "round_id", "id"], postgresql_include=["user_1_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_meetings_user_2_round", table_name="meetings")
+    op.drop_index("ix_meetings_user_1_round", table_name="meetings")
+    op.create_index(
+        "ix_meetings_user_1_round", "meetings", ["user_1_id", "round_id"], postgresql_include=["user_2_id"]
+    )
+    op.create_index(
+        "ix_meetings_user_2_round", "meetings", ["user_2_id", "round_id"], postgresql_include=["user_1_id"]
+    )
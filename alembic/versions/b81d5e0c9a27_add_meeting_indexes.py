@@ -0,0 +1,38 @@
+"""add_meeting_indexes
+
+Revision ID: b81d5e0c9a27
+Revises: 4c2f8a1d7e3b
+Create Date: 2026-10-16 11:04:19.502114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b81d5e0c9a27"
+down_revision: Union[str, Sequence[str], None] = "4c2f8a1d7e3b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_meetings_round_id", "meetings", ["round_id"])
+    op.create_index(
+        "ix_meetings_user_1_round", "meetings", ["user_1_id", "round_id"], postgresql_include=["user_2_id"]
+    )
+    op.create_index(
+        "ix_meetings_user_2_round", "meetings", ["user_2_id", "round_id"], postgresql_include=["user_1_id"]
+    )
+    op.create_index("ix_rounds_id_started_at", "rounds", ["id"], postgresql_include=["started_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_rounds_id_started_at", table_name="rounds")
+    op.drop_index("ix_meetings_user_2_round", table_name="meetings")
+    op.drop_index("ix_meetings_user_1_round", table_name="meetings")
+    op.drop_index("ix_meetings_round_id", table_name="meetings")
@@ -0,0 +1,31 @@
+"""add_round_ref
+
+Revision ID: e5a93c41f6d2
+Revises: b81d5e0c9a27
+Create Date: 2026-10-16 12:37:08.114870
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a93c41f6d2"
+down_revision: Union[str, Sequence[str], None] = "b81d5e0c9a27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("rounds", sa.Column("ref", sa.String(length=32), nullable=True))
+    op.create_unique_constraint("rounds_ref_key", "rounds", ["ref"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("rounds_ref_key", "rounds", type_="unique")
+    op.drop_column("rounds", "ref")
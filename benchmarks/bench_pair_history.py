@@ -0,0 +1,71 @@
+"""
+Allocation benchmark: legacy dict-of-datetimes history vs PairHistory for 100k rows.
+
+Usage: python -m benchmarks.bench_pair_history [--rows 100000]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from services.matchmaker import MatchmakerService
+from services.pair_history import PairHistory
+
+
+def legacy_rows(count: int, seed: int):
+    """Rows as the old query returned them: (user_1_id, user_2_id, started_at datetime)."""
+    rng = random.Random(seed)
+    base = 1_700_000_000
+    return [
+        (rng.randint(1, 2000), rng.randint(2001, 4000), datetime.fromtimestamp(base + i, tz=timezone.utc))
+        for i in range(count)
+    ]
+
+
+def build_legacy(rows):
+    history_map = {}
+    for u1, u2, last_met in rows:
+        pair_key = tuple(sorted((u1, u2)))
+        if last_met.tzinfo is None:
+            last_met = last_met.replace(tzinfo=timezone.utc)
+        if pair_key not in history_map:
+            history_map[pair_key] = last_met
+    return history_map
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<36} {elapsed_ms:>10.1f} {current / 1024 / 1024:>12.2f} {peak / 1024 / 1024:>11.2f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = legacy_rows(args.rows, args.seed)
+    # The new query returns (least, greatest, epoch) integers straight from Postgres
+    int_rows = [(min(u1, u2), max(u1, u2), int(dt.timestamp())) for u1, u2, dt in rows]
+    user_ids = list(range(1, 4001))
+
+    print(f"Rows: {args.rows}")
+    print(f"{'Step':<36} {'Time [ms]':>10} {'Retained MiB':>12} {'Peak [MiB]':>11}")
+
+    history_map = measure("legacy: build dict", lambda: build_legacy(rows))
+    history = measure("PairHistory: from_rows", lambda: PairHistory.from_rows(int_rows))
+
+    measure("legacy: matchmaker input", lambda: MatchmakerService.compact_history(user_ids, history_map))
+    measure("PairHistory: matchmaker input", lambda: MatchmakerService.compact_history(user_ids, history))
+
+
+if __name__ == "__main__":
+    main()
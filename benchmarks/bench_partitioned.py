@@ -0,0 +1,97 @@
+"""
+Partitioned vs exact matchmaking on stage-event sized lobbies.
+Reports the solve time and the quality against the exact solver where it is still feasible,
+plus the repeats a random split into clusters of the same size would cause.
+
+Usage: python -m benchmarks.bench_partitioned [--users 400,800,1600,3200] [--exact-max 1600] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from services.matching import MatchingEngine, partitioned_matching
+from services.matchmaker import MatchmakerService, weights_from_compact
+
+
+def event_history(user_ids, group_size: int, group_ratio: float, cross_ratio: float, rng: random.Random):
+    """Regulars come in groups that mostly met each other already, plus a few meetings across groups."""
+    now = datetime.now(timezone.utc)
+    history = {}
+    for i, u in enumerate(user_ids):
+        for v in user_ids[i + 1 :]:
+            same_group = (u - 1) // group_size == (v - 1) // group_size
+            if rng.random() < (group_ratio if same_group else cross_ratio):
+                history[(u, v)] = now - timedelta(seconds=rng.randint(60, 10**7))
+    return history
+
+
+def repeats(pairs, history) -> int:
+    return sum(1 for u, v in pairs if (min(u, v), max(u, v)) in history)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="400,800,1600,3200", help="Comma-separated lobby sizes")
+    parser.add_argument("--exact-max", type=int, default=1600, help="Largest lobby also solved exactly")
+    parser.add_argument("--partition-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--group-size", type=int, default=1000)
+    parser.add_argument("--group-ratio", type=float, default=0.9, help="Fraction of pairs within a group that met")
+    parser.add_argument("--cross-ratio", type=float, default=0.01, help="Fraction of other pairs that met")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    partitioned = MatchmakerService(
+        engine=MatchingEngine.PARTITIONED,
+        partition_size=args.partition_size,
+        gap_check_limit=0,
+        executor="process",
+        workers=args.workers,
+        inline_max_users=0,
+    )
+    exact = MatchmakerService(engine=MatchingEngine.EXACT, gap_check_limit=0)
+
+    print(f"Partition size: {args.partition_size}, workers: {args.workers}, groups of {args.group_size}")
+    print(
+        f"{'Users':>6} {'Exact [ms]':>11} {'Serial [ms]':>12} {'Parallel [ms]':>14} {'Weight':>8} "
+        f"{'Repeats':>8} {'Exact rep.':>11} {'Random split rep.':>18}"
+    )
+
+    try:
+        for n in [int(x) for x in args.users.split(",")]:
+            rng = random.Random(args.seed)
+            users = list(range(1, n + 1))
+            history = event_history(users, args.group_size, args.group_ratio, args.cross_ratio, rng)
+
+            serial = partitioned.match(users, history)
+            parallel = asyncio.run(partitioned.match_async(users, history))
+
+            exact_ms, ratio, exact_repeats = "-", "-", "-"
+            if n <= args.exact_max:
+                optimum = exact.match(users, history)
+                exact_ms = f"{optimum.elapsed_ms:.0f}"
+                ratio = f"{parallel.total_weight / optimum.total_weight:.4f}"
+                exact_repeats = str(repeats(optimum.pairs, history))
+
+            # Same cluster sizes, but without looking at who met whom
+            pair_idx, ages = MatchmakerService.compact_history(users, history)
+            weights = weights_from_compact(n, pair_idx, ages)
+            k = -(-n // args.partition_size)
+            order = np.random.default_rng(args.seed).permutation(n).tolist()
+            random_pairs = partitioned_matching(weights, [order[c::k] for c in range(k)])
+            random_repeats = repeats([(users[i], users[j]) for i, j in random_pairs], history)
+
+            print(
+                f"{n:>6} {exact_ms:>11} {serial.elapsed_ms:>12.0f} {parallel.elapsed_ms:>14.0f} {ratio:>8} "
+                f"{repeats(parallel.pairs, history):>8} {exact_repeats:>11} {random_repeats:>18}"
+            )
+    finally:
+        partitioned.shutdown()
+
+
+if __name__ == "__main__":
+    main()
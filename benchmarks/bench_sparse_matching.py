@@ -0,0 +1,86 @@
+"""
+Dense vs sparse matchmaking: build time, peak memory and solve time.
+
+Usage: python -m benchmarks.bench_sparse_matching [--users 400] [--history-ratio 0.05]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+from services.matching import exact_matching, sparse_matching
+from services.matchmaker import weights_from_compact
+
+
+def random_history(n: int, ratio: float, seed: int):
+    rng = random.Random(seed)
+    total_pairs = n * (n - 1) // 2
+    chosen = set()
+    while len(chosen) < int(total_pairs * ratio):
+        i, j = rng.sample(range(n), 2)
+        chosen.add((min(i, j), max(i, j)))
+
+    pair_idx = np.array(sorted(chosen), dtype=np.int32).reshape(-1, 2)
+    ages = np.array([rng.randint(60, 10**7) for _ in chosen], dtype=np.int64)
+    return pair_idx, ages
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed_ms, peak / 1024 / 1024
+
+
+def dense_graph(n, pair_idx, ages):
+    weights = weights_from_compact(n, pair_idx, ages)
+    graph = nx.Graph()
+    rows, cols = np.triu_indices(n, k=1)
+    graph.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights[rows, cols].tolist()))
+    return graph
+
+
+def sparse_graph(n, pair_idx, ages):
+    met = [{} for _ in range(n)]
+    for (i, j), age in zip(pair_idx.tolist(), ages.tolist()):
+        met[i][j] = age
+        met[j][i] = age
+    return met
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--history-ratio", type=float, default=0.05, help="Fraction of all pairs that have met")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-exact", action="store_true", help="Skip the (slow) exact dense solve")
+    args = parser.parse_args()
+
+    n = args.users
+    pair_idx, ages = random_history(n, args.history_ratio, args.seed)
+    print(f"Users: {n}, pairs: {n * (n - 1) // 2}, historical pairs: {len(ages)}")
+    print(f"{'Step':<32} {'Time [ms]':>10} {'Peak [MiB]':>11}")
+
+    rows = [
+        ("dense: weight matrix", lambda: weights_from_compact(n, pair_idx, ages)),
+        ("dense: networkx graph", lambda: dense_graph(n, pair_idx, ages)),
+        ("sparse: adjacency", lambda: sparse_graph(n, pair_idx, ages)),
+        ("sparse: build + solve", lambda: sparse_matching(n, pair_idx, ages)),
+    ]
+    if not args.skip_exact:
+        rows.append(("dense: build + exact solve", lambda: exact_matching(weights_from_compact(n, pair_idx, ages))))
+
+    for label, fn in rows:
+        _, elapsed_ms, peak = measure(fn)
+        print(f"{label:<32} {elapsed_ms:>10.1f} {peak:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Provisioning benchmark against an in-memory guild with a fixed REST latency:
+channels granted per pair with set_permissions after creation (legacy) vs overwrites passed at creation.
+
+Usage: python -m benchmarks.bench_voice_provisioning [--pairs 10 30 60] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from services.move_scheduler import MoveScheduler
+from services.rate_limit import AdaptiveLimiter
+from services.voice_service import VoiceService
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel
+
+
+def make_lobby(guild: FakeGuild, pair_count: int):
+    lobby = FakeVoiceChannel(guild, "Lobby", None)
+    guild.channels[lobby.id] = lobby
+    members = [FakeMember(guild, channel=lobby) for _ in range(2 * pair_count)]
+    pairs = [(members[i].id, members[i + 1].id) for i in range(0, len(members), 2)]
+    return pairs, {m.id: m for m in members}
+
+
+async def legacy_round(service: VoiceService, pairs, user_map):
+    """The old flow: bare channels, then two sequential set_permissions calls per pair before the moves."""
+    channels = [service.pool[n] for n in range(1, len(pairs) + 1) if n in service.pool]
+    missing = range(len(channels) + 1, len(pairs) + 1)
+    created = await asyncio.gather(
+        *(
+            service.limiter.run(
+                lambda n=n: service.guild.create_voice_channel(f"Session {n}", category=service.category)
+            )
+            for n in missing
+        )
+    )
+    for number, channel in zip(missing, created):
+        service.pool[number] = channel
+    service.temp_channels = channels + list(created)
+
+    for channel, (uid1, uid2) in zip(service.temp_channels, pairs):
+        await channel.set_permissions(user_map[uid1], connect=True, speak=True, view_channel=True)
+        await channel.set_permissions(user_map[uid2], connect=True, speak=True, view_channel=True)
+
+    await service.move_pairs_to_channels(pairs, user_map, service.temp_channels)
+
+
+async def current_round(service: VoiceService, pairs, user_map):
+    channels = await service.prepare_channels(pairs, user_map)
+    await service.move_pairs_to_channels(pairs, user_map, channels)
+
+
+async def measure(label: str, round_fn, pair_count: int, latency: float, concurrency: int):
+    guild = FakeGuild(latency=latency)
+    # Moves are unpaced here so the timings show channel provisioning only
+    mover = MoveScheduler(rate=10_000, burst=1_000, workers=1_000)
+    service = VoiceService(guild, limiter=AdaptiveLimiter(concurrency), mover=mover)
+    await service.discover()
+    service.category = await guild.create_category(service.category_name)
+
+    results = []
+    for phase in ("cold", "pooled"):
+        pairs, user_map = make_lobby(guild, pair_count)
+        guild.api_calls.clear()
+        started = time.perf_counter()
+        await round_fn(service, pairs, user_map)
+        elapsed = time.perf_counter() - started
+        calls = Counter(guild.api_calls)
+        calls.pop("move_member", None)
+        results.append(f"{phase} {elapsed:>6.2f}s {sum(calls.values()):>4} calls")
+        await service.cleanup()
+    await mover.close()
+
+    print(f"{label:<22} {pair_count:>5}   " + "   ".join(results))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, nargs="+", default=[10, 30, 60])
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per REST call")
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Latency {args.latency * 1000:.0f}ms per call, concurrency {args.concurrency}; calls exclude moves")
+    print(f"{'Flow':<22} {'Pairs':>5}")
+    for pair_count in args.pairs:
+        await measure("set_permissions", legacy_round, pair_count, args.latency, args.concurrency)
+        await measure("overwrites at create", current_round, pair_count, args.latency, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,33 @@
 import logging
 from typing import Dict, List, Tuple, Union, Optional
-from zoneinfo import ZoneInfo
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
+import time
+import uuid
 
 from bot.checks import is_in_correct_channel, is_session_manager
+from bot.views import HistoryView, fetch_history_page, format_history_page
 from config import settings
 from database.base import async_session_factory
-from database.models import RoundStatus, User, Round, Meeting
+from database.models import RoundStatus
 from database.repository import MeetingRepository
+from database.write_behind import RoundWriter
+from services.history_cache import PairHistoryCache
 from services.matchmaker import MatchmakerService
+from services.metrics import (
+    ACTIVE_ROUNDS,
+    ROUND_PHASE_FAILURES,
+    ROUND_PHASE_SECONDS,
+    ROUND_STATUS_WRITES,
+    timed_phase,
+)
+from services.move_scheduler import MoveScheduler, ProgressCallback
+from services.pair_history import PairHistory
+from services.rate_limit import AdaptiveLimiter
+from services.roster import VoiceRoster
+from services.session_registry import GuildSession, RoundPlan, SessionRegistry
+from services.signaling import SignalingService
 from services.voice_service import VoiceService
 
 logger = logging.getLogger(__name__)
@@ -19,57 +36,254 @@ logger = logging.getLogger(__name__)
 class SessionCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.matchmaker = MatchmakerService()
-        self.current_round_task: Optional[asyncio.Task] = None
-        self.is_running: bool = False
+        self.matchmaker = MatchmakerService(
+            engine=settings.MATCHMAKING_ENGINE,
+            time_budget_ms=settings.MATCHMAKING_TIME_BUDGET_MS,
+            executor=settings.MATCHMAKING_EXECUTOR,
+            workers=settings.MATCHMAKING_WORKERS,
+            inline_max_users=settings.MATCHMAKING_INLINE_MAX_USERS,
+            schedule_budget_ms=settings.MATCHMAKING_SCHEDULE_BUDGET_MS,
+            partition_size=settings.MATCHMAKING_PARTITION_SIZE,
+        )
+        self.history_caches: Dict[int, PairHistoryCache] = {}
+        self.writer: Optional[RoundWriter] = None
+        self.sessions = SessionRegistry()
+        ACTIVE_ROUNDS.set_function(lambda: self.sessions.running)
+
+    async def cog_load(self):
+        if settings.WRITE_BEHIND_ENABLED:
+            self.writer = RoundWriter(
+                async_session_factory, settings.WRITE_BEHIND_SPOOL_PATH, batch_size=settings.WRITE_BEHIND_BATCH_SIZE
+            )
+            await self.writer.start()
+        self.trim_channel_pools.start()
+
+    async def cog_unload(self):
+        self.trim_channel_pools.cancel()
+        self.matchmaker.shutdown()
+        await self.sessions.close()
+        if self.writer:
+            await self.writer.stop()
 
     async def cog_check(self, ctx: commands.Context) -> bool:
         return await is_in_correct_channel().predicate(ctx)
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Sweep channel pools left by a previous run instead of creating duplicates
+        await asyncio.gather(*(self._discover_channels(guild) for guild in self.bot.guilds))
+        # Voice state events may have been missed while disconnected
+        for session in self.sessions:
+            session.roster.resync()
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(
+        self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState
+    ):
+        if before.channel == after.channel:
+            return  # Mute, deafen, stream...
+        session = self.sessions.get(member.guild.id)
+        if not session.roster.update(member, before.channel, after.channel):
+            return
+
+        plan = session.plan
+        if not plan or not plan.live or not before.channel:
+            return
+        index = plan.channel_index(before.channel.id)
+        if index is None:
+            return
+
+        if after.channel is None or plan.channel_index(after.channel.id) is None:
+            # Out of the round: no mention at the warning, no move at the end
+            plan.user_map.pop(member.id, None)
+        logger.info(
+            f"Round {plan.round_ref}: {member} left {before.channel.name}"
+            + (f" for {after.channel.name}" if after.channel else "")
+        )
+
+        if session.roster.count(before.channel.id) == 0:
+            channel = plan.channels[index]
+            plan.channels[index] = None
+            session.roster.unwatch(channel.id)
+            logger.info(f"Round {plan.round_ref}: {channel.name} is empty, released early")
+            try:
+                await self._get_voice_service(member.guild).release([channel])
+            except Exception as e:
+                logger.warning(f"Failed to release {channel.name} early: {e}")
+
+    async def _discover_channels(self, guild: discord.Guild):
+        try:
+            voice_mgr = self._get_voice_service(guild)
+            await voice_mgr.discover()
+            logger.info(f"Channel pool (Guild: {guild.id}): {len(voice_mgr.pool)} existing session channels")
+        except Exception as e:
+            logger.warning(f"Failed to discover session channels in guild {guild.id}: {e}")
+
+    @tasks.loop(minutes=1)
+    async def trim_channel_pools(self):
+        for session in self.sessions:
+            if not session.voice or session.is_busy:
+                continue
+            try:
+                await session.voice.trim_idle()
+            except Exception as e:
+                logger.warning(f"Failed to trim channel pool in guild {session.guild_id}: {e}")
+
+    @trim_channel_pools.before_loop
+    async def before_trim_channel_pools(self):
+        await self.bot.wait_until_ready()
+
     @commands.command(name="start")
     @is_session_manager()
     async def start_round(self, ctx: commands.Context, duration_minutes: int = 5):
+        requested_at = time.perf_counter()
         logger.info(f"Command !start called by {ctx.author} (Guild: {ctx.guild.id}, Duration: {duration_minutes}m)")
-        if self.is_running:
+        session = self.sessions.get(ctx.guild.id)
+        if session.is_busy:
             logger.warning(f"User {ctx.author} tried to start a round while one is running.")
             await ctx.reply("A round is already in progress! Use `!stop` to end it first.")
             return
 
-        lobby_channel = await self._validate_start_conditions(ctx, duration_minutes)
-        if not lobby_channel:
-            return
+        async with session.lock:
+            lobby_channel = await self._validate_start_conditions(ctx, duration_minutes)
+            if not lobby_channel:
+                return
 
-        participants, sitter, user_map = self._prepare_participants(ctx, lobby_channel)
+            session.roster.watch(lobby_channel)
+            participants, sitter, user_map = self._prepare_participants(
+                ctx, session.roster.members(lobby_channel.id)
+            )
 
-        if len(participants) < 2:
-            await ctx.reply("Not enough people to start (minimum 2).")
-            return
+            if len(participants) < 2:
+                await ctx.reply("Not enough people to start (minimum 2).")
+                return
 
-        await ctx.send(f"Preparing round for {len(participants)} people. Duration: {duration_minutes} min.")
+            status_msg = await ctx.send(
+                f"Preparing round for {len(participants)} people. Duration: {duration_minutes} min."
+            )
 
-        pairs, round_id = await self._process_matchmaking_and_db(ctx, participants, duration_minutes)
-        if not pairs:
-            await ctx.reply("Could not create any pairs!")
-            return
+            pairs, round_ref = await self._process_matchmaking_and_db(ctx, participants, duration_minutes)
+            if not pairs:
+                await ctx.reply("Could not create any pairs!")
+                return
 
-        self._log_match_results(round_id, pairs, sitter, user_map)
+            self._log_match_results(round_ref, pairs, sitter, user_map)
+            plan = RoundPlan(pairs, sitter, user_map, participants, round_ref)
+
+            logger.info(f"Starting lifecycle task (Guild: {ctx.guild.id}, {self.sessions.running + 1} running)...")
+            session.plan = plan
+            session.start(
+                self._round_lifecycle(ctx, plan, lobby_channel, duration_minutes, requested_at, status_msg)
+            )
 
-        logger.info("Starting lifecycle task...")
-        self.is_running = True
-        self.current_round_task = asyncio.create_task(
-            self._round_lifecycle(ctx, pairs, sitter, user_map, lobby_channel, duration_minutes, round_id)
+    @commands.command(
+        name="session", help="Runs several rounds back to back. Usage: !session <rounds> [minutes]"
+    )
+    @is_session_manager()
+    async def start_session(self, ctx: commands.Context, rounds: int, duration_minutes: int = 5):
+        requested_at = time.perf_counter()
+        logger.info(
+            f"Command !session called by {ctx.author} "
+            f"(Guild: {ctx.guild.id}, Rounds: {rounds}, Duration: {duration_minutes}m)"
         )
+        session = self.sessions.get(ctx.guild.id)
+        if session.is_busy:
+            logger.warning(f"User {ctx.author} tried to start a session while a round is running.")
+            await ctx.reply("A round is already in progress! Use `!stop` to end it first.")
+            return
+
+        if not 1 <= rounds <= settings.SESSION_MAX_ROUNDS:
+            await ctx.reply(f"Number of rounds must be between 1 and {settings.SESSION_MAX_ROUNDS}.")
+            return
+
+        async with session.lock:
+            lobby_channel = await self._validate_start_conditions(ctx, duration_minutes)
+            if not lobby_channel:
+                return
+
+            session.roster.watch(lobby_channel)
+            participants, sitter, user_map = self._prepare_participants(
+                ctx, session.roster.members(lobby_channel.id)
+            )
+
+            if len(participants) < 2:
+                await ctx.reply("Not enough people to start (minimum 2).")
+                return
+
+            status_msg = await ctx.send(
+                f"Preparing {rounds} rounds for {len(user_map)} people. Duration: {duration_minutes} min each."
+            )
+
+            # Every round is planned now; who sits out rotates with the plan
+            await self._plan_session(ctx, user_map, rounds)
+            scheduled = self._scheduled_pairs(ctx, 0, user_map)
+            if not scheduled:
+                await ctx.reply("Could not create any pairs!")
+                return
+            pairs, sitter = scheduled
+            participants = [m for m in user_map.values() if m is not sitter]
+            round_ref = await self._record_round(ctx, participants, duration_minutes, pairs)
+
+            self._log_match_results(round_ref, pairs, sitter, user_map)
+            plan = RoundPlan(pairs, sitter, user_map, participants, round_ref)
+
+            logger.info(f"Starting session task (Guild: {ctx.guild.id}, {self.sessions.running + 1} running)...")
+            session.plan = plan
+            session.start(
+                self._session_lifecycle(ctx, plan, lobby_channel, rounds, duration_minutes, requested_at, status_msg)
+            )
 
     @commands.command(name="stop")
     @is_session_manager()
     async def stop_round(self, ctx: commands.Context):
         logger.info(f"Command !stop called by {ctx.author} (Guild: {ctx.guild.id})")
-        if not self.is_running or not self.current_round_task:
+        if not self.sessions.get(ctx.guild.id).stop():
             logger.warning(f"User {ctx.author} tried to stop a round while one is not running.")
             await ctx.reply("There is no round currently running.")
             return
 
-        self.current_round_task.cancel()
+    @commands.command(name="rematch", help="Pairs up people left alone mid-round, and the sitter.")
+    @is_session_manager()
+    async def rematch(self, ctx: commands.Context):
+        logger.info(f"Command !rematch called by {ctx.author} (Guild: {ctx.guild.id})")
+        session = self.sessions.get(ctx.guild.id)
+        plan = session.plan
+        if not plan or not plan.live:
+            await ctx.reply("There is no round in progress to rematch.")
+            return
+
+        orphans = self._find_orphans(session, plan)
+        candidates = [member for member, _ in orphans.values()]
+        if plan.sitter and plan.sitter.voice and plan.sitter.id not in orphans:
+            candidates.append(plan.sitter)
+        if len(candidates) < 2:
+            await ctx.reply("Nobody to rematch.")
+            return
+
+        # Only the affected people are matched, with the same history weighting as a full round
+        pairs = await self._match_participants(ctx, candidates)
+        if not pairs or session.plan is not plan or not plan.live:
+            await ctx.reply("Could not rematch anyone.")
+            return
+
+        plan.user_map.update((m.id, m) for m in candidates)
+        channels = []
+        for pair in pairs:
+            # The pair meets where one of them already is
+            index = min(orphans[uid][1] for uid in pair if uid in orphans)
+            channels.append(plan.channels[index])
+            plan.pairs[index] = pair
+        paired = {uid for pair in pairs for uid in pair}
+        if plan.sitter and plan.sitter.id in paired:
+            plan.sitter = None
+
+        await self._record_meetings(ctx, plan.round_ref, [m for m in candidates if m.id in paired], pairs)
+        self._log_match_results(plan.round_ref, pairs, None, plan.user_map)
+
+        # Channels left empty by the moves are released by on_voice_state_update
+        report = await self._get_voice_service(ctx.guild).rematch(pairs, plan.user_map, channels)
+        logger.info(f"Round {plan.round_ref}: Rematched {len(pairs)} pairs, {report}")
+        await ctx.reply(f"Rematched {len(pairs) * 2} people.")
 
     @commands.command(name="moveto")
     @is_session_manager()
@@ -94,16 +308,19 @@ class SessionCog(commands.Cog):
             f"Moving **{count}** users from **{source_channel.name}** to **{target_channel.name}**..."
         )
 
-        tasks = []
-        for member in members_to_move:
-            tasks.append(member.move_to(target_channel))
+        async def show_progress(done: int, total: int):
+            await status_msg.edit(
+                content=f"Moving **{count}** users to **{target_channel.name}**... {done}/{total}"
+            )
 
         try:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            errors = [r for r in results if isinstance(r, Exception)]
+            report = await self._get_move_scheduler(ctx.guild.id).move(
+                [(member, target_channel) for member in members_to_move], progress=show_progress
+            )
+            logger.info(f"Command !moveto: {report}")
+            errors = [e for _, e in report.failed]
 
             if not errors:
-                logger.info("Moving completed successfully.")
                 await status_msg.edit(content=f"Successfully moved **{count}** users to **{target_channel.name}**.")
                 return
 
@@ -124,60 +341,39 @@ class SessionCog(commands.Cog):
             await status_msg.edit(content="An unexpected error occurred during the move.")
             logger.error(f"Unexpected error during move: {e}")
 
-    @commands.command(name="history", help="Sends you a private message with your last 10 meetings.")
-    async def history(self, ctx: commands.Context):
+    @commands.command(
+        name="history", help="Sends you a private message with your meeting history. Usage: !history [count]"
+    )
+    async def history(self, ctx: commands.Context, count: int = settings.HISTORY_PAGE_SIZE):
         source = f"Guild: {ctx.guild.id}" if ctx.guild else "DM"
-        logger.info(f"Command !history called by {ctx.author} ({source})")
+        logger.info(f"Command !history called by {ctx.author} ({source}, Count: {count})")
 
         try:
             await ctx.message.delete()
         except (discord.Forbidden, discord.NotFound, discord.HTTPException):
             pass
 
-        async with async_session_factory() as session:
-            repo = MeetingRepository(session)
-            history = await repo.get_user_history(ctx.author.id, limit=10)
+        page_size = max(1, min(count, settings.HISTORY_MAX_PAGE_SIZE))
+        entries, has_more = await fetch_history_page(ctx.author.id, page_size)
 
-        if not history:
+        if not entries:
             await ctx.author.send("You haven't participated in any meetings yet.")
             return
 
-        header = f"{'No.':<4} | {'Date':<16} | {'Partner'}"
-        separator = "-" * (len(header) + 4)
-        lines = [
-            "**Your Last 10 Meetings:**",
-            "```",  # Start Code Block
-            header,
-            separator,
-        ]
-
-        local_tz = ZoneInfo(settings.TIMEZONE)
-
-        for idx, meeting in enumerate(history, 1):
-            if meeting.user_1_id == ctx.author.id:
-                partner = meeting.user_2
-            else:
-                partner = meeting.user_1
-            partner_name = partner.username if partner else "Unknown User"
-
-            local_time = meeting.round.started_at.astimezone(local_tz)
-            date_str = local_time.strftime("%d.%m.%Y %H:%M")  # Polish format
-
-            row = f"{str(idx) + '.':<4} | {date_str:<16} | {partner_name}"
-            lines.append(row)
-
-        lines.append("```")  # End Code Block
-        message_content = "\n".join(lines)
+        message_content = format_history_page(entries, 1)
+        view = HistoryView(ctx.author.id, page_size, entries, has_more)
 
         try:
-            await ctx.author.send(message_content)
+            await ctx.author.send(message_content, view=view)
             logger.info(f"Sent DM to {ctx.author} ({source})")
         except discord.Forbidden:
             logger.info(f"Couldn't send DM to {ctx.author} ({source})")
             await ctx.reply(f"{ctx.author.mention}, could not send a DM. Please enable DMs from server members.")
 
     @start_round.error
+    @start_session.error
     @stop_round.error
+    @rematch.error
     async def session_error_handler(self, ctx: commands.Context, error):
         if isinstance(error, commands.CheckFailure):
             if ctx.guild and settings.ALLOWED_CHANNEL_IDS:
@@ -212,8 +408,8 @@ class SessionCog(commands.Cog):
 
         return ctx.author.voice.channel
 
-    def _prepare_participants(self, ctx: commands.Context, channel: Union[discord.VoiceChannel, discord.StageChannel]):
-        all_members = [m for m in channel.members if not m.bot]
+    def _prepare_participants(self, ctx: commands.Context, members: List[discord.Member]):
+        all_members = [m for m in members if not m.bot]
         user_map = {m.id: m for m in all_members}
 
         sitter: Optional[discord.Member] = None
@@ -233,34 +429,146 @@ class SessionCog(commands.Cog):
     async def _process_matchmaking_and_db(
         self, ctx: commands.Context, participants: List[discord.Member], duration: int
     ):
+        pairs = await self._match_participants(ctx, participants)
+        if not pairs:
+            return None, None
+
+        round_ref = await self._record_round(ctx, participants, duration, pairs)
+        return pairs, round_ref
+
+    async def _match_participants(
+        self, ctx: commands.Context, participants: List[discord.Member]
+    ) -> List[Tuple[int, int]]:
         user_ids = [m.id for m in participants]
-        pairs = []
-        round_id = None
+        history = await self._load_history(ctx, user_ids)
+
+        with timed_phase("matchmaking"):
+            result = await self.matchmaker.match_async(user_ids, history)
+        gap = f"{result.optimality_gap:.2%}" if result.optimality_gap is not None else "unknown"
+        logger.info(
+            f"Matchmaking: engine={result.engine.value}, users={len(user_ids)}, "
+            f"time={result.elapsed_ms:.1f}ms, gap={gap}"
+        )
+        return result.pairs
+
+    async def _plan_session(self, ctx: commands.Context, user_map: Dict[int, discord.Member], rounds: int):
+        """Plans every round of a session up front, kept under the guild id for _scheduled_pairs."""
+        user_ids = list(user_map)
+        history = await self._load_history(ctx, user_ids)
+        schedule = await self.matchmaker.plan_schedule_async(user_ids, history, rounds, key=ctx.guild.id)
+        logger.info(
+            f"Session plan (Guild: {ctx.guild.id}): {len(schedule)}/{rounds} rounds for {len(user_ids)} users, "
+            f"time={schedule.elapsed_ms:.1f}ms"
+        )
 
-        async with async_session_factory() as session:
-            repo = MeetingRepository(session)
-            history_map = await repo.get_past_meetings_with_time(user_ids)
-            pairs, _ = self.matchmaker.create_pairs(user_ids, history_map)
+    def _scheduled_pairs(
+        self, ctx: commands.Context, index: int, user_map: Dict[int, discord.Member]
+    ) -> Optional[Tuple[List[Tuple[int, int]], Optional[discord.Member]]]:
+        """Returns: (pairs, sitter) of the planned round, fitted to user_map; None past the end of the plan."""
+        result = self.matchmaker.scheduled_round(ctx.guild.id, index, list(user_map))
+        if result is None or not result.pairs:
+            return None
+        logger.info(
+            f"Matchmaking: scheduled round {index + 1}, users={len(user_map)}, time={result.elapsed_ms:.2f}ms"
+        )
+        sitter = user_map.get(result.unmatched[0]) if result.unmatched else None
+        return result.pairs, sitter
 
-            if not pairs:
-                return None, None
+    async def _load_history(self, ctx: commands.Context, user_ids: List[int]) -> PairHistory:
+        if self.writer:
+            # History reads must see every meeting that is still queued
+            try:
+                await asyncio.wait_for(self.writer.drain(), timeout=settings.WRITE_BEHIND_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Write-behind: {self.writer.pending} job(s) still queued, history may be stale.")
+
+        with timed_phase("history_read"):
+            async with async_session_factory() as session:
+                repo = MeetingRepository(session)
+                return await self._read_history(ctx.guild.id, repo, user_ids)
+
+    async def _record_round(
+        self, ctx: commands.Context, participants: List[discord.Member], duration: int, pairs: List[Tuple[int, int]]
+    ) -> str:
+        users = [(m.id, m.name) for m in participants]
+        if self.writer:
+            round_ref = await self.writer.submit_round(ctx.guild.id, duration, users, pairs)
+        else:
+            round_ref = uuid.uuid4().hex
+            async with async_session_factory() as session:
+                await MeetingRepository(session).create_round(
+                    guild_id=ctx.guild.id, duration_minutes=duration, users=users, pairs=pairs, ref=round_ref
+                )
+                await session.commit()
 
-            for member in participants:
-                await session.merge(User(id=member.id, username=member.name))
+        self._remember_pairs(pairs)
+        return round_ref
 
-            new_round = Round(
-                guild_id=ctx.guild.id, round_number=1, duration_minutes=duration, status=RoundStatus.IN_PROGRESS
+    async def _record_meetings(
+        self, ctx: commands.Context, round_ref: str, members: List[discord.Member], pairs: List[Tuple[int, int]]
+    ):
+        """Adds meetings to a round already recorded."""
+        users = [(m.id, m.name) for m in members]
+        try:
+            if self.writer:
+                await self.writer.submit_meetings(round_ref, users, pairs)
+            else:
+                async with async_session_factory() as session:
+                    if not await MeetingRepository(session).add_round_meetings(round_ref, users, pairs):
+                        logger.warning(f"Round {round_ref} not found, meetings not recorded.")
+                    await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record meetings for round {round_ref}: {e}")
+            return
+
+        self._remember_pairs(pairs)
+
+    def _remember_pairs(self, pairs: List[Tuple[int, int]]):
+        # History is shared between guilds, so every cache that knows these users is updated
+        now = int(time.time())
+        for cache in self.history_caches.values():
+            cache.record(pairs, now)
+
+    def _get_limiter(self, guild_id: int) -> AdaptiveLimiter:
+        session = self.sessions.get(guild_id)
+        if not session.limiter:
+            session.limiter = AdaptiveLimiter(limit=settings.DISCORD_API_CONCURRENCY)
+        return session.limiter
+
+    def _get_move_scheduler(self, guild_id: int) -> MoveScheduler:
+        session = self.sessions.get(guild_id)
+        if not session.mover:
+            session.mover = MoveScheduler(
+                rate=settings.MOVE_RATE_PER_SECOND, burst=settings.MOVE_BURST, workers=settings.MOVE_BURST
             )
-            session.add(new_round)
-            await session.flush()  # Get ID
+        return session.mover
+
+    def _get_voice_service(self, guild: discord.Guild) -> VoiceService:
+        session = self.sessions.get(guild.id)
+        if not session.voice:
+            session.voice = VoiceService(
+                guild,
+                limiter=self._get_limiter(guild.id),
+                idle_timeout=settings.CHANNEL_POOL_IDLE_MINUTES * 60,
+                mover=self._get_move_scheduler(guild.id),
+            )
+        return session.voice
 
-            for u1, u2 in pairs:
-                session.add(Meeting(round_id=new_round.id, user_1_id=u1, user_2_id=u2))
+    def _get_history_cache(self, guild_id: int) -> PairHistoryCache:
+        if guild_id not in self.history_caches:
+            self.history_caches[guild_id] = PairHistoryCache(
+                max_users=settings.HISTORY_CACHE_MAX_USERS, max_entries=settings.HISTORY_CACHE_MAX_ENTRIES
+            )
+        return self.history_caches[guild_id]
 
-            await session.commit()
-            round_id = new_round.id
+    async def _read_history(self, guild_id: int, repo: MeetingRepository, user_ids: List[int]) -> PairHistory:
+        if not settings.HISTORY_CACHE_ENABLED:
+            return await repo.get_past_meetings_with_time(user_ids)
 
-        return pairs, round_id
+        cache = self._get_history_cache(guild_id)
+        history = await cache.get_history(user_ids, repo.get_full_history)
+        logger.info(f"History cache (Guild: {guild_id}): {cache.stats}")
+        return history
 
     def _fmt_user(self, user: Optional[discord.Member], uid: int) -> str:
         """Formats the user for logs: Nickname (Name) or ID if none."""
@@ -269,9 +577,9 @@ class SessionCog(commands.Cog):
         return f"Unknown_ID_{uid}"
 
     def _log_match_results(
-        self, round_id: int, pairs: List[Tuple[int, int]], sitter: Optional[int], user_map: Dict[int, discord.Member]
+        self, round_ref: str, pairs: List[Tuple[int, int]], sitter: Optional[int], user_map: Dict[int, discord.Member]
     ):
-        logger.info(f"=== MATCHING RESULTS FOR ROUND {round_id} ===")
+        logger.info(f"=== MATCHING RESULTS FOR ROUND {round_ref} ===")
 
         for idx, (uid1, uid2) in enumerate(pairs, 1):
             p1 = self._fmt_user(user_map.get(uid1), uid1)
@@ -287,114 +595,326 @@ class SessionCog(commands.Cog):
     async def _round_lifecycle(
         self,
         ctx: commands.Context,
-        pairs: List[Tuple[int, int]],
-        sitter: Optional[discord.Member],
-        user_map: Dict[int, discord.Member],
+        plan: RoundPlan,
         lobby_channel: Union[discord.VoiceChannel, discord.StageChannel],
         duration_minutes: int,
-        round_id: int,
+        requested_at: float,
+        status_msg: Optional[discord.Message] = None,
     ):
-        voice_mgr = VoiceService(ctx.guild)
-
         try:
-            logger.info(f"Round {round_id}: Preparing channels for {len(pairs)} pairs.")
-            await voice_mgr.prepare_channels(len(pairs))
-            await voice_mgr.move_pairs_to_channels(pairs, user_map)
+            await self._begin_round(ctx, plan, requested_at, status_msg)
+            await self._run_round(ctx, plan, duration_minutes)
+            await self._update_round_status(plan.round_ref, RoundStatus.COMPLETED)
 
-            seconds = duration_minutes * 60
-            warning_time = 30
+        except asyncio.CancelledError:
+            logger.info(f"Round {plan.round_ref}: Cancelled manually.")
+            await self._update_round_status(plan.round_ref, RoundStatus.CANCELLED)
+            raise
 
-            hop_delay = 0.4
-            channels_count = len(voice_mgr.temp_channels)
-            half_total_hop_time = (channels_count * hop_delay) / 2
-            start_signaling_at_remaining = warning_time + half_total_hop_time
+        except Exception:
+            logger.error(f"Round {plan.round_ref}: CRITICAL ERROR during lifecycle!", exc_info=True)
+            await self._update_round_status(plan.round_ref, RoundStatus.ERROR)
 
-            if seconds > start_signaling_at_remaining:
-                await asyncio.sleep(seconds - start_signaling_at_remaining)
+        finally:
+            await self._end_round(ctx, plan, lobby_channel, status_msg)
 
-                logger.info(f"Round {round_id}: Starting audio signal run (Duration: ~{half_total_hop_time * 2}s)")
-                asyncio.create_task(self._signal_channels(ctx, voice_mgr.temp_channels, delay=hop_delay))
+    async def _session_lifecycle(
+        self,
+        ctx: commands.Context,
+        plan: RoundPlan,
+        lobby_channel: Union[discord.VoiceChannel, discord.StageChannel],
+        rounds: int,
+        duration_minutes: int,
+        requested_at: float,
+        status_msg: Optional[discord.Message] = None,
+    ):
+        """
+        Rounds back to back. The next round is matched and its channels provisioned SESSION_PREPARE_LEAD_SECONDS
+        before the current one ends, so between rounds people only wait for the moves, which go straight from
+        channel to channel. Preparing late catches who joined during the round, and keeps the next round's
+        channels (and a second set of pool channels) around for only that long.
+        """
+        voice_mgr = self._get_voice_service(ctx.guild)
+        session = self.sessions.get(ctx.guild.id)
+        upcoming: Optional[asyncio.Task] = None
+        current = plan
+        previous: Optional[RoundPlan] = None  # Set while people move from one round to the next
+        open_ref: Optional[str] = current.round_ref  # Round that is recorded but has no final status yet
 
-                await asyncio.sleep(half_total_hop_time)
+        try:
+            await self._begin_round(ctx, current, requested_at, status_msg)
 
-                participants_mentions = [m.mention for m in user_map.values()]
-                notification_msg = f"{' '.join(participants_mentions)}\n**30 seconds remaining!**"
-                await ctx.send(notification_msg)
+            for number in range(1, rounds + 1):
+                if number < rounds:
+                    prepare_in = max(0, duration_minutes * 60 - settings.SESSION_PREPARE_LEAD_SECONDS)
+                    upcoming = asyncio.create_task(
+                        self._plan_next_round(ctx, lobby_channel, current, number, delay=prepare_in)
+                    )
 
-                await asyncio.sleep(warning_time)
+                await self._run_round(ctx, current, duration_minutes)
+                await self._update_round_status(current.round_ref, RoundStatus.COMPLETED)
+                open_ref = None
+                if number == rounds:
+                    break
 
-            else:
-                await asyncio.sleep(seconds)
+                try:
+                    next_plan = await upcoming
+                except Exception:
+                    logger.error(f"Session (Guild: {ctx.guild.id}): Failed to prepare the next round", exc_info=True)
+                    next_plan = None
+                upcoming = None
+                if not next_plan:
+                    await ctx.send("Could not prepare another round, ending the session.")
+                    break
 
-            await self._update_round_status(round_id, RoundStatus.COMPLETED)
+                next_plan.round_ref = open_ref = await self._record_round(
+                    ctx, next_plan.participants, duration_minutes, next_plan.pairs
+                )
+                self._log_match_results(next_plan.round_ref, next_plan.pairs, next_plan.sitter, next_plan.user_map)
+
+                self._forget_departed(session, next_plan, [lobby_channel, *current.channels])
+                previous, current = current, next_plan
+                previous.live = False
+                switch_started = time.perf_counter()
+                with timed_phase("switch"):
+                    report = await voice_mgr.switch_rounds(
+                        previous.pairs,
+                        previous.channels,
+                        current.pairs,
+                        current.channels,
+                        {**previous.user_map, **current.user_map},
+                        lobby_channel,
+                        progress=self._move_progress(status_msg, f"Round {number + 1}/{rounds}: moving pairs"),
+                    )
+                for channel in previous.channels:
+                    if channel:
+                        session.roster.unwatch(channel.id)
+                previous = None
+                current.live = True
+                session.plan = current
+                logger.info(
+                    f"Round {current.round_ref} ({number + 1}/{rounds}): {report}, "
+                    f"switched in {time.perf_counter() - switch_started:.2f}s"
+                )
 
         except asyncio.CancelledError:
-            logger.info(f"Round {round_id}: Cancelled manually.")
-            await self._update_round_status(round_id, RoundStatus.CANCELLED)
+            logger.info(f"Session (Guild: {ctx.guild.id}): Cancelled manually.")
+            if open_ref:
+                await self._update_round_status(open_ref, RoundStatus.CANCELLED)
             raise
 
         except Exception:
-            logger.error(f"Round {round_id}: CRITICAL ERROR during lifecycle!", exc_info=True)
-            await self._update_round_status(round_id, RoundStatus.ERROR)
+            logger.error(f"Session (Guild: {ctx.guild.id}): CRITICAL ERROR during session!", exc_info=True)
+            if open_ref:
+                await self._update_round_status(open_ref, RoundStatus.ERROR)
 
         finally:
-            logger.info(f"Round {round_id}: Cleanup started.")
-            users_to_return = []
-            for uid1, uid2 in pairs:
-                if uid1 in user_map:
-                    users_to_return.append(user_map[uid1])
-                if uid2 in user_map:
-                    users_to_return.append(user_map[uid2])
+            if upcoming:
+                upcoming.cancel()
+                await asyncio.gather(upcoming, return_exceptions=True)
+            self.matchmaker.forget(ctx.guild.id)
+            if previous:
+                # Stopped mid-switch: people can still be in either round's channels
+                current = RoundPlan(
+                    previous.pairs + current.pairs,
+                    current.sitter,
+                    {**previous.user_map, **current.user_map},
+                    current.participants,
+                    current.round_ref,
+                    previous.channels + current.channels,
+                )
+            # Also releases channels provisioned for a round that never started
+            await self._end_round(ctx, current, lobby_channel, status_msg)
+
+    async def _plan_next_round(
+        self,
+        ctx: commands.Context,
+        lobby_channel: Union[discord.VoiceChannel, discord.StageChannel],
+        current: RoundPlan,
+        index: int,
+        delay: float = 0,
+    ) -> Optional[RoundPlan]:
+        """
+        Pairs everyone in the lobby and the current round's channels, and provisions their channels.
+        :param index: Round number in the session, from 0; taken from the session plan while it lasts.
+        :param delay: Seconds to wait first; the roster is read after it, so late joiners are included.
+        """
+        if delay:
+            await asyncio.sleep(delay)
 
-            if users_to_return:
-                await voice_mgr.return_users_to_lobby(users_to_return, lobby_channel)
+        roster = self.sessions.get(ctx.guild.id).roster
+        members = {m.id: m for m in roster.members(lobby_channel.id)}
+        for channel in current.channels:
+            if channel:
+                members.update((m.id, m) for m in roster.members(channel.id))
 
-            if ctx.guild.voice_client:
-                await ctx.guild.voice_client.disconnect(force=False)
+        participants, sitter, user_map = self._prepare_participants(ctx, list(members.values()))
+        if len(participants) < 2:
+            return None
 
-            await voice_mgr.cleanup()
+        scheduled = self._scheduled_pairs(ctx, index, user_map)
+        if scheduled:
+            pairs, sitter = scheduled
+            participants = [m for m in user_map.values() if m is not sitter]
+        else:
+            pairs = await self._match_participants(ctx, participants)
+        if not pairs:
+            return None
 
-            self.is_running = False
-            self.current_round_task = None
-            logger.info(f"Round {round_id}: Cleanup finished.")
+        channels = await self._get_voice_service(ctx.guild).prepare_channels(pairs, user_map)
+        self._watch_channels(roster, channels)
+        logger.info(f"Next round: {len(pairs)} pairs ready, {self._get_voice_service(ctx.guild).last_provisioning}")
+        return RoundPlan(pairs, sitter, user_map, participants, channels=channels)
 
-    async def _signal_channels(self, ctx: commands.Context, channels: List[discord.VoiceChannel], delay: float):
-        vc = ctx.guild.voice_client
+    async def _begin_round(
+        self, ctx: commands.Context, plan: RoundPlan, requested_at: float, status_msg: Optional[discord.Message]
+    ):
+        voice_mgr = self._get_voice_service(ctx.guild)
+
+        logger.info(f"Round {plan.round_ref}: Preparing channels for {len(plan.pairs)} pairs.")
+        plan.channels = await voice_mgr.prepare_channels(plan.pairs, plan.user_map)
+        self._watch_channels(self.sessions.get(ctx.guild.id).roster, plan.channels)
+        logger.info(f"Round {plan.round_ref}: Provisioned {voice_mgr.last_provisioning}")
+        with timed_phase("moves"):
+            report = await voice_mgr.move_pairs_to_channels(
+                plan.pairs,
+                plan.user_map,
+                plan.channels,
+                progress=self._move_progress(status_msg, "Moving pairs to their channels"),
+            )
+        logger.info(
+            f"Round {plan.round_ref}: {report}, pairs in place within "
+            f"{time.perf_counter() - requested_at:.2f}s of the command"
+        )
+        if report.failed:
+            logger.warning(f"Round {plan.round_ref}: Could not move {[str(m) for m, _ in report.failed]}")
+        plan.live = True
+
+    async def _run_round(self, ctx: commands.Context, plan: RoundPlan, duration_minutes: int):
+        """Waits out the round, with the 30-second warning."""
+        seconds = duration_minutes * 60
+        warning_time = 30
+
+        signaling = SignalingService(self._get_limiter(ctx.guild.id), audio_hop=settings.SIGNAL_AUDIO_HOP)
+        channels = [channel for channel in plan.channels if channel]
+        start_signaling_at_remaining = warning_time + signaling.lead_time(len(channels))
+
+        if seconds > start_signaling_at_remaining:
+            await asyncio.sleep(seconds - start_signaling_at_remaining)
+            ends_at = time.monotonic() + start_signaling_at_remaining
+
+            # Channels emptied during the round are already released
+            channels = [channel for channel in plan.channels if channel]
+            logger.info(f"Round {plan.round_ref}: Signaling {len(channels)} channels")
+            await signaling.warn(
+                ctx.guild,
+                channels,
+                [m.mention for m in plan.user_map.values()],
+                ctx.send,
+                "**30 seconds remaining!**",
+            )
 
-        if not vc:
-            try:
-                if channels:
-                    vc = await channels[0].connect()
-            except Exception as e:
-                logger.warning(f"Failed to connect to voice for signaling: {e}")
-                return
+            await asyncio.sleep(max(0.0, ends_at - time.monotonic()))
+
+        else:
+            await asyncio.sleep(seconds)
 
+    async def _end_round(
+        self,
+        ctx: commands.Context,
+        plan: RoundPlan,
+        lobby_channel: Union[discord.VoiceChannel, discord.StageChannel],
+        status_msg: Optional[discord.Message],
+    ):
+        logger.info(f"Round {plan.round_ref}: Cleanup started.")
+        cleanup_started = time.perf_counter()
+        session = self.sessions.get(ctx.guild.id)
+        plan.live = False
+        self._forget_departed(session, plan, [lobby_channel, *plan.channels])
+        progress = self._move_progress(status_msg, "Returning to the lobby")
+        results = await asyncio.gather(
+            self._get_voice_service(ctx.guild).teardown(
+                plan.pairs, plan.user_map, lobby_channel, plan.channels, progress=progress
+            ),
+            self._disconnect_voice(ctx.guild),
+            return_exceptions=True,
+        )
+        ROUND_PHASE_SECONDS.observe(time.perf_counter() - cleanup_started, phase="teardown")
+        if isinstance(results[0], BaseException):
+            ROUND_PHASE_FAILURES.inc(phase="teardown")
+            logger.error(f"Round {plan.round_ref}: Teardown failed: {results[0]}")
+        else:
+            logger.info(
+                f"Round {plan.round_ref}: Returned to lobby: {results[0]}, "
+                f"teardown took {time.perf_counter() - cleanup_started:.2f}s"
+            )
+
+        # Only the lobby stays watched between rounds
+        session.roster.retain([lobby_channel.id])
+        logger.info(f"Round {plan.round_ref}: Cleanup finished.")
+
+    @staticmethod
+    def _find_orphans(session: GuildSession, plan: RoundPlan) -> Dict[int, Tuple[discord.Member, int]]:
+        """Returns: {member id: (member, channel index)} for everyone alone in their session channel."""
+        orphans = {}
+        for index, channel in enumerate(plan.channels):
+            if channel and session.roster.count(channel.id) == 1:
+                member = session.roster.members(channel.id)[0]
+                if not member.bot:
+                    orphans[member.id] = (member, index)
+        return orphans
+
+    @staticmethod
+    def _watch_channels(roster: VoiceRoster, channels: List[Optional[discord.VoiceChannel]]):
         for channel in channels:
-            try:
-                if vc.channel.id != channel.id:
-                    await vc.move_to(channel)
-                await asyncio.sleep(delay)
+            if channel:
+                roster.watch(channel)
 
-            except Exception as e:
-                logger.warning(f"Failed to signal channel {channel.name}: {e}")
-                vc = ctx.guild.voice_client
-                if not vc:
-                    break
+    @staticmethod
+    def _forget_departed(session: GuildSession, plan: RoundPlan, channels: List[Optional[discord.abc.GuildChannel]]):
+        """Drops the plan's members who are in none of these channels, so nobody is moved back after leaving."""
+        present = set()
+        for channel in channels:
+            if channel:
+                present.update(m.id for m in session.roster.members(channel.id))
+        departed = [uid for uid in plan.user_map if uid not in present]
+        for uid in departed:
+            del plan.user_map[uid]
+        if departed:
+            logger.info(f"Round {plan.round_ref}: {len(departed)} participants left voice, their moves are skipped")
+
+    @staticmethod
+    async def _disconnect_voice(guild: discord.Guild):
+        if guild.voice_client:
+            await guild.voice_client.disconnect(force=False)
+
+    @staticmethod
+    def _move_progress(status_msg: Optional[discord.Message], label: str) -> Optional[ProgressCallback]:
+        """Streams move progress into the round's status message."""
+        if not status_msg:
+            return None
+
+        async def show_progress(done: int, total: int):
+            await status_msg.edit(content=f"{label}... {done}/{total}")
 
-        if vc:
-            await vc.disconnect()
+        return show_progress
 
-    async def _update_round_status(self, round_id: int, status: RoundStatus):
+    async def _update_round_status(self, round_ref: str, status: RoundStatus):
         """Helper to update round status in DB safely."""
+        ROUND_STATUS_WRITES.inc(status=status.value)
         try:
-            async with async_session_factory() as session:
-                round_obj = await session.get(Round, round_id)
-                if round_obj:
-                    round_obj.status = status
-                    await session.commit()
-                    logger.info(f"Round {round_id} status updated to: {status.value}")
+            with timed_phase("status_write"):
+                if self.writer:
+                    await self.writer.submit_status(round_ref, status)
+                    logger.info(f"Round {round_ref} status update queued: {status.value}")
+                    return
+
+                async with async_session_factory() as session:
+                    if await MeetingRepository(session).update_round_status(round_ref, status):
+                        await session.commit()
+                        logger.info(f"Round {round_ref} status updated to: {status.value}")
         except Exception as e:
-            logger.error(f"Failed to update status for round {round_id}: {e}")
+            logger.error(f"Failed to update status for round {round_ref}: {e}")
 
 
 async def setup(bot):
@@ -0,0 +1,78 @@
+import logging
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import discord
+
+from config import settings
+from database.base import async_session_factory
+from database.repository import HistoryCursor, HistoryEntry, MeetingRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_history_page(
+    user_id: int, page_size: int, before: Optional[HistoryCursor] = None
+) -> Tuple[List[HistoryEntry], bool]:
+    """Returns: (entries, has_more). Reads one extra row to know if there is a next page."""
+    async with async_session_factory() as session:
+        repo = MeetingRepository(session)
+        entries = await repo.get_user_history(user_id, limit=page_size + 1, before=before)
+    return entries[:page_size], len(entries) > page_size
+
+
+def format_history_page(entries: List[HistoryEntry], first_index: int) -> str:
+    if first_index == 1:
+        title = f"**Your Last {len(entries)} Meetings:**"
+    else:
+        title = f"**Your Meetings {first_index}-{first_index + len(entries) - 1}:**"
+
+    header = f"{'No.':<4} | {'Date':<16} | {'Partner'}"
+    separator = "-" * (len(header) + 4)
+    lines = [
+        title,
+        "```",  # Start Code Block
+        header,
+        separator,
+    ]
+
+    local_tz = ZoneInfo(settings.TIMEZONE)
+
+    for idx, entry in enumerate(entries, first_index):
+        partner_name = entry.partner_name or "Unknown User"
+        date_str = entry.started_at.astimezone(local_tz).strftime("%d.%m.%Y %H:%M")  # Polish format
+        lines.append(f"{str(idx) + '.':<4} | {date_str:<16} | {partner_name}")
+
+    lines.append("```")  # End Code Block
+    return "\n".join(lines)
+
+
+class HistoryView(discord.ui.View):
+    """'Next page' button under a !history DM; pages with keyset cursors, never OFFSET."""
+
+    def __init__(self, user_id: int, page_size: int, entries: List[HistoryEntry], has_more: bool):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.page_size = page_size
+        self.next_index = len(entries) + 1
+        self.cursor = entries[-1].cursor
+        self.next_page.disabled = not has_more
+
+    @discord.ui.button(label="Next page", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("This is not your history.", ephemeral=True)
+            return
+
+        entries, has_more = await fetch_history_page(self.user_id, self.page_size, before=self.cursor)
+        if not entries:
+            button.disabled = True
+            await interaction.response.edit_message(view=self)
+            return
+
+        content = format_history_page(entries, self.next_index)
+        self.next_index += len(entries)
+        self.cursor = entries[-1].cursor
+        button.disabled = not has_more
+
+        await interaction.response.edit_message(content=content, view=self)
+        logger.info(f"Sent history page to {interaction.user} (from #{self.next_index - len(entries)})")
@@ -1,12 +1,45 @@
 from typing import List
 from pydantic_settings import BaseSettings
 
+from services.matching import MatchingEngine
+
 
 class Settings(BaseSettings):
     DISCORD_TOKEN: str
     ALLOWED_ROLE_ID: int
     ALLOWED_CHANNEL_IDS: List[int] = []
     TIMEZONE: str = "Europe/Warsaw"
+    HISTORY_PAGE_SIZE: int = 10
+    HISTORY_MAX_PAGE_SIZE: int = 25  # Keeps one page under Discord's 2000-character limit
+
+    MATCHMAKING_ENGINE: MatchingEngine = MatchingEngine.EXACT
+    MATCHMAKING_TIME_BUDGET_MS: int = 50
+    MATCHMAKING_EXECUTOR: str = "auto"  # auto (= process) | process | thread
+    MATCHMAKING_WORKERS: int = 2
+    MATCHMAKING_INLINE_MAX_USERS: int = 64
+    MATCHMAKING_SCHEDULE_BUDGET_MS: int = 200  # Time spent improving the plan of a !session
+    MATCHMAKING_PARTITION_SIZE: int = 200  # Largest cluster of the partitioned engine
+
+    HISTORY_CACHE_ENABLED: bool = True
+    HISTORY_CACHE_MAX_USERS: int = 5_000  # Per guild
+    HISTORY_CACHE_MAX_ENTRIES: int = 500_000  # Per guild, (user, partner) entries
+
+    DISCORD_API_CONCURRENCY: int = 5  # Concurrent channel REST calls per guild
+    CHANNEL_POOL_IDLE_MINUTES: int = 30  # Free session channels are deleted after this; 0 = after every round
+    MOVE_RATE_PER_SECOND: float = 10.0  # Member moves started per second per guild
+    MOVE_BURST: int = 10  # Member moves in flight at once per guild
+    SESSION_MAX_ROUNDS: int = 20  # Upper bound for !session <rounds>
+    SESSION_PREPARE_LEAD_SECONDS: int = 60  # Seconds before a !session round ends that the next one is prepared
+    SIGNAL_AUDIO_HOP: bool = False  # Also hop the bot through every session channel at the 30s warning
+
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_SPOOL_PATH: str = "data/round_spool.jsonl"
+    WRITE_BEHIND_BATCH_SIZE: int = 100
+    WRITE_BEHIND_DRAIN_TIMEOUT: float = 5.0  # Seconds to wait for queued writes before reading history
+
+    METRICS_ENABLED: bool = False  # Serve Prometheus metrics over HTTP
+    METRICS_HOST: str = "127.0.0.1"  # 0.0.0.0 to let a scraper in another container reach it
+    METRICS_PORT: int = 9108
 
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
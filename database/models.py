@@ -1,9 +1,9 @@
 import enum
-from sqlalchemy import Integer, String, DateTime, ForeignKey, BigInteger, Enum
+from sqlalchemy import CheckConstraint, Index, Integer, String, DateTime, ForeignKey, BigInteger, Enum
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from database.base import Base
 
@@ -28,6 +28,10 @@ class User(Base):
 
 class Round(Base):
     __tablename__ = "rounds"
+    __table_args__ = (
+        # Index-only lookup of started_at when joining from meetings
+        Index("ix_rounds_id_started_at", "id", postgresql_include=["started_at"]),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     guild_id: Mapped[int] = mapped_column(BigInteger, index=True)
@@ -36,6 +40,8 @@ class Round(Base):
     duration_minutes: Mapped[int] = mapped_column(Integer, default=5)
     round_number: Mapped[int] = mapped_column(Integer)
     status: Mapped[RoundStatus] = mapped_column(Enum(RoundStatus), default=RoundStatus.IN_PROGRESS, nullable=False)
+    # Client-generated key, known before the row is written (write-behind) and used for idempotent replays
+    ref: Mapped[Optional[str]] = mapped_column(String(32), unique=True, nullable=True)
 
     meetings: Mapped[List["Meeting"]] = relationship("Meeting", back_populates="round", cascade="all, delete-orphan")
 
@@ -45,10 +51,16 @@ class Round(Base):
 
 class Meeting(Base):
     __tablename__ = "meetings"
+    __table_args__ = (
+        # One index per side of "user_1_id = X OR user_2_id = X"; the included column keeps pair lookups index-only,
+        # and (round_id, id) is the history keyset, read newest first straight off the index
+        Index("ix_meetings_user_1_round", "user_1_id", "round_id", "id", postgresql_include=["user_2_id"]),
+        Index("ix_meetings_user_2_round", "user_2_id", "round_id", "id", postgresql_include=["user_1_id"]),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
-    round_id: Mapped[int] = mapped_column(ForeignKey("rounds.id"), nullable=False)
+    round_id: Mapped[int] = mapped_column(ForeignKey("rounds.id"), nullable=False, index=True)
 
     user_1_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     user_2_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -60,3 +72,18 @@ class Meeting(Base):
 
     def __repr__(self):
         return f"<Meeting(round={self.round_id}, u1={self.user_1_id}, u2={self.user_2_id})>"
+
+
+class PairLastMet(Base):
+    """Materialized latest meeting per pair, upserted together with every Meeting insert."""
+
+    __tablename__ = "pair_last_met"
+    __table_args__ = (CheckConstraint("user_low < user_high", name="ck_pair_last_met_order"),)
+
+    user_low: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    user_high: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True, index=True)
+    last_met_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    meet_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<PairLastMet({self.user_low}, {self.user_high}, last={self.last_met_at}, count={self.meet_count})>"
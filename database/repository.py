@@ -1,61 +1,209 @@
-from datetime import datetime, timezone
-from sqlalchemy import func, or_, select, and_
+from datetime import datetime
+from sqlalchemy import BigInteger, cast, func, select, and_, tuple_, union, union_all, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from typing import Dict, List, Tuple
-from database.models import Meeting, Round
+from typing import List, NamedTuple, Optional, Tuple
+from database.models import Meeting, PairLastMet, Round, RoundStatus, User
+from services.pair_history import PairHistory
+
+
+class HistoryEntry(NamedTuple):
+    meeting_id: int
+    round_id: int
+    partner_id: int
+    partner_name: Optional[str]
+    started_at: datetime
+
+    @property
+    def cursor(self) -> "HistoryCursor":
+        return self.round_id, self.meeting_id
+
+
+# (round_id, meeting_id): rounds are numbered in the order they start, and the meeting indexes cover both columns
+HistoryCursor = Tuple[int, int]
 
 
 class MeetingRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_past_meetings_with_time(self, user_ids: List[int]) -> Dict[Tuple[int, int], datetime]:
+    async def get_past_meetings_with_time(self, user_ids: List[int]) -> PairHistory:
         """
         Retrieves the timestamp of the *latest* meeting between any two users in the list.
-        Returns: Dictionary {(user_id_min, user_id_max): last_met_datetime}
+        Reads the materialized pair_last_met table (one primary key lookup per pair).
+        Returns: PairHistory with (user_id_min, user_id_max, last_met_epoch_seconds) entries
+        """
+        if not user_ids:
+            return PairHistory.empty()
+
+        stmt = select(
+            PairLastMet.user_low,
+            PairLastMet.user_high,
+            cast(func.extract("epoch", PairLastMet.last_met_at), BigInteger),
+        ).where(and_(PairLastMet.user_low.in_(user_ids), PairLastMet.user_high.in_(user_ids)))
+
+        result = await self.session.execute(stmt)
+        return PairHistory.from_rows(result.all())
+
+    async def get_full_history(self, user_ids: List[int]) -> PairHistory:
+        """
+        Retrieves every pair that involves at least one of the users (partners outside the list included).
+        Used to warm the per-guild history cache.
         """
         if not user_ids:
-            return {}
+            return PairHistory.empty()
+
+        columns = (
+            PairLastMet.user_low,
+            PairLastMet.user_high,
+            cast(func.extract("epoch", PairLastMet.last_met_at), BigInteger),
+        )
+        # Two index lookups (primary key and user_high) instead of an OR
+        stmt = union(
+            select(*columns).where(PairLastMet.user_low.in_(user_ids)),
+            select(*columns).where(PairLastMet.user_high.in_(user_ids)),
+        )
+
+        result = await self.session.execute(stmt)
+        return PairHistory.from_rows(result.all())
+
+    async def create_round(
+        self,
+        guild_id: int,
+        duration_minutes: int,
+        users: List[Tuple[int, str]],
+        pairs: List[Tuple[int, int]],
+        ref: str,
+        status: RoundStatus = RoundStatus.IN_PROGRESS,
+        started_at: Optional[datetime] = None,
+    ) -> Optional[int]:
+        """
+        Writes a whole round with a constant number of statements:
+        one users upsert, one round insert (RETURNING id), one meetings insert and one pair_last_met upsert.
+        :param users: List of (user_id, username) for every participant.
+        :param ref: Client-generated round key; a round with the same ref is never written twice.
+        :param started_at: When the round started, if it is written later (write-behind); defaults to now().
+        The caller commits. Returns: the new round id, or None if the ref already exists.
+        """
+        await self.upsert_users(users)
 
         stmt = (
-            select(Meeting.user_1_id, Meeting.user_2_id, func.max(Round.started_at))
-            .join(Round, Meeting.round_id == Round.id)
-            .where(and_(Meeting.user_1_id.in_(user_ids), Meeting.user_2_id.in_(user_ids)))
-            .group_by(Meeting.user_1_id, Meeting.user_2_id)
+            insert(Round)
+            .values(
+                guild_id=guild_id,
+                round_number=1,
+                duration_minutes=duration_minutes,
+                status=status,
+                ref=ref,
+                started_at=started_at or func.now(),
+            )
+            .on_conflict_do_nothing(index_elements=[Round.ref])
+            .returning(Round.id)
         )
+        round_id = (await self.session.execute(stmt)).scalar_one_or_none()
+
+        if round_id is not None:
+            await self.add_meetings(round_id, pairs, met_at=started_at)
+        return round_id
+
+    async def add_round_meetings(
+        self,
+        ref: str,
+        users: List[Tuple[int, str]],
+        pairs: List[Tuple[int, int]],
+        met_at: Optional[datetime] = None,
+    ) -> bool:
+        """
+        Adds meetings to a round that is already written, e.g. pairs formed again in the middle of a round.
+        Pairs already recorded for the round are skipped, so writing the same meetings again (a write-behind
+        replay) changes nothing.
+        :param users: List of (user_id, username) for every user in the pairs.
+        :param met_at: When the pairs were formed, if they are written later (write-behind); defaults to now().
+        The caller commits. Returns: False if there is no round with this ref.
+        """
+        round_id = (await self.session.execute(select(Round.id).where(Round.ref == ref))).scalar_one_or_none()
+        if round_id is None:
+            return False
+
+        recorded = await self.session.execute(
+            select(Meeting.user_1_id, Meeting.user_2_id).where(Meeting.round_id == round_id)
+        )
+        known = {(min(u1, u2), max(u1, u2)) for u1, u2 in recorded.all()}
+        pairs = [(u1, u2) for u1, u2 in pairs if (min(u1, u2), max(u1, u2)) not in known]
+
+        await self.upsert_users(users)
+        await self.add_meetings(round_id, pairs, met_at=met_at)
+        return True
 
+    async def upsert_users(self, users: List[Tuple[int, str]]):
+        if not users:
+            return
+        stmt = insert(User).values([{"id": uid, "username": name} for uid, name in users])
+        stmt = stmt.on_conflict_do_update(index_elements=[User.id], set_={"username": stmt.excluded.username})
+        await self.session.execute(stmt)
+
+    async def update_round_status(self, ref: str, status: RoundStatus) -> bool:
+        """The caller commits. Returns: False if there is no round with this ref."""
+        stmt = update(Round).where(Round.ref == ref).values(status=status)
         result = await self.session.execute(stmt)
-        rows = result.all()
+        return result.rowcount > 0
 
-        history_map = {}
-        for u1, u2, last_met in rows:
-            # Store lower ID first so (A, B) equals (B, A)
-            pair_key = tuple(sorted((u1, u2)))
+    async def add_meetings(self, round_id: int, pairs: List[Tuple[int, int]], met_at: Optional[datetime] = None):
+        """
+        Adds the meetings of a round and upserts pair_last_met in the same transaction.
+        :param met_at: When the pairs met; defaults to now().
+        The caller commits.
+        """
+        if not pairs:
+            return
 
-            if last_met.tzinfo is None:
-                last_met = last_met.replace(tzinfo=timezone.utc)
+        await self.session.execute(
+            insert(Meeting).values([{"round_id": round_id, "user_1_id": u1, "user_2_id": u2} for u1, u2 in pairs])
+        )
 
-            if pair_key not in history_map:
-                history_map[pair_key] = last_met
+        # now() is the transaction start time, the same value a round written in it got as started_at
+        last_met_at = met_at or func.now()
+        rows = [{"user_low": min(u1, u2), "user_high": max(u1, u2), "last_met_at": last_met_at} for u1, u2 in pairs]
+        stmt = insert(PairLastMet).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PairLastMet.user_low, PairLastMet.user_high],
+            set_={
+                "last_met_at": func.greatest(PairLastMet.last_met_at, stmt.excluded.last_met_at),
+                "meet_count": PairLastMet.meet_count + 1,
+            },
+        )
+        await self.session.execute(stmt)
 
-        return history_map
+    async def get_user_history(
+        self, user_id: int, limit: int = 10, before: Optional[HistoryCursor] = None
+    ) -> List[HistoryEntry]:
+        """
+        One page of the user's meetings, newest first, as (meeting_id, round_id, partner_id, partner_name, started_at).
+        Keyset pagination: pass the cursor of the last entry of the previous page as `before`.
+        """
+        # Each side of the OR is its own ordered, limited query so both can walk their (user, round_id, id) index;
+        # started_at is only looked up for the rows that make the page
+        sides = []
+        for own_column, partner_column in (
+            (Meeting.user_1_id, Meeting.user_2_id),
+            (Meeting.user_2_id, Meeting.user_1_id),
+        ):
+            side = select(Meeting.id.label("meeting_id"), Meeting.round_id, partner_column.label("partner_id")).where(
+                own_column == user_id
+            )
+            if before is not None:
+                side = side.where(tuple_(Meeting.round_id, Meeting.id) < tuple_(*before))
+            side = side.order_by(Meeting.round_id.desc(), Meeting.id.desc()).limit(limit)
+            sides.append(select(side.subquery()))  # A subquery keeps the ORDER BY/LIMIT its own inside the UNION
+        recent = union_all(*sides).subquery()
 
-    async def get_user_history(self, user_id: int, limit: int = 10) -> List[Meeting]:
         stmt = (
-            select(Meeting)
-            .join(Round, Meeting.round_id == Round.id)
-            .options(selectinload(Meeting.round), selectinload(Meeting.user_1), selectinload(Meeting.user_2))
-            .where(or_(Meeting.user_1_id == user_id, Meeting.user_2_id == user_id))
-            .order_by(Round.started_at.desc())
+            select(recent.c.meeting_id, recent.c.round_id, recent.c.partner_id, User.username, Round.started_at)
+            .join(Round, Round.id == recent.c.round_id)
+            .outerjoin(User, User.id == recent.c.partner_id)
+            .order_by(recent.c.round_id.desc(), recent.c.meeting_id.desc())
             .limit(limit)
         )
 
         result = await self.session.execute(stmt)
-        meetings = result.scalars().all()
-
-        for meeting in meetings:
-            if meeting.round.started_at.tzinfo is None:
-                meeting.round.started_at = meeting.round.started_at.replace(tzinfo=timezone.utc)
-
-        return meetings
+        return [HistoryEntry(*row) for row in result.all()]
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import DataError, IntegrityError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import RoundStatus
+from database.repository import MeetingRepository
+
+logger = logging.getLogger(__name__)
+
+# Errors that will not go away by retrying the same job
+PERMANENT_ERRORS = (DataError, IntegrityError, ProgrammingError)
+
+
+class RoundWriter:
+    """
+    Write-behind queue for round writes.
+    Jobs are queued in submit order, appended (fsync'ed) to a local spool file and written to Postgres
+    in batches by a single consumer, so they land in order. Jobs carry the time they were submitted, so rounds
+    and meetings keep their own timestamps however late they are written. After each commit an ack record is appended;
+    on start every job without an ack is replayed. Every job is idempotent: round inserts are keyed by Round.ref,
+    meetings already recorded for their round are skipped, and a status update just sets the status again.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        spool_path: str,
+        batch_size: int = 100,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        self.session_factory = session_factory
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._next_seq = 1
+        self._spool = None
+        self._spool_lock = asyncio.Lock()
+        self._pending_appends = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        pending, last_seq = await loop.run_in_executor(None, self._read_spool)
+
+        # Numbers continue after everything in the spool, acks included: a stale ack left by a crash
+        # during compaction must never cover a new job
+        self._next_seq = last_seq + 1
+        if pending:
+            logger.warning(f"Write-behind: replaying {len(pending)} unacknowledged job(s) from {self.spool_path}")
+            for job in pending:
+                self._queue.put_nowait(job)
+
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+        if not pending:
+            await loop.run_in_executor(None, self._truncate)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Flushes what it can within the timeout; anything left stays in the spool for the next start."""
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Write-behind: stopping with {self._queue.qsize()} job(s) still queued.")
+
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+
+    async def drain(self):
+        """Waits until every job submitted so far is committed."""
+        await self._queue.join()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def submit_round(
+        self, guild_id: int, duration_minutes: int, users: List[Tuple[int, str]], pairs: List[Tuple[int, int]]
+    ) -> str:
+        """Queues a new round with its users and meetings. Returns: the round ref."""
+        ref = uuid.uuid4().hex
+        await self._submit(
+            {
+                "kind": "round",
+                "ref": ref,
+                "guild_id": guild_id,
+                "duration_minutes": duration_minutes,
+                "users": users,
+                "pairs": pairs,
+                "started_at": time.time(),
+            }
+        )
+        return ref
+
+    async def submit_meetings(self, ref: str, users: List[Tuple[int, str]], pairs: List[Tuple[int, int]]):
+        """Queues meetings for a round submitted earlier; they are written after it."""
+        await self._submit({"kind": "meetings", "ref": ref, "users": users, "pairs": pairs, "met_at": time.time()})
+
+    async def submit_status(self, ref: str, status: RoundStatus):
+        await self._submit({"kind": "status", "ref": ref, "status": status.value})
+
+    async def _submit(self, job: Dict[str, Any]):
+        job["seq"] = self._next_seq
+        self._next_seq += 1
+
+        # Queue first so submit order is the write order; the job is durable once the append returns
+        self._queue.put_nowait(job)
+        await self._append(job)
+
+    # --- Consumer ---
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            await self._write_with_retry(batch)
+            await self._append({"ack": batch[-1]["seq"]})
+
+            for _ in batch:
+                self._queue.task_done()
+
+            if self._queue.empty():
+                await self._compact()
+
+    async def _write_with_retry(self, batch: List[Dict[str, Any]]):
+        delay = self.retry_delay
+        while True:
+            try:
+                await self._write(batch)
+                return
+            except PERMANENT_ERRORS:
+                if len(batch) > 1:
+                    # Isolate the bad job so the rest of the batch still lands, in order
+                    for job in batch:
+                        await self._write_with_retry([job])
+                    return
+                logger.error(f"Write-behind: dropping job {batch[0]} after a permanent error.", exc_info=True)
+                return
+            except Exception as e:
+                logger.warning(f"Write-behind: batch of {len(batch)} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        async with self.session_factory() as session:
+            repo = MeetingRepository(session)
+            for job in batch:
+                if job["kind"] == "round":
+                    await repo.create_round(
+                        guild_id=job["guild_id"],
+                        duration_minutes=job["duration_minutes"],
+                        users=[tuple(u) for u in job["users"]],
+                        pairs=[tuple(p) for p in job["pairs"]],
+                        ref=job["ref"],
+                        started_at=_from_epoch(job.get("started_at")),
+                    )
+                elif job["kind"] == "meetings":
+                    written = await repo.add_round_meetings(
+                        job["ref"],
+                        users=[tuple(u) for u in job["users"]],
+                        pairs=[tuple(p) for p in job["pairs"]],
+                        met_at=_from_epoch(job.get("met_at")),
+                    )
+                    if not written:
+                        logger.warning(
+                            f"Write-behind: round {job['ref']} not found, dropping {len(job['pairs'])} meeting(s)."
+                        )
+                elif job["kind"] == "status":
+                    await repo.update_round_status(job["ref"], RoundStatus(job["status"]))
+            await session.commit()
+
+        logger.info(f"Write-behind: committed {len(batch)} job(s) up to #{batch[-1]['seq']}")
+
+    # --- Spool file ---
+
+    async def _append(self, record: Dict[str, Any]):
+        self._pending_appends += 1
+        try:
+            async with self._spool_lock:
+                line = json.dumps(record) + "\n"
+                await asyncio.get_running_loop().run_in_executor(None, self._write_line, line)
+        finally:
+            self._pending_appends -= 1
+
+    def _write_line(self, line: str):
+        self._spool.write(line)
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    async def _compact(self):
+        """Everything is acknowledged: start the spool from scratch."""
+        async with self._spool_lock:
+            if self._queue.empty() and not self._pending_appends:
+                await asyncio.get_running_loop().run_in_executor(None, self._truncate)
+
+    def _truncate(self):
+        self._spool.truncate(0)
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _read_spool(self) -> Tuple[List[Dict[str, Any]], int]:
+        """Returns: (jobs without an ack, in order; highest seq or ack found)."""
+        directory = os.path.dirname(self.spool_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.spool_path):
+            return [], 0
+
+        jobs: Dict[int, Dict[str, Any]] = {}
+        acked = 0
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line after a crash
+                if "ack" in record:
+                    acked = max(acked, record["ack"])
+                else:
+                    jobs[record["seq"]] = record
+
+        last_seq = max(acked, max(jobs, default=0))
+        return [jobs[seq] for seq in sorted(jobs) if seq > acked], last_seq
+
+
+def _from_epoch(epoch: Optional[float]) -> Optional[datetime]:
+    # Jobs spooled before timestamps were added have none; those are stamped when written
+    return datetime.fromtimestamp(epoch, timezone.utc) if epoch is not None else None
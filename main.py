@@ -4,7 +4,9 @@ import discord
 from discord.ext import commands
 from config import settings
 
+from database.base import engine
 from logger_config import setup_logging
+from services.metrics import DB_POOL_CONNECTIONS, REGISTRY, MetricsServer
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -23,10 +25,29 @@ async def on_ready():
     logger.info("------")
 
 
+def watch_db_pool():
+    """Pool usage is read when scraped, so nothing is recorded per query."""
+    pool = engine.pool
+    DB_POOL_CONNECTIONS.set_function(pool.size, state="size")
+    DB_POOL_CONNECTIONS.set_function(pool.checkedout, state="checked_out")
+    DB_POOL_CONNECTIONS.set_function(pool.checkedin, state="idle")
+    DB_POOL_CONNECTIONS.set_function(lambda: max(0, pool.overflow()), state="overflow")
+
+
 async def main():
-    async with bot:
-        await bot.load_extension("bot.cogs.session_cog")
-        await bot.start(settings.DISCORD_TOKEN)
+    metrics_server = None
+    if settings.METRICS_ENABLED:
+        watch_db_pool()
+        metrics_server = MetricsServer(REGISTRY)
+        await metrics_server.start(settings.METRICS_HOST, settings.METRICS_PORT)
+
+    try:
+        async with bot:
+            await bot.load_extension("bot.cogs.session_cog")
+            await bot.start(settings.DISCORD_TOKEN)
+    finally:
+        if metrics_server:
+            await metrics_server.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from services.pair_history import PairHistory
+
+# Loads the *complete* pair history of the given users (every partner, not only lobby members)
+HistoryLoader = Callable[[List[int]], Awaitable[PairHistory]]
+
+
+class PairHistoryCache:
+    """
+    Guild-scoped in-memory pair history: user_id -> {partner_id: last_met_epoch}.
+    A cached user always holds their full history, so the history of any lobby made of cached
+    users can be answered without the database. Bounded by an LRU over users.
+    """
+
+    def __init__(self, max_users: int = 5_000, max_entries: int = 500_000):
+        """
+        :param max_users: Maximum number of cached users.
+        :param max_entries: Maximum number of cached (user, partner) entries; each pair is stored twice.
+        """
+        self.max_users = max_users
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._users: "OrderedDict[int, Dict[int, int]]" = OrderedDict()
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "users": len(self._users), "entries": self._entries}
+
+    async def get_history(self, user_ids: List[int], loader: HistoryLoader) -> PairHistory:
+        """History among user_ids; only users that are not cached yet are read through loader."""
+        known: Dict[int, Dict[int, int]] = {}
+        missing = []
+        for uid in user_ids:
+            partners = self._users.get(uid)
+            if partners is None:
+                missing.append(uid)
+            else:
+                self._users.move_to_end(uid)
+                known[uid] = partners
+
+        self.hits += len(known)
+        self.misses += len(missing)
+
+        if missing:
+            loaded = self._split_by_user(missing, await loader(missing))
+            known.update(loaded)
+            for uid, partners in loaded.items():
+                self._store(uid, partners)
+
+        lobby = set(user_ids)
+        rows = [
+            (uid, partner, last_met)
+            for uid, partners in known.items()
+            for partner, last_met in partners.items()
+            if uid < partner and partner in lobby
+        ]
+        return PairHistory.from_rows(rows)
+
+    def record(self, pairs: Iterable[Tuple[int, int]], last_met: int):
+        """Write-through for new meetings. Uncached users are skipped; they will be loaded in full later."""
+        for u1, u2 in pairs:
+            for uid, partner in ((u1, u2), (u2, u1)):
+                partners = self._users.get(uid)
+                if partners is None:
+                    continue
+                if partner not in partners:
+                    self._entries += 1
+                partners[partner] = max(last_met, partners.get(partner, last_met))
+
+        self._evict()
+
+    def invalidate(self, user_ids: Iterable[int]):
+        for uid in user_ids:
+            partners = self._users.pop(uid, None)
+            if partners is not None:
+                self._entries -= len(partners)
+
+    def clear(self):
+        self._users.clear()
+        self._entries = 0
+
+    @staticmethod
+    def _split_by_user(user_ids: List[int], history: PairHistory) -> Dict[int, Dict[int, int]]:
+        result: Dict[int, Dict[int, int]] = {uid: {} for uid in user_ids}
+        for low, high, last_met in history.pairs():
+            if low in result:
+                result[low][high] = last_met
+            if high in result:
+                result[high][low] = last_met
+        return result
+
+    def _store(self, user_id: int, partners: Dict[int, int]):
+        self.invalidate([user_id])
+        self._users[user_id] = partners
+        self._entries += len(partners)
+        self._evict()
+
+    def _evict(self):
+        while self._users and (len(self._users) > self.max_users or self._entries > self.max_entries):
+            _, partners = self._users.popitem(last=False)
+            self._entries -= len(partners)
@@ -0,0 +1,441 @@
+import enum
+import time
+import networkx as nx
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+IndexPairs = List[Tuple[int, int]]
+
+WEIGHT_NEVER_MET = 1_000_000_000  # ~31 years
+
+# Leftovers of the sparse engine above this size are solved approximately
+SPARSE_EXACT_LIMIT = 200
+
+# Pairs per 2-opt call of the anytime engine; one call on this many pairs takes a few milliseconds
+ANYTIME_BLOCK = 256
+
+# The partitioned engine finds groups by each user's most recent meetings only, which keeps community
+# detection fast on long histories; the most recent meetings are also the most expensive repeats.
+PARTITION_RECENT_MEETINGS = 16
+
+
+class MatchingEngine(str, enum.Enum):
+    EXACT = "exact"
+    GREEDY = "greedy"
+    ANYTIME = "anytime"
+    SPARSE = "sparse"
+    PARTITIONED = "partitioned"
+
+
+def exact_matching(weights: np.ndarray) -> IndexPairs:
+    """Exact max-weight matching (blossom), roughly cubic in the number of users."""
+    n = weights.shape[0]
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+
+    rows, cols = np.triu_indices(n, k=1)
+    graph.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights[rows, cols].tolist()))
+
+    matching = nx.max_weight_matching(graph, maxcardinality=True)
+    return [tuple(sorted(pair)) for pair in matching]
+
+
+def greedy_matching(weights: np.ndarray) -> IndexPairs:
+    """Takes the heaviest remaining edge until everyone (but at most one) is paired."""
+    n = weights.shape[0]
+    rows, cols = np.triu_indices(n, k=1)
+    order = np.argsort(-weights[rows, cols], kind="stable")
+
+    free = np.ones(n, dtype=bool)
+    pairs = []
+    needed = n // 2
+
+    for i, j in zip(rows[order].tolist(), cols[order].tolist()):
+        if free[i] and free[j]:
+            free[i] = free[j] = False
+            pairs.append((i, j))
+            if len(pairs) == needed:
+                break
+
+    return pairs
+
+
+def best_partner_matching(weights: np.ndarray, deadline: Optional[float] = None) -> IndexPairs:
+    """
+    Greedy start for the anytime engine: users with the fewest good options pick first and take their
+    heaviest free partner, one vectorised row at a time. Past the deadline everyone left is paired in order,
+    so the result is always complete.
+    """
+    n = weights.shape[0]
+    free = np.ones(n, dtype=bool)
+    pairs = []
+    # Fewest partners at the heaviest weight first (e.g. most history)
+    order = np.argsort((weights == weights.max(initial=0)).sum(axis=1), kind="stable").tolist()
+
+    for k, u in enumerate(order):
+        if not free[u]:
+            continue
+        if deadline is not None and time.perf_counter() >= deadline:
+            rest = [v for v in order[k:] if free[v]]
+            pairs += [(rest[i], rest[i + 1]) for i in range(0, len(rest) - 1, 2)]
+            break
+        free[u] = False
+        row = np.where(free, weights[u], -1)
+        v = int(row.argmax())
+        if row[v] < 0:
+            break  # u is the last one left
+        free[v] = False
+        pairs.append((min(u, v), max(u, v)))
+
+    return pairs
+
+
+def two_opt(weights: np.ndarray, pairs: IndexPairs, deadline: Optional[float] = None) -> IndexPairs:
+    """
+    Local improvement: for every two pairs (a, b), (c, d) try (a, c), (b, d) and (a, d), (b, c).
+    Applies the best non-overlapping swaps per pass until no swap helps or the deadline passes.
+    """
+    n = weights.shape[0]
+    if n % 2:
+        # A zero-weight dummy lets the unmatched user trade places with someone
+        padded = np.zeros((n + 1, n + 1), dtype=weights.dtype)
+        padded[:n, :n] = weights
+        matched = {u for pair in pairs for u in pair}
+        loner = next(u for u in range(n) if u not in matched)
+        improved = two_opt(padded, pairs + [(loner, n)], deadline)
+        return [pair for pair in improved if n not in pair]
+
+    if len(pairs) < 2:
+        return pairs
+
+    a = np.array([p[0] for p in pairs], dtype=np.intp)
+    b = np.array([p[1] for p in pairs], dtype=np.intp)
+
+    while deadline is None or time.perf_counter() < deadline:
+        current = weights[a, b]
+        base = current[:, None] + current[None, :]
+        gain_cross = weights[a[:, None], a[None, :]] + weights[b[:, None], b[None, :]] - base
+        gain_swap = weights[a[:, None], b[None, :]] + weights[b[:, None], a[None, :]] - base
+        gain = np.triu(np.maximum(gain_cross, gain_swap), k=1)
+
+        candidates = np.argwhere(gain > 0)
+        if candidates.size == 0:
+            break
+
+        touched = np.zeros(len(a), dtype=bool)
+        order = np.argsort(-gain[candidates[:, 0], candidates[:, 1]], kind="stable")
+        for p, q in candidates[order].tolist():
+            if touched[p] or touched[q]:
+                continue
+            touched[p] = touched[q] = True
+            bp, aq, bq = b[p], a[q], b[q]
+            if gain_cross[p, q] >= gain_swap[p, q]:
+                b[p], a[q] = aq, bp
+            else:
+                b[p], b[q] = bq, bp
+
+    return list(zip(a.tolist(), b.tolist()))
+
+
+def anytime_matching(weights: np.ndarray, budget_ms: float, seed: int = 0) -> IndexPairs:
+    """
+    Best-partner greedy + 2-opt, then perturb-and-reoptimize until the time budget is spent.
+    2-opt works on blocks of ANYTIME_BLOCK pairs, so the work between two deadline checks stays small
+    however large the lobby. Always returns the best (complete) matching found so far.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    rng = np.random.default_rng(seed)
+    n = weights.shape[0]
+    best = best_partner_matching(weights, deadline)
+    matched = {u for pair in best for u in pair}
+    loner = next((u for u in range(n) if u not in matched), None)
+
+    # Sweeps over random blocks until one sweep finds nothing
+    while time.perf_counter() < deadline:
+        before = matching_weight(weights, best)
+        order = rng.permutation(len(best)).tolist()
+        for start in range(0, len(order), ANYTIME_BLOCK):
+            if time.perf_counter() >= deadline:
+                break
+            block_loner = loner if start == 0 else None
+            new_loner = _two_opt_block(weights, best, order[start : start + ANYTIME_BLOCK], deadline, block_loner)
+            if start == 0:
+                loner = new_loner
+        if matching_weight(weights, best) <= before:
+            break
+
+    best_weight = matching_weight(weights, best)
+    upper_bound = (n // 2) * int(weights.max(initial=0))
+    while len(best) >= 4 and best_weight < upper_bound and time.perf_counter() < deadline:
+        # Re-pair a random handful of pairs among themselves and polish them with the rest of a block
+        block = rng.choice(len(best), size=min(ANYTIME_BLOCK, len(best)), replace=False).tolist()
+        users = rng.permutation([u for k in block[:4] for u in best[k]])
+        candidate = list(best)
+        for i, k in enumerate(block[:4]):
+            candidate[k] = (int(users[2 * i]), int(users[2 * i + 1]))
+
+        candidate_loner = _two_opt_block(weights, candidate, block, deadline, loner)
+        candidate_weight = matching_weight(weights, candidate)
+        if candidate_weight > best_weight:
+            best, best_weight, loner = candidate, candidate_weight, candidate_loner
+
+    return best
+
+
+def _two_opt_block(
+    weights: np.ndarray, pairs: IndexPairs, block: List[int], deadline: float, loner: Optional[int] = None
+) -> Optional[int]:
+    """
+    2-opt on the pairs at the positions in `block` (plus the unmatched user, if given), on their own
+    submatrix. Updates `pairs` in place. Returns: the unmatched user afterwards.
+    """
+    users = [u for k in block for u in pairs[k]] + ([loner] if loner is not None else [])
+    idx = np.asarray(users, dtype=np.intp)
+    improved = two_opt(weights[np.ix_(idx, idx)], [(2 * i, 2 * i + 1) for i in range(len(block))], deadline)
+    for k, (a, b) in zip(block, improved):
+        pairs[k] = (int(idx[a]), int(idx[b]))
+
+    if loner is None:
+        return None
+    matched = {i for pair in improved for i in pair}
+    return int(idx[next(i for i in range(len(users)) if i not in matched)])
+
+
+def repair_matching(weights: np.ndarray, kept: IndexPairs, loose: List[int]) -> IndexPairs:
+    """
+    The pairs in `kept` stay, the loose users are matched among themselves, then 2-opt lets
+    the new pairs trade partners with the kept ones.
+    """
+    loose_idx = np.asarray(sorted(loose), dtype=np.intp)
+    local = weights[np.ix_(loose_idx, loose_idx)]
+    if len(loose_idx) <= SPARSE_EXACT_LIMIT:
+        local_pairs = exact_matching(local)
+    else:
+        local_pairs = two_opt(local, greedy_matching(local))
+
+    pairs = list(kept) + [(int(loose_idx[a]), int(loose_idx[b])) for a, b in local_pairs]
+    return two_opt(weights, pairs)
+
+
+def partition_users(n: int, pair_idx: np.ndarray, ages: np.ndarray, size: int, seed: int = 0) -> List[List[int]]:
+    """
+    Splits the users into balanced clusters of at most `size` for the partitioned engine.
+    Louvain communities of the history graph are groups that have mostly met already, so each community
+    is dealt out across all clusters: people inside a cluster mostly never met, and so can be paired there.
+    """
+    k = -(-n // size)
+    if k <= 1:
+        return [list(range(n))]
+
+    # Rank every user's meetings from the most recent; an edge stays if it ranks high for either end
+    ends = pair_idx.T.ravel()
+    edges = np.tile(np.arange(len(pair_idx)), 2)
+    order = np.lexsort((np.tile(ages, 2), ends))
+    rank = np.arange(len(order)) - np.searchsorted(ends[order], ends[order])
+    recent = np.unique(edges[order][rank < PARTITION_RECENT_MEETINGS])
+
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+    graph.add_edges_from(pair_idx[recent].tolist())
+    communities = sorted(nx.community.louvain_communities(graph, seed=seed), key=len, reverse=True)
+
+    dealt = [u for community in communities for u in sorted(community)]
+    return [dealt[c::k] for c in range(k)]
+
+
+def partitioned_matching(weights: np.ndarray, clusters: List[List[int]]) -> IndexPairs:
+    """
+    Exact matching inside every cluster, then the boundary repair: users left over by odd clusters
+    are matched across clusters, and 2-opt lets pairs of different clusters trade partners.
+    """
+    pairs: IndexPairs = []
+    for members in clusters:
+        idx = np.asarray(members, dtype=np.intp)
+        pairs += [(int(idx[a]), int(idx[b])) for a, b in exact_matching(weights[np.ix_(idx, idx)])]
+
+    matched = {u for pair in pairs for u in pair}
+    return repair_matching(weights, pairs, [u for u in range(weights.shape[0]) if u not in matched])
+
+
+def round_robin(n: int) -> List[IndexPairs]:
+    """Circle method for an even n: n - 1 rounds of n / 2 pairs in which every pair meets exactly once."""
+    others = list(range(n - 1))
+    rounds = []
+    for r in range(n - 1):
+        rotated = others[r:] + others[:r]
+        rounds.append([(rotated[0], n - 1)] + [(rotated[k], rotated[n - 1 - k]) for k in range(1, n // 2)])
+    return rounds
+
+
+def plan_rounds(weights: np.ndarray, rounds: int, budget_ms: float = 200, seed: int = 0) -> List[IndexPairs]:
+    """
+    Several rounds at once, no pair meeting twice: a round-robin whose first round is the best single
+    matching, relabeled by hill climbing on the total weight of all rounds, then each round is polished
+    by 2-opt where pairs of the other rounds are ruled out.
+    With an odd n a dummy takes part; whoever is paired with it sits the round out.
+    """
+    n = weights.shape[0]
+    m = n + n % 2
+    padded = np.zeros((m, m), dtype=weights.dtype)
+    padded[:n, :n] = weights
+    rounds = min(rounds, m - 1)
+    if rounds < 1 or n < 2:
+        return []
+
+    # Positions of every pair; round 0 is (k, m - 1 - k)
+    positions = np.asarray(round_robin(m)[:rounds], dtype=np.intp)
+    first = exact_matching(padded) if m <= SPARSE_EXACT_LIMIT else two_opt(padded, greedy_matching(padded))
+    labels = np.empty(m, dtype=np.intp)
+    for k, (a, b) in enumerate(first):
+        labels[k], labels[m - 1 - k] = a, b
+
+    def score() -> int:
+        return int(padded[labels[positions[..., 0]], labels[positions[..., 1]]].sum())
+
+    # Swapping two users' positions changes which pairs the later rounds get
+    deadline = time.perf_counter() + budget_ms / 1000
+    rng = np.random.default_rng(seed)
+    best = score()
+    upper_bound = rounds * (n // 2) * int(weights.max(initial=0))
+    while rounds > 1 and best < upper_bound and time.perf_counter() < deadline:
+        i, j = rng.choice(m, size=2, replace=False)
+        labels[i], labels[j] = labels[j], labels[i]
+        candidate = score()
+        if candidate >= best:
+            best = candidate
+        else:
+            labels[i], labels[j] = labels[j], labels[i]
+
+    # A pair of another round costs more than any swap can gain, so 2-opt never brings one in
+    forbidden = -2 * int(padded.max()) - 1
+    plan = [[(int(labels[a]), int(labels[b])) for a, b in pairs] for pairs in positions.tolist()]
+    for r in range(rounds):
+        local = padded.copy()
+        for q, pairs in enumerate(plan):
+            for a, b in pairs:
+                if q != r and a < n and b < n:  # Sitting out twice is not a meeting
+                    local[a, b] = local[b, a] = forbidden
+        plan[r] = two_opt(local, plan[r])
+
+    return [[pair for pair in pairs if n not in pair] for pairs in plan]
+
+
+def matching_weight(weights: np.ndarray, pairs: IndexPairs) -> int:
+    if not pairs:
+        return 0
+    idx = np.asarray(pairs, dtype=np.intp)
+    return int(weights[idx[:, 0], idx[:, 1]].sum())
+
+
+def sparse_matching(n: int, pair_idx: np.ndarray, ages: np.ndarray) -> IndexPairs:
+    """
+    Matching on the history graph only: "never met" is the implicit default, so memory and
+    time scale with the number of historical pairs instead of n^2.
+
+    1. Users with the most history pick first and take the first free user they have not met.
+    2. Users left without such a partner are solved on a small dense matrix (history weighted).
+    3. Repeated pairs from step 2 are swapped with never-met pairs where both new pairs are fresh.
+    If no user ends up in step 2, every pair is a first meeting, which is optimal.
+    """
+    met: List[Dict[int, int]] = [{} for _ in range(n)]
+    for (i, j), age in zip(pair_idx.tolist(), ages.tolist()):
+        met[i][j] = age
+        met[j][i] = age
+
+    order = sorted(range(n), key=lambda u: len(met[u]), reverse=True)
+    free = dict.fromkeys(order)  # Insertion-ordered set
+    pairs: IndexPairs = []
+    leftovers: List[int] = []
+
+    for u in order:
+        if u not in free:
+            continue
+        del free[u]
+        partner = next((v for v in free if v not in met[u]), None)
+        if partner is None:
+            leftovers.append(u)
+            continue
+        del free[partner]
+        pairs.append((u, partner))
+
+    if len(leftovers) < 2:
+        return pairs
+
+    # Everyone left over has met all other free users; weigh repeats by age
+    local = np.full((len(leftovers), len(leftovers)), WEIGHT_NEVER_MET, dtype=np.int64)
+    for a, u in enumerate(leftovers):
+        for b, v in enumerate(leftovers):
+            local[a, b] = 0 if a == b else met[u].get(v, WEIGHT_NEVER_MET)
+
+    if len(leftovers) <= SPARSE_EXACT_LIMIT:
+        local_pairs = exact_matching(local)
+    else:
+        local_pairs = two_opt(local, greedy_matching(local))
+
+    paired = set()
+    for a, b in local_pairs:
+        pairs.append((leftovers[a], leftovers[b]))
+        paired.update((leftovers[a], leftovers[b]))
+    loner = next((u for u in leftovers if u not in paired), None)
+
+    return _repair_repeats(pairs, loner, met)
+
+
+def _repair_repeats(
+    pairs: IndexPairs, loner: Optional[int], met: List[Dict[int, int]], max_passes: int = 10
+) -> IndexPairs:
+    """2-opt restricted to repeated pairs: each one is tried against every other pair (and the loner)."""
+
+    def weight(x: int, y: int) -> int:
+        return met[x].get(y, WEIGHT_NEVER_MET)
+
+    for _ in range(max_passes):
+        improved = False
+        for k in range(len(pairs)):
+            u, v = pairs[k]
+            if v not in met[u]:
+                continue
+
+            current = weight(u, v)
+            best_gain, best_move = 0, None
+
+            if loner is not None:
+                for stay, leave in ((u, v), (v, u)):
+                    gain = weight(stay, loner) - current
+                    if gain > best_gain:
+                        best_gain, best_move = gain, ((stay, loner), None, leave)
+
+            for q, (a, b) in enumerate(pairs):
+                if q == k:
+                    continue
+                base = current + weight(a, b)
+                for x, y in ((a, b), (b, a)):
+                    gain = weight(u, x) + weight(v, y) - base
+                    if gain > best_gain:
+                        best_gain, best_move = gain, ((u, x), (q, (v, y)), None)
+
+            if best_move is None:
+                continue
+
+            new_pair, other, new_loner = best_move
+            pairs[k] = new_pair
+            if other is not None:
+                q, replacement = other
+                pairs[q] = replacement
+            else:
+                loner = new_loner
+            improved = True
+
+        if not improved:
+            break
+
+    return pairs
+
+
+def sparse_matching_weight(pairs: IndexPairs, pair_idx: np.ndarray, ages: np.ndarray) -> int:
+    """matching_weight without a dense matrix."""
+    history = {(i, j): age for (i, j), age in zip(pair_idx.tolist(), ages.tolist())}
+    total = 0
+    for i, j in pairs:
+        total += history.get((i, j), history.get((j, i), WEIGHT_NEVER_MET))
+    return total
@@ -1,52 +1,456 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-import networkx as nx
-from typing import Dict, List, Tuple
+import time
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Set, Tuple, Union
+
+from services.matching import (
+    SPARSE_EXACT_LIMIT,
+    WEIGHT_NEVER_MET,
+    MatchingEngine,
+    anytime_matching,
+    exact_matching,
+    greedy_matching,
+    matching_weight,
+    partition_users,
+    partitioned_matching,
+    plan_rounds,
+    repair_matching,
+    sparse_matching,
+    sparse_matching_weight,
+    two_opt,
+)
+from services.pair_history import PairHistory
+
+History = Union[PairHistory, Dict[Tuple[int, int], datetime]]
+
+
+@dataclass
+class MatchResult:
+    pairs: List[Tuple[int, int]]
+    unmatched: List[int]
+    engine: MatchingEngine
+    total_weight: int
+    elapsed_ms: float
+    optimal_weight: Optional[int] = None  # Only known for EXACT or small lobbies
+    scheduled: bool = False  # Served from a plan made by plan_schedule
+
+    @property
+    def optimality_gap(self) -> Optional[float]:
+        """Relative distance from the exact optimum (0.0 = optimal)."""
+        if self.optimal_weight is None:
+            return None
+        if self.optimal_weight == 0:
+            return 0.0
+        return (self.optimal_weight - self.total_weight) / self.optimal_weight
+
+
+@dataclass
+class SchedulePlan:
+    """Pairs for several rounds, planned together so that nobody meets twice."""
+
+    user_ids: List[int]
+    rounds: List[List[Tuple[int, int]]]  # User id pairs, lower id first
+    ages: Dict[Tuple[int, int], int]  # (lower id, higher id) -> seconds since they met, when planned
+    elapsed_ms: float
+    planned: Set[Tuple[int, int]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.planned = {pair for pairs in self.rounds for pair in pairs}
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def weight(self, u: int, v: int) -> int:
+        """Like the matching weights, with every pair of the plan counted as just met."""
+        pair = (min(u, v), max(u, v))
+        if pair in self.planned:
+            return 1
+        return self.ages.get(pair, WEIGHT_NEVER_MET)
 
 
 class MatchmakerService:
+    def __init__(
+        self,
+        engine: MatchingEngine = MatchingEngine.EXACT,
+        time_budget_ms: float = 50,
+        gap_check_limit: int = 60,
+        executor: str = "auto",
+        workers: int = 2,
+        inline_max_users: int = 64,
+        schedule_budget_ms: float = 200,
+        partition_size: int = 200,
+    ):
+        """
+        :param engine: Default engine used by create_pairs/match.
+        :param time_budget_ms: Time budget for the ANYTIME engine.
+        :param gap_check_limit: Lobbies up to this size are also solved exactly to report the optimality gap.
+        :param executor: Worker pool for match_async: "process", "thread" or "auto" (a process pool; every engine
+            runs Python loops that hold the GIL, so in a thread they would still stall the event loop).
+        :param workers: Worker pool size.
+        :param inline_max_users: Lobbies up to this size are solved inline by match_async.
+        :param schedule_budget_ms: Time plan_schedule spends improving the assignment of rounds.
+        :param partition_size: Largest cluster of the PARTITIONED engine; every cluster is solved exactly.
+        """
+        self.engine = engine
+        self.time_budget_ms = time_budget_ms
+        self.gap_check_limit = gap_check_limit
+        self.executor = executor
+        self.workers = workers
+        self.inline_max_users = inline_max_users
+        self.schedule_budget_ms = schedule_budget_ms
+        self.partition_size = partition_size
+        self._executors: Dict[str, Executor] = {}
+        self._schedules: Dict[Hashable, SchedulePlan] = {}
+
     def create_pairs(
-        self, user_ids: List[int], history_map: Dict[Tuple[int, int], datetime]
+        self, user_ids: List[int], history: History
     ) -> Tuple[List[Tuple[int, int]], List[int]]:
         """
         Generates optimal pairs.
-        :param history_map: Dict {(u1, u2): last_met_timestamp}.
+        :param history: PairHistory, or legacy Dict {(u1, u2): last_met_timestamp}.
         Returns: (pairs, unmatched_users)
         """
+        result = self.match(user_ids, history)
+        return result.pairs, result.unmatched
+
+    def match(
+        self,
+        user_ids: List[int],
+        history: History,
+        engine: Optional[MatchingEngine] = None,
+    ) -> MatchResult:
+        """Same as create_pairs, but also reports the engine used and the solution quality."""
+        engine = engine or self.engine
+
         if len(user_ids) < 2:
-            return [], user_ids
+            return MatchResult([], list(user_ids), engine, 0, 0.0, 0)
+
+        pair_idx, ages = self.compact_history(user_ids, history)
+        solution = solve_compact(
+            len(user_ids), pair_idx, ages, engine, self.time_budget_ms, self.gap_check_limit, self.partition_size
+        )
+        return self._to_result(user_ids, engine, solution)
+
+    async def match_async(
+        self,
+        user_ids: List[int],
+        history: History,
+        engine: Optional[MatchingEngine] = None,
+    ) -> MatchResult:
+        """
+        Like match, but runs the solver in a worker pool so the event loop is never blocked.
+        Lobbies up to inline_max_users are solved inline, where pool overhead would dominate.
+        The PARTITIONED engine solves its clusters side by side, one pool task each.
+        """
+        engine = engine or self.engine
+
+        if len(user_ids) <= self.inline_max_users:
+            return self.match(user_ids, history, engine)
+
+        # Only integer arrays cross the process boundary
+        pair_idx, ages = self.compact_history(user_ids, history)
+        loop = asyncio.get_running_loop()
+        if engine == MatchingEngine.PARTITIONED:
+            solution = await self._solve_partitioned(len(user_ids), pair_idx, ages)
+        else:
+            solution = await loop.run_in_executor(
+                self._get_executor(),
+                solve_compact,
+                len(user_ids),
+                pair_idx,
+                ages,
+                engine,
+                self.time_budget_ms,
+                self.gap_check_limit,
+                self.partition_size,
+            )
+        return self._to_result(user_ids, engine, solution)
+
+    def forget(self, key: Hashable):
+        """Drops the schedule kept under this key."""
+        self._schedules.pop(key, None)
+
+    def plan_schedule(
+        self, user_ids: List[int], history: History, rounds: int, key: Optional[Hashable] = None
+    ) -> SchedulePlan:
+        """
+        Plans `rounds` rounds at once (at most n - 1, or n for an odd lobby, where someone else sits out
+        each round) without any pair meeting twice. With a key the plan is kept for scheduled_round().
+        """
+        started = time.perf_counter()
+        pair_idx, ages = self.compact_history(user_ids, history)
+        index_rounds = build_schedule(len(user_ids), pair_idx, ages, rounds, self.schedule_budget_ms)
+        return self._keep_schedule(key, user_ids, index_rounds, pair_idx, ages, started)
+
+    async def plan_schedule_async(
+        self, user_ids: List[int], history: History, rounds: int, key: Optional[Hashable] = None
+    ) -> SchedulePlan:
+        """Like plan_schedule, in the worker pool for lobbies above inline_max_users."""
+        if len(user_ids) <= self.inline_max_users:
+            return self.plan_schedule(user_ids, history, rounds, key)
+
+        started = time.perf_counter()
+        pair_idx, ages = self.compact_history(user_ids, history)
+        index_rounds = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(),
+            build_schedule,
+            len(user_ids),
+            pair_idx,
+            ages,
+            rounds,
+            self.schedule_budget_ms,
+        )
+        return self._keep_schedule(key, user_ids, index_rounds, pair_idx, ages, started)
+
+    def scheduled_round(self, key: Hashable, index: int, user_ids: List[int]) -> Optional[MatchResult]:
+        """
+        Round `index` of the plan kept under key, fitted to who is there: planned pairs with both people
+        present stay, everyone else (partner gone, or not in the plan) is matched among themselves.
+        No history read and, unless the roster changed, no solve. Returns: None if there is no such round.
+        """
+        plan = self._schedules.get(key)
+        if plan is None or not 0 <= index < len(plan):
+            return None
+
+        started = time.perf_counter()
+        present = set(user_ids)
+        pairs = [(u, v) for u, v in plan.rounds[index] if u in present and v in present]
+        paired = {u for pair in pairs for u in pair}
+        leftovers = [u for u in user_ids if u not in paired]
+
+        if len(leftovers) >= 2:
+            local = np.array([[0 if u == v else plan.weight(u, v) for v in leftovers] for u in leftovers])
+            if len(leftovers) <= SPARSE_EXACT_LIMIT:
+                local_pairs = exact_matching(local)
+            else:
+                local_pairs = two_opt(local, greedy_matching(local))
+            pairs += [tuple(sorted((leftovers[a], leftovers[b]))) for a, b in local_pairs]
+            paired.update(u for pair in pairs for u in pair)
 
-        graph = nx.Graph()
-        graph.add_nodes_from(user_ids)
+        unmatched = [u for u in user_ids if u not in paired]
+        total_weight = sum(plan.ages.get(pair, WEIGHT_NEVER_MET) for pair in pairs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return MatchResult(pairs, unmatched, self.engine, total_weight, elapsed_ms, scheduled=True)
 
-        WEIGHT_NEVER_MET = 1_000_000_000  # ~31 years
-        now = datetime.now(timezone.utc)
+    def shutdown(self):
+        """Stops the worker pools (if any were started)."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
 
-        for i in range(len(user_ids)):
-            for j in range(i + 1, len(user_ids)):
-                u1 = user_ids[i]
-                u2 = user_ids[j]
+    def _get_executor(self) -> Executor:
+        kind = self.executor
+        if kind == "auto":
+            # Even GREEDY and ANYTIME spend most of their time in Python loops holding the GIL
+            # (their NumPy calls are on small slices), so only a process keeps the event loop responsive.
+            # Small lobbies never get here; they are solved inline.
+            kind = "process"
 
-                # Check if this pair has met before
-                pair_key = tuple(sorted((u1, u2)))
-                if pair_key in history_map:
-                    last_met = history_map[pair_key]
-                    delta = (now - last_met).total_seconds()
-                    weight = max(1, int(delta))
-                else:
-                    weight = WEIGHT_NEVER_MET
+        if kind not in self._executors:
+            if kind == "process":
+                self._executors[kind] = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executors[kind] = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="matchmaker")
 
-                graph.add_edge(u1, u2, weight=weight)
+        return self._executors[kind]
 
-        matching = nx.max_weight_matching(graph, maxcardinality=True)
+    async def _solve_partitioned(self, n: int, pair_idx: np.ndarray, ages: np.ndarray) -> "CompactSolution":
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        clusters = await loop.run_in_executor(executor, partition_users, n, pair_idx, ages, self.partition_size)
+        solved = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, solve_cluster, members, *cluster_history(n, members, pair_idx, ages))
+                for members in clusters
+            )
+        )
+        # Boundary repair: users left over by odd clusters are matched across clusters, then 2-opt
+        pairs = [pair for cluster_pairs in solved for pair in cluster_pairs]
+        matched = {u for pair in pairs for u in pair}
+        loners = [u for u in range(n) if u not in matched]
+        index_pairs, total_weight, optimal_weight, _ = await loop.run_in_executor(
+            executor, solve_repair, n, pair_idx, ages, pairs, loners, self.gap_check_limit
+        )
+        return index_pairs, total_weight, optimal_weight, (time.perf_counter() - started) * 1000
+
+    def _keep_schedule(
+        self,
+        key: Optional[Hashable],
+        user_ids: List[int],
+        index_rounds: List[List[Tuple[int, int]]],
+        pair_idx: np.ndarray,
+        ages: np.ndarray,
+        started: float,
+    ) -> SchedulePlan:
+        rounds = [[tuple(sorted((user_ids[i], user_ids[j]))) for i, j in pairs] for pairs in index_rounds]
+        known = {
+            tuple(sorted((user_ids[i], user_ids[j]))): age for (i, j), age in zip(pair_idx.tolist(), ages.tolist())
+        }
+        plan = SchedulePlan(list(user_ids), rounds, known, (time.perf_counter() - started) * 1000)
+        if key is not None:
+            self._schedules[key] = plan
+        return plan
+
+    @staticmethod
+    def _to_result(user_ids: List[int], engine: MatchingEngine, solution: "CompactSolution") -> MatchResult:
+        index_pairs, total_weight, optimal_weight, elapsed_ms = solution
 
         pairs = []
         matched_users = set()
 
-        for u1, u2 in matching:
+        for i, j in index_pairs.tolist():
+            u1, u2 = user_ids[i], user_ids[j]
             pairs.append(tuple(sorted((u1, u2))))
             matched_users.add(u1)
             matched_users.add(u2)
 
         unmatched = [u for u in user_ids if u not in matched_users]
 
-        return pairs, unmatched
+        return MatchResult(pairs, unmatched, engine, total_weight, elapsed_ms, optimal_weight)
+
+    @staticmethod
+    def compact_history(
+        user_ids: List[int], history: History, now: datetime = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Converts the history into two arrays: (h x 2) int32 matrix indices and int64 ages in seconds (at least 1).
+        Pairs with users outside the lobby are dropped.
+        """
+        if isinstance(history, dict):
+            history = PairHistory.from_mapping(history)
+
+        n = len(user_ids)
+        if n < 2 or not len(history):
+            return np.empty((0, 2), dtype=np.int32), np.empty(0, dtype=np.int64)
+
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+
+        ids = np.asarray(user_ids, dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+
+        keys = np.column_stack((history.user_low, history.user_high))
+
+        # Map user IDs to matrix indices
+        pos = np.searchsorted(sorted_ids, keys)
+        pos = np.minimum(pos, n - 1)
+        present = (sorted_ids[pos] == keys).all(axis=1)
+        pair_idx = order[pos[present]].astype(np.int32)
+        ages = np.maximum(1, (now_ts - history.last_met[present]).astype(np.int64))
+
+        return pair_idx, ages
+
+    @classmethod
+    def build_weight_matrix(
+        cls, user_ids: List[int], history: History, now: datetime = None
+    ) -> np.ndarray:
+        """
+        Builds a symmetric (n x n) int64 weight matrix indexed by position in user_ids.
+        Pairs that never met get WEIGHT_NEVER_MET, the rest get their age in seconds (at least 1).
+        """
+        pair_idx, ages = cls.compact_history(user_ids, history, now)
+        return weights_from_compact(len(user_ids), pair_idx, ages)
+
+
+# (index_pairs, total_weight, optimal_weight, elapsed_ms)
+CompactSolution = Tuple[np.ndarray, int, Optional[int], float]
+
+
+def weights_from_compact(n: int, pair_idx: np.ndarray, ages: np.ndarray) -> np.ndarray:
+    weights = np.full((n, n), WEIGHT_NEVER_MET, dtype=np.int64)
+    np.fill_diagonal(weights, 0)
+    weights[pair_idx[:, 0], pair_idx[:, 1]] = ages
+    weights[pair_idx[:, 1], pair_idx[:, 0]] = ages
+    return weights
+
+
+def build_schedule(
+    n: int, pair_idx: np.ndarray, ages: np.ndarray, rounds: int, budget_ms: float
+) -> List[List[Tuple[int, int]]]:
+    """plan_rounds on compact history; module level so it can run in a worker process."""
+    return plan_rounds(weights_from_compact(n, pair_idx, ages), rounds, budget_ms)
+
+
+def cluster_history(
+    n: int, members: List[int], pair_idx: np.ndarray, ages: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The part of a compact history with both users in `members`, indexed by position in `members`."""
+    position = np.full(n, -1, dtype=np.int32)
+    position[members] = np.arange(len(members), dtype=np.int32)
+    local = position[pair_idx]
+    inside = (local >= 0).all(axis=1)
+    return local[inside], ages[inside]
+
+
+def solve_cluster(members: List[int], pair_idx: np.ndarray, ages: np.ndarray) -> List[Tuple[int, int]]:
+    """Exact matching of one cluster of the PARTITIONED engine, in lobby indices; runs in a worker process."""
+    local = exact_matching(weights_from_compact(len(members), pair_idx, ages))
+    return [(members[a], members[b]) for a, b in local]
+
+
+def solve_repair(
+    n: int,
+    pair_idx: np.ndarray,
+    ages: np.ndarray,
+    kept: List[Tuple[int, int]],
+    loose: List[int],
+    gap_check_limit: int,
+) -> CompactSolution:
+    """
+    Boundary repair of the PARTITIONED engine, with the cluster pairs kept; like solve_compact,
+    safe to run in a worker process.
+    """
+    started = time.perf_counter()
+    weights = weights_from_compact(n, pair_idx, ages)
+    index_pairs = repair_matching(weights, kept, loose)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    total_weight = matching_weight(weights, index_pairs)
+
+    optimal_weight = None
+    if n <= gap_check_limit:
+        optimal_weight = matching_weight(weights, exact_matching(weights))
+
+    return np.asarray(index_pairs, dtype=np.int32).reshape(-1, 2), total_weight, optimal_weight, elapsed_ms
+
+
+def solve_compact(
+    n: int,
+    pair_idx: np.ndarray,
+    ages: np.ndarray,
+    engine: MatchingEngine,
+    time_budget_ms: float,
+    gap_check_limit: int,
+    partition_size: int = 200,
+) -> CompactSolution:
+    """Solver entry point; module level so it can run in a worker process. Timing includes building the graph."""
+    started = time.perf_counter()
+    if engine == MatchingEngine.SPARSE:
+        index_pairs = sparse_matching(n, pair_idx, ages)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        total_weight = sparse_matching_weight(index_pairs, pair_idx, ages)
+    else:
+        weights = weights_from_compact(n, pair_idx, ages)
+        if engine == MatchingEngine.GREEDY:
+            index_pairs = two_opt(weights, greedy_matching(weights))
+        elif engine == MatchingEngine.ANYTIME:
+            index_pairs = anytime_matching(weights, time_budget_ms)
+        elif engine == MatchingEngine.PARTITIONED:
+            index_pairs = partitioned_matching(weights, partition_users(n, pair_idx, ages, partition_size))
+        else:
+            index_pairs = exact_matching(weights)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        total_weight = matching_weight(weights, index_pairs)
+
+    optimal_weight = None
+    if engine == MatchingEngine.EXACT:
+        optimal_weight = total_weight
+    elif n <= gap_check_limit:
+        dense = weights_from_compact(n, pair_idx, ages)
+        optimal_weight = matching_weight(dense, exact_matching(dense))
+
+    return np.asarray(index_pairs, dtype=np.int32).reshape(-1, 2), total_weight, optimal_weight, elapsed_ms
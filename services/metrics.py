@@ -0,0 +1,261 @@
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds; teardown of a large round is paced by the move rate and can take minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """A value that is set, or read from a function when scraped (costs nothing in between)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelKey, Union[float, Callable[[], float]]] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        self._values[self._key(labels)] = function
+
+    def value(self, **labels) -> Optional[float]:
+        value = self._values.get(self._key(labels))
+        return value() if callable(value) else value
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in list(self._values.items()):
+            if callable(value):
+                try:
+                    value = value()
+                except Exception as e:
+                    logger.warning(f"Metrics: could not read {self.name}: {e}")
+                    continue
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelKey, List[int]] = {}  # Per bucket (not cumulative), last one is +Inf
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def _samples(self) -> Iterator[str]:
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(self._sums[key])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Metrics in the Prometheus text format. Recording is a dict lookup and an addition, done on
+    the event loop (not thread-safe), so it is cheap enough to leave on whether or not anyone scrapes.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class MetricsServer:
+    """Serves GET /metrics of a registry over plain HTTP/1.0 for Prometheus to scrape."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, registry: MetricsRegistry, read_timeout: float = 5.0):
+        self.registry = registry
+        self.read_timeout = read_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def port(self) -> Optional[int]:
+        """The bound port (useful after starting on port 0)."""
+        if not self._server or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"Metrics: serving http://{host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=self.read_timeout)
+            method, path, *_ = request.split(b"\r\n", 1)[0].split(b" ")
+            if method == b"GET" and path.split(b"?", 1)[0] == b"/metrics":
+                status, content_type, body = "200 OK", self.CONTENT_TYPE, self.registry.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+
+            head = f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n"
+            writer.write(head.encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass  # Not a well-formed request; nothing to answer
+        except ConnectionError:
+            pass  # The scraper went away
+        finally:
+            writer.close()
+
+
+REGISTRY = MetricsRegistry()
+
+ROUND_PHASE_SECONDS = REGISTRY.histogram(
+    "friendify_round_phase_seconds",
+    "Duration of one phase of a round: history_read, matchmaking, provisioning, moves, switch, teardown, "
+    "status_write.",
+    ["phase"],
+)
+ROUND_PHASE_FAILURES = REGISTRY.counter(
+    "friendify_round_phase_failures_total", "Round phases that raised or could not complete.", ["phase"]
+)
+DISCORD_CALL_SECONDS = REGISTRY.histogram(
+    "friendify_discord_call_seconds",
+    "Latency of one Discord REST call: create_channel, grant_permissions, reset_permissions, delete_channel, "
+    "move_member.",
+    ["call"],
+)
+MEMBER_MOVES = REGISTRY.counter(
+    "friendify_member_moves_total", "Member moves by outcome: moved, skipped, failed, cancelled.", ["outcome"]
+)
+MEMBER_MOVE_RETRIES = REGISTRY.counter("friendify_member_move_retries_total", "Transient move failures re-queued.")
+ROUND_STATUS_WRITES = REGISTRY.counter(
+    "friendify_round_status_writes_total", "Round status updates by new status.", ["status"]
+)
+ACTIVE_ROUNDS = REGISTRY.gauge("friendify_active_rounds", "Rounds and sessions running across all guilds.")
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "friendify_db_pool_connections", "Database pool connections: size, checked_out, idle, overflow.", ["state"]
+)
+
+
+@contextmanager
+def timed_phase(phase: str):
+    """Observes the duration of the block in ROUND_PHASE_SECONDS, and counts it as failed if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ROUND_PHASE_FAILURES.inc(phase=phase)
+        raise
+    finally:
+        ROUND_PHASE_SECONDS.observe(time.perf_counter() - started, phase=phase)
@@ -0,0 +1,299 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+import discord
+
+from services.metrics import DISCORD_CALL_SECONDS, MEMBER_MOVE_RETRIES, MEMBER_MOVES
+from services.rate_limit import is_transient, retry_after_of
+
+logger = logging.getLogger(__name__)
+
+VoiceTarget = Union[discord.VoiceChannel, discord.StageChannel]
+# Called with (done, total) while a batch is moving
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+# Called once per member as soon as its move is settled, with the error if it failed
+MoveCallback = Callable[[discord.Member, Optional[Exception]], None]
+
+
+class MovePriority(IntEnum):
+    """Lower goes first. Retried moves queue behind every first attempt of the same priority."""
+
+    PAIR = 0
+    RETURN = 1
+    BULK = 2
+
+
+class TokenBucket:
+    """`rate` tokens per second, bursts of up to `capacity`. pause() empties the bucket until a deadline."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+class MoveReport:
+    def __init__(self, total: int):
+        self.total = total
+        self.moved = 0
+        self.skipped = 0  # Not connected to voice or already in the target channel
+        self.failed: List[Tuple[discord.Member, Exception]] = []
+        self.elapsed = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.moved + self.skipped + len(self.failed)
+
+    @classmethod
+    def combine(cls, reports: Sequence["MoveReport"]) -> "MoveReport":
+        """One report for batches that ran side by side."""
+        combined = cls(sum(r.total for r in reports))
+        for report in reports:
+            combined.moved += report.moved
+            combined.skipped += report.skipped
+            combined.failed.extend(report.failed)
+            combined.elapsed = max(combined.elapsed, report.elapsed)
+        return combined
+
+    def __str__(self):
+        return (
+            f"{self.moved}/{self.total} moved in {self.elapsed:.2f}s "
+            f"({self.skipped} skipped, {len(self.failed)} failed)"
+        )
+
+
+class _Move:
+    __slots__ = ("member", "channel", "priority", "attempt", "future")
+
+    def __init__(self, member: discord.Member, channel: VoiceTarget, priority: MovePriority, future: asyncio.Future):
+        self.member = member
+        self.channel = channel
+        self.priority = priority
+        self.attempt = 0
+        self.future = future
+
+
+class MoveScheduler:
+    """
+    Per-guild queue for member moves. Workers take moves by priority, pace them with a token bucket,
+    pause the bucket on 429 and re-queue transient failures (429, 5xx) with jittered backoff.
+    A failed move is reported, never raised, so one member cannot abort a whole batch.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 10,
+        workers: int = 10,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        progress_interval: float = 1.0,
+    ):
+        """
+        :param rate: Moves started per second.
+        :param burst: Moves that may start at once after an idle period.
+        :param progress_interval: Minimum seconds between two progress callbacks of a batch.
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.worker_count = max(1, workers)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.progress_interval = progress_interval
+        self.retries = 0
+
+        self._heap: List[Tuple[int, int, int, _Move]] = []
+        self._seq = itertools.count()
+        self._ready: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+        self._retrying: Set[asyncio.Task] = set()
+        self._in_flight: Dict[int, asyncio.Event] = {}  # Member id -> set when their current move is over
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    async def move(
+        self,
+        moves: Sequence[Tuple[discord.Member, VoiceTarget]],
+        priority: MovePriority = MovePriority.BULK,
+        progress: Optional[ProgressCallback] = None,
+        on_moved: Optional[MoveCallback] = None,
+    ) -> MoveReport:
+        """Queues the moves and waits for all of them. Returns: what happened to each one."""
+        report = MoveReport(len(moves))
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        self._start_workers()
+
+        futures = []
+        for member, channel in moves:
+            move = _Move(member, channel, priority, loop.create_future())
+            futures.append(move.future)
+            await self._push(move)
+
+        last_progress = 0.0
+        try:
+            for future in asyncio.as_completed(futures):
+                member, error, skipped = await future
+                if skipped:
+                    report.skipped += 1
+                elif error is None:
+                    report.moved += 1
+                else:
+                    report.failed.append((member, error))
+                if on_moved:
+                    on_moved(member, error)
+
+                now = time.monotonic()
+                if progress and report.done < report.total and now - last_progress >= self.progress_interval:
+                    last_progress = now
+                    await self._report_progress(progress, report)
+        except asyncio.CancelledError:
+            # Withdraw what has not started, so a cancelled batch cannot move anyone later
+            for future in futures:
+                future.cancel()
+            raise
+
+        report.elapsed = time.perf_counter() - started
+        if progress:
+            await self._report_progress(progress, report)
+        return report
+
+    async def close(self):
+        tasks = self._workers + list(self._retrying)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+
+        for *_, move in self._heap:
+            self._settle(move, asyncio.CancelledError())
+        self._heap = []
+
+    def _start_workers(self):
+        self._workers = [task for task in self._workers if not task.done()]
+        if self._ready is None:
+            self._ready = asyncio.Condition()
+        while len(self._workers) < self.worker_count:
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def _push(self, move: _Move):
+        async with self._ready:
+            heapq.heappush(self._heap, (move.priority, move.attempt, next(self._seq), move))
+            self._ready.notify()
+
+    async def _work(self):
+        while True:
+            async with self._ready:
+                await self._ready.wait_for(lambda: bool(self._heap))
+                *_, move = heapq.heappop(self._heap)
+
+            if move.future.done():
+                continue  # Withdrawn
+
+            # One move per member at a time; a later move must not overtake one in flight
+            while move.member.id in self._in_flight:
+                await self._in_flight[move.member.id].wait()
+            in_flight = self._in_flight[move.member.id] = asyncio.Event()
+
+            try:
+                await self._execute(move)
+            finally:
+                del self._in_flight[move.member.id]
+                in_flight.set()
+
+    async def _execute(self, move: _Move):
+        if move.future.done():
+            return
+        voice = move.member.voice
+        if not voice or (voice.channel and voice.channel.id == move.channel.id):
+            # Not connected, or already there (checked now, not when queued)
+            self._settle(move, None, skipped=True)
+            return
+
+        await self.bucket.acquire()
+        started = time.perf_counter()
+        try:
+            await move.member.move_to(move.channel)
+        except asyncio.CancelledError:
+            self._settle(move, asyncio.CancelledError())
+            raise
+        except Exception as e:
+            DISCORD_CALL_SECONDS.observe(time.perf_counter() - started, call="move_member")
+            await self._on_error(move, e)
+        else:
+            DISCORD_CALL_SECONDS.observe(time.perf_counter() - started, call="move_member")
+            self._settle(move, None)
+
+    @staticmethod
+    def _settle(move: _Move, error: Optional[BaseException], skipped: bool = False):
+        if not move.future.done():
+            move.future.set_result((move.member, error, skipped))
+            if skipped:
+                MEMBER_MOVES.inc(outcome="skipped")
+            elif error is None:
+                MEMBER_MOVES.inc(outcome="moved")
+            else:
+                MEMBER_MOVES.inc(outcome="cancelled" if isinstance(error, asyncio.CancelledError) else "failed")
+
+    async def _on_error(self, move: _Move, error: Exception):
+        retry_after = retry_after_of(error)
+        if retry_after is not None:
+            self.bucket.pause(retry_after)
+
+        if not is_transient(error) or move.attempt >= self.max_retries:
+            logger.warning(f"Failed to move {move.member} to {move.channel}: {error}")
+            self._settle(move, error)
+            return
+
+        move.attempt += 1
+        self.retries += 1
+        MEMBER_MOVE_RETRIES.inc()
+        delay = retry_after if retry_after is not None else self.base_delay * 2 ** (move.attempt - 1)
+
+        async def requeue():
+            try:
+                await asyncio.sleep(delay + random.uniform(0, self.base_delay))
+            except asyncio.CancelledError:
+                self._settle(move, error)
+                raise
+            await self._push(move)
+
+        # The worker moves on; the retry waits out its backoff, then queues behind first attempts
+        task = asyncio.create_task(requeue())
+        self._retrying.add(task)
+        task.add_done_callback(self._retrying.discard)
+
+    @staticmethod
+    async def _report_progress(progress: ProgressCallback, report: MoveReport):
+        try:
+            await progress(report.done, report.total)
+        except Exception as e:
+            logger.warning(f"Move progress callback failed: {e}")
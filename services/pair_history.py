@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+import itertools
+import numpy as np
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+
+class PairHistory:
+    """
+    Compact pair history: parallel int64 arrays (user_low, user_high, last_met epoch seconds).
+    user_low < user_high for every entry, so (A, B) and (B, A) are the same pair.
+    """
+
+    __slots__ = ("user_low", "user_high", "last_met", "_index")
+
+    def __init__(self, user_low: np.ndarray, user_high: np.ndarray, last_met: np.ndarray):
+        self.user_low = user_low
+        self.user_high = user_high
+        self.last_met = last_met
+        self._index: Optional[Dict[Tuple[int, int], int]] = None
+
+    @classmethod
+    def empty(cls) -> "PairHistory":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[int, int, int]]) -> "PairHistory":
+        """Builds the history from (user_low, user_high, last_met_epoch) rows without per-row objects."""
+        if not rows:
+            return cls.empty()
+
+        flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows))
+        flat = flat.reshape(-1, 3)
+        return cls(flat[:, 0].copy(), flat[:, 1].copy(), flat[:, 2].copy())
+
+    @classmethod
+    def from_mapping(cls, history_map: Dict[Tuple[int, int], datetime]) -> "PairHistory":
+        """Converts the legacy {(u1, u2): last_met_datetime} format."""
+        if not history_map:
+            return cls.empty()
+
+        keys = np.fromiter((u for pair in history_map for u in pair), dtype=np.int64, count=2 * len(history_map))
+        keys = keys.reshape(-1, 2)
+        last_met = np.fromiter(
+            (int(dt.timestamp()) for dt in history_map.values()), dtype=np.int64, count=len(history_map)
+        )
+        return cls(keys.min(axis=1), keys.max(axis=1), last_met)
+
+    def __len__(self) -> int:
+        return len(self.last_met)
+
+    def __contains__(self, pair: Tuple[int, int]) -> bool:
+        return self.get(*pair) is not None
+
+    def get(self, user_a: int, user_b: int) -> Optional[int]:
+        """Last meeting of the pair as epoch seconds, or None if they never met. O(1) after the first call."""
+        if self._index is None:
+            self._index = {
+                key: i for i, key in enumerate(zip(self.user_low.tolist(), self.user_high.tolist()))
+            }
+
+        i = self._index.get((user_a, user_b) if user_a < user_b else (user_b, user_a))
+        return None if i is None else int(self.last_met[i])
+
+    def get_datetime(self, user_a: int, user_b: int) -> Optional[datetime]:
+        epoch = self.get(user_a, user_b)
+        return None if epoch is None else datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+    def pairs(self) -> Iterable[Tuple[int, int, int]]:
+        return zip(self.user_low.tolist(), self.user_high.tolist(), self.last_met.tolist())
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+import discord
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def retry_after_of(error: Exception) -> Optional[float]:
+    """Seconds to wait if the error is a rate limit, else None."""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        headers = getattr(error.response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", 1.0))
+        except (TypeError, ValueError):
+            return 1.0
+    return None
+
+
+def is_transient(error: Exception) -> bool:
+    return isinstance(error, discord.HTTPException) and (error.status == 429 or error.status >= 500)
+
+
+class AdaptiveLimiter:
+    """
+    Runs Discord REST calls concurrently, at most `limit` at a time.
+    discord.py already waits on its own (private) rate-limit buckets; this adds a shared back-off:
+    a 429 pauses every caller for Retry-After and halves the concurrency, successes grow it back (AIMD).
+    Transient errors (429, 5xx) are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, limit: int = 5, max_retries: int = 3, base_delay: float = 0.5):
+        self.max_limit = max(1, limit)
+        self.limit = self.max_limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.rate_limited = 0
+        self.retries = 0
+
+        self._active = 0
+        self._paused_until = 0.0
+        self._cond = asyncio.Condition()
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """:param call: Factory creating a fresh awaitable for every attempt."""
+        attempt = 0
+        while True:
+            await self._acquire()
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                # Give the slot back even if the caller is cancelled again meanwhile
+                await asyncio.shield(self._release(success=False))
+                raise
+            except Exception as e:
+                await self._release(success=False)
+                retry_after = retry_after_of(e)
+                if retry_after is not None:
+                    self._on_rate_limit(retry_after)
+                if not is_transient(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                delay = retry_after if retry_after is not None else self.base_delay * 2 ** (attempt - 1)
+                await asyncio.sleep(delay + random.uniform(0, self.base_delay))
+            else:
+                await self._release(success=True)
+                return result
+
+    def _on_rate_limit(self, retry_after: float):
+        self.rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self.limit = max(1, self.limit // 2)
+        logger.warning(f"Rate limited: pausing {retry_after:.2f}s, concurrency -> {self.limit}")
+
+    async def _acquire(self):
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            async with self._cond:
+                await self._cond.wait_for(lambda: self._active < self.limit)
+                if self._paused_until <= time.monotonic():
+                    self._active += 1
+                    return
+
+    async def _release(self, success: bool):
+        async with self._cond:
+            self._active -= 1
+            if success and self.limit < self.max_limit:
+                self.limit += 1
+            self._cond.notify_all()
@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, List, Optional
+import discord
+
+
+class VoiceRoster:
+    """
+    Live membership of the voice channels a guild's rounds care about (the lobby and session channels).
+    A channel is scanned once when it is first watched; after that it is kept current from
+    voice state updates, so reading who is where never walks the guild's member list.
+    """
+
+    def __init__(self):
+        self._watched: Dict[int, discord.abc.GuildChannel] = {}
+        self._channels: Dict[int, Dict[int, discord.Member]] = {}  # Channel id -> {member id: member}
+
+    def watch(self, channel: discord.abc.GuildChannel):
+        if channel.id not in self._channels:
+            self._watched[channel.id] = channel
+            self._channels[channel.id] = {m.id: m for m in channel.members}
+
+    def unwatch(self, channel_id: int):
+        self._watched.pop(channel_id, None)
+        self._channels.pop(channel_id, None)
+
+    def retain(self, channel_ids: Iterable[int]):
+        """Stops watching every channel except these."""
+        keep = set(channel_ids)
+        for channel_id in [cid for cid in self._channels if cid not in keep]:
+            self.unwatch(channel_id)
+
+    def resync(self):
+        """Re-reads every watched channel, e.g. after a reconnect in which events may have been missed."""
+        for channel_id, channel in self._watched.items():
+            self._channels[channel_id] = {m.id: m for m in channel.members}
+
+    def is_watched(self, channel_id: int) -> bool:
+        return channel_id in self._channels
+
+    def members(self, channel_id: int) -> List[discord.Member]:
+        return list(self._channels.get(channel_id, {}).values())
+
+    def count(self, channel_id: int) -> int:
+        return len(self._channels.get(channel_id, ()))
+
+    def contains(self, channel_id: int, member_id: int) -> bool:
+        return member_id in self._channels.get(channel_id, ())
+
+    def update(
+        self,
+        member: discord.Member,
+        before: Optional[discord.abc.GuildChannel],
+        after: Optional[discord.abc.GuildChannel],
+    ) -> bool:
+        """Applies one voice state change. Returns: True if a watched channel changed."""
+        changed = False
+        if before and before.id in self._channels:
+            changed = self._channels[before.id].pop(member.id, None) is not None
+        if after and after.id in self._channels:
+            self._channels[after.id][member.id] = member
+            changed = True
+        return changed
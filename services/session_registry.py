@@ -0,0 +1,111 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Coroutine, Dict, Iterator, List, Optional, Tuple
+import discord
+
+from services.move_scheduler import MoveScheduler
+from services.rate_limit import AdaptiveLimiter
+from services.roster import VoiceRoster
+from services.voice_service import VoiceService
+
+
+@dataclass
+class RoundPlan:
+    pairs: List[Tuple[int, int]]
+    sitter: Optional[discord.Member]
+    user_map: Dict[int, discord.Member]
+    participants: List[discord.Member]
+    round_ref: Optional[str] = None
+    channels: List[Optional[discord.VoiceChannel]] = field(default_factory=list)
+    live: bool = False  # Pairs are in their channels and the timer is running
+
+    def channel_index(self, channel_id: int) -> Optional[int]:
+        for i, channel in enumerate(self.channels):
+            if channel and channel.id == channel_id:
+                return i
+        return None
+
+
+class GuildSession:
+    """
+    Round state of one guild. Guilds never share a task, a lock or a channel pool,
+    so a round in one server cannot block or cancel a round in another.
+    """
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.lock = asyncio.Lock()  # Held while a round is being prepared
+        self.task: Optional[asyncio.Task] = None
+        self.plan: Optional[RoundPlan] = None  # The round in progress
+        self.roster = VoiceRoster()
+
+        # Created on first use by the owner, which knows the settings
+        self.limiter: Optional[AdaptiveLimiter] = None
+        self.mover: Optional[MoveScheduler] = None
+        self.voice: Optional[VoiceService] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    @property
+    def round_ref(self) -> Optional[str]:
+        return self.plan.round_ref if self.plan else None
+
+    @property
+    def is_busy(self) -> bool:
+        """A round is running or being prepared."""
+        return self.is_running or self.lock.locked()
+
+    def start(self, round_coro: Coroutine) -> asyncio.Task:
+        if self.is_running:
+            round_coro.close()
+            raise RuntimeError(f"Guild {self.guild_id} already has a round running.")
+
+        task = asyncio.create_task(round_coro)
+        self.task = task
+        task.add_done_callback(self._on_done)
+        return task
+
+    def stop(self) -> bool:
+        """Cancels the running round. Returns: False if there was none."""
+        if not self.is_running:
+            return False
+        self.task.cancel()
+        return True
+
+    async def close(self):
+        """Stops the round, waits for its cleanup, then stops the move workers."""
+        task = self.task
+        if self.stop():
+            await asyncio.gather(task, return_exceptions=True)
+        if self.mover:
+            await self.mover.close()
+
+    def _on_done(self, task: asyncio.Task):
+        if self.task is task:
+            self.task = None
+            self.plan = None
+
+
+class SessionRegistry:
+    def __init__(self):
+        self._sessions: Dict[int, GuildSession] = {}
+
+    def get(self, guild_id: int) -> GuildSession:
+        if guild_id not in self._sessions:
+            self._sessions[guild_id] = GuildSession(guild_id)
+        return self._sessions[guild_id]
+
+    def __iter__(self) -> Iterator[GuildSession]:
+        return iter(list(self._sessions.values()))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def running(self) -> int:
+        return sum(1 for session in self._sessions.values() if session.is_running)
+
+    async def close(self):
+        await asyncio.gather(*(session.close() for session in self))
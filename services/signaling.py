@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+import discord
+
+from services.rate_limit import AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 2000  # Discord's maximum message length
+
+
+def chunk_mentions(mentions: List[str], footer: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Packs mentions into as few messages as possible, each ending with footer and at most `limit` long."""
+    budget = limit - len(footer) - 1
+    if budget <= 0:
+        raise ValueError("Footer does not fit in a message.")
+
+    messages = []
+    line = ""
+    for mention in mentions:
+        candidate = f"{line} {mention}" if line else mention
+        if len(candidate) > budget and line:
+            messages.append(f"{line}\n{footer}")
+            candidate = mention
+        line = candidate
+
+    if line or not messages:
+        messages.append(f"{line}\n{footer}" if line else footer)
+    return messages
+
+
+class SignalingService:
+    """
+    End-of-round warning for every session channel at once: one text message per voice channel chat
+    (sent concurrently) and the participant mentions in chunks under the message limit.
+    The old audio hop (the bot joins every channel in turn) is still available as an opt-in.
+    """
+
+    def __init__(self, limiter: Optional[AdaptiveLimiter] = None, audio_hop: bool = False, hop_delay: float = 0.4):
+        """:param hop_delay: Seconds the bot stays in each channel during the audio hop."""
+        self.limiter = limiter or AdaptiveLimiter()
+        self.audio_hop = audio_hop
+        self.hop_delay = hop_delay
+        self._hop_task: Optional[asyncio.Task] = None
+
+    def lead_time(self, channel_count: int) -> float:
+        """Seconds warn() needs before the warning moment; the audio hop is centered on it."""
+        return channel_count * self.hop_delay / 2 if self.audio_hop else 0.0
+
+    async def warn(
+        self,
+        guild: discord.Guild,
+        channels: List[discord.VoiceChannel],
+        mentions: List[str],
+        announce: Callable[[str], Awaitable[object]],
+        text: str,
+    ):
+        """
+        :param announce: Sends a message to the command channel, e.g. ctx.send.
+        :param text: The warning, posted in every voice channel and under each chunk of mentions.
+        """
+        if self.audio_hop:
+            self._hop_task = asyncio.create_task(self.hop_audio(guild, channels))
+            await asyncio.sleep(self.lead_time(len(channels)))
+
+        await asyncio.gather(
+            self.broadcast(channels, text),
+            self._announce_chunks(announce, chunk_mentions(mentions, text)),
+        )
+
+    async def broadcast(self, channels: List[discord.VoiceChannel], text: str):
+        """Posts text in each channel's chat, mentioning whoever is inside so they get notified."""
+
+        async def send(channel: discord.VoiceChannel):
+            content = " ".join([m.mention for m in channel.members if not m.bot] + [text])
+            try:
+                await self.limiter.run(lambda: channel.send(content))
+            except Exception as e:
+                logger.warning(f"Failed to signal channel {channel.name}: {e}")
+
+        await asyncio.gather(*(send(channel) for channel in channels))
+
+    async def _announce_chunks(self, announce: Callable[[str], Awaitable[object]], messages: List[str]):
+        # In order, so the mentions read top to bottom
+        for message in messages:
+            try:
+                await announce(message)
+            except Exception as e:
+                logger.warning(f"Failed to send the round warning: {e}")
+
+    async def hop_audio(self, guild: discord.Guild, channels: List[discord.VoiceChannel]):
+        vc = guild.voice_client
+
+        if not vc:
+            try:
+                if channels:
+                    vc = await channels[0].connect()
+            except Exception as e:
+                logger.warning(f"Failed to connect to voice for signaling: {e}")
+                return
+
+        for channel in channels:
+            try:
+                if vc.channel.id != channel.id:
+                    await vc.move_to(channel)
+                await asyncio.sleep(self.hop_delay)
+
+            except Exception as e:
+                logger.warning(f"Failed to signal channel {channel.name}: {e}")
+                vc = guild.voice_client
+                if not vc:
+                    break
+
+        if vc:
+            await vc.disconnect()
@@ -1,71 +1,408 @@
 import discord
 import asyncio
+import itertools
+import logging
+import time
 from typing import Dict, List, Tuple, Optional, Union
 
+from services.metrics import DISCORD_CALL_SECONDS, ROUND_PHASE_FAILURES, ROUND_PHASE_SECONDS
+from services.move_scheduler import MovePriority, MoveReport, MoveScheduler, ProgressCallback, VoiceTarget
+from services.rate_limit import AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningReport:
+    """Per-channel creation latencies (seconds) of the last prepare_channels call."""
+
+    def __init__(self, latencies: List[float], total: float):
+        self.latencies = latencies
+        self.total = total
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __str__(self):
+        return (
+            f"{len(self.latencies)} channels in {self.total:.2f}s "
+            f"(p50 {self.percentile(0.5):.2f}s, max {self.percentile(1.0):.2f}s)"
+        )
+
 
 class VoiceService:
-    def __init__(self, guild: discord.Guild):
+    """
+    Per-guild owner of the "Session N" channels under the "Speed-friending" category.
+    Channels form a pool: kept between rounds (permissions are reset instead of deleting them),
+    grown to the largest size needed and trimmed after `idle_timeout` seconds without use.
+    """
+
+    SESSION_PREFIX = "Session "
+
+    def __init__(
+        self,
+        guild: discord.Guild,
+        limiter: Optional[AdaptiveLimiter] = None,
+        idle_timeout: float = 1800,
+        mover: Optional[MoveScheduler] = None,
+    ):
+        """
+        :param idle_timeout: Seconds a free pooled channel is kept; 0 deletes channels right after each round.
+        :param mover: The guild's move scheduler, shared with other commands that move members.
+        """
         self.guild = guild
         self.category_name = "Speed-friending"
         self.category: Optional[discord.CategoryChannel] = None
         self.temp_channels: List[discord.VoiceChannel] = []
+        self.limiter = limiter or AdaptiveLimiter()
+        self.mover = mover or MoveScheduler()
+        self.idle_timeout = idle_timeout
+        self.last_provisioning: Optional[ProvisioningReport] = None
 
-    async def prepare_channels(self, pair_count: int) -> List[discord.VoiceChannel]:
-        existing_category = discord.utils.get(self.guild.categories, name=self.category_name)
-        if not existing_category:
-            self.category = await self.guild.create_category(self.category_name)
-        else:
-            self.category = existing_category
-
-        self.temp_channels = []
-        for i in range(pair_count):
-            channel_name = f"Session {i + 1}"
-            channel = await self.guild.create_voice_channel(channel_name, category=self.category)
-            self.temp_channels.append(channel)
+        self.pool: Dict[int, discord.VoiceChannel] = {}  # Session number -> channel
+        self._last_used: Dict[int, float] = {}  # Session number -> time.monotonic()
+        self._discovered = False
+
+    async def discover(self):
+        """
+        Sweeps "Session N" channels left by a previous run: duplicates are deleted, the rest is adopted
+        into the pool (or deleted too when idle_timeout is 0 and nobody is still inside).
+        Runs once: on_ready fires again after every failed resume, and by then the pool is this run's own.
+        Channels a round is using are never swept or reset.
+        """
+        if self._discovered:
+            return
 
-        return self.temp_channels
+        self.category = discord.utils.get(self.guild.categories, name=self.category_name)
+        in_use = {channel.id for channel in self.temp_channels}
+        self.pool = {self._session_number(channel.name): channel for channel in self.temp_channels}
+        stale = []
 
-    async def move_pairs_to_channels(self, pairs: List[Tuple[int, int]], user_id_map: Dict[int, discord.Member]):
+        if self.category:
+            for channel in self.category.voice_channels:
+                number = self._session_number(channel.name)
+                if number is None or channel.id in in_use:
+                    continue
+                if number in self.pool or (self.idle_timeout <= 0 and not channel.members):
+                    stale.append(channel)
+                else:
+                    self.pool[number] = channel
+
+        now = time.monotonic()
+        self._last_used = {number: now for number in self.pool}
+        self._discovered = True
+
+        free = [channel for channel in self.pool.values() if channel.id not in in_use]
+        await asyncio.gather(*(self._delete(channel) for channel in stale), self._reset_permissions(free))
+
+    async def prepare_channels(
+        self, pairs: List[Tuple[int, int]], user_id_map: Dict[int, discord.Member]
+    ) -> List[discord.VoiceChannel]:
         """
+        Makes one channel per pair, already restricted to that pair: new channels get their overwrites
+        at creation, reused pool channels get them in a single edit.
         :param pairs: List of tuples (user_id_1, user_id_2)
         :param user_id_map: Dictionary mapping ID -> Discord Member Object
         """
-        tasks = []
+        if not self._discovered:
+            await self.discover()
+
+        if not self.category or not self.guild.get_channel(self.category.id):
+            existing_category = discord.utils.get(self.guild.categories, name=self.category_name)
+            if not existing_category:
+                self.category = await self.limiter.run(lambda: self.guild.create_category(self.category_name))
+            else:
+                self.category = existing_category
+
+        # Forget channels that were deleted by hand
+        self.pool = {n: ch for n, ch in self.pool.items() if self.guild.get_channel(ch.id)}
+
+        # Channels of a round still in progress keep their numbers; the next round takes the lowest free ones
+        in_use = {self._session_number(ch.name) for ch in self.temp_channels}
+        numbers = list(itertools.islice((n for n in itertools.count(1) if n not in in_use), len(pairs)))
+        overwrites = {
+            n: self._pair_overwrites([user_id_map.get(uid) for uid in pair]) for n, pair in zip(numbers, pairs)
+        }
+        missing = [n for n in numbers if n not in self.pool]
+        reused = [n for n in numbers if n in self.pool]
+
+        # Reused channels are claimed before any await, so a cancelled round still releases them
+        now = time.monotonic()
+        claimed = {n: self.pool[n] for n in reused}
+        self.temp_channels.extend(claimed.values())
+        for number in reused:
+            self._last_used[number] = now
+
+        latencies = []
 
-        for i, (uid1, uid2) in enumerate(pairs):
-            if i >= len(self.temp_channels):
-                break
+        async def create(number: int):
+            channel, latency = await self._create_channel(f"{self.SESSION_PREFIX}{number}", overwrites[number])
+            self.pool[number] = channel
+            self._last_used[number] = time.monotonic()
+            self.temp_channels.append(channel)
+            claimed[number] = channel
+            latencies.append(latency)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(create(n) for n in missing),
+            *(self._apply_overwrites(self.pool[n], overwrites[n]) for n in reused),
+            return_exceptions=True,
+        )
+        self.temp_channels.sort(key=lambda ch: self._session_number(ch.name))
+        self.last_provisioning = ProvisioningReport(latencies, time.perf_counter() - started)
+        ROUND_PHASE_SECONDS.observe(self.last_provisioning.total, phase="provisioning")
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors and len(errors) == len(results):
+            ROUND_PHASE_FAILURES.inc(phase="provisioning")
+            await self.release(list(claimed.values()))
+            raise errors[0]
+        for error in errors:
+            logger.warning(f"Failed to provision a session channel in guild {self.guild.id}: {error}")
+
+        return [claimed.get(n) for n in numbers]
 
-            target_channel = self.temp_channels[i]
+    def _pair_overwrites(
+        self, members: List[Optional[discord.Member]]
+    ) -> Dict[Union[discord.Role, discord.Member], discord.PermissionOverwrite]:
+        """The category's overwrites plus connect/speak/view access for the given members."""
+        overwrites = dict(self.category.overwrites) if self.category else {}
+        for member in members:
+            if member:
+                overwrites[member] = discord.PermissionOverwrite(connect=True, speak=True, view_channel=True)
+        return overwrites
 
-            member1 = user_id_map.get(uid1)
-            member2 = user_id_map.get(uid2)
+    async def _create_channel(self, name: str, overwrites: Dict) -> Tuple[discord.VoiceChannel, float]:
+        started = time.perf_counter()
+        channel = await self.limiter.run(
+            lambda: self.guild.create_voice_channel(name, category=self.category, overwrites=overwrites)
+        )
+        latency = time.perf_counter() - started
+        DISCORD_CALL_SECONDS.observe(latency, call="create_channel")
+        return channel, latency
 
-            await target_channel.set_permissions(member1, connect=True, speak=True, view_channel=True)
-            await target_channel.set_permissions(member2, connect=True, speak=True, view_channel=True)
+    async def _apply_overwrites(self, channel: discord.VoiceChannel, overwrites: Dict):
+        if channel.overwrites != overwrites:
+            started = time.perf_counter()
+            await self.limiter.run(lambda: channel.edit(overwrites=overwrites))
+            DISCORD_CALL_SECONDS.observe(time.perf_counter() - started, call="grant_permissions")
 
-            if member1 and member1.voice:
-                tasks.append(member1.move_to(target_channel))
-            if member2 and member2.voice:
-                tasks.append(member2.move_to(target_channel))
+    async def move_pairs_to_channels(
+        self,
+        pairs: List[Tuple[int, int]],
+        user_id_map: Dict[int, discord.Member],
+        channels: List[Optional[discord.VoiceChannel]],
+        progress: Optional[ProgressCallback] = None,
+    ) -> MoveReport:
+        """
+        :param pairs: List of tuples (user_id_1, user_id_2)
+        :param user_id_map: Dictionary mapping ID -> Discord Member Object
+        :param channels: What prepare_channels(pairs, ...) returned; it already granted each pair access.
+        """
+        moves = []
+        for target_channel, (uid1, uid2) in zip(channels, pairs):
+            if not target_channel:
+                continue
+            for uid in (uid1, uid2):
+                member = user_id_map.get(uid)
+                if member:
+                    moves.append((member, target_channel))
 
-        await asyncio.gather(*tasks)
+        return await self.mover.move(moves, MovePriority.PAIR, progress)
+
+    async def rematch(
+        self,
+        pairs: List[Tuple[int, int]],
+        user_id_map: Dict[int, discord.Member],
+        channels: List[discord.VoiceChannel],
+        progress: Optional[ProgressCallback] = None,
+    ) -> MoveReport:
+        """
+        New pairs in the middle of a round: each channel (already in use) is opened to its new pair,
+        then whoever of the two is elsewhere is moved in.
+        :param channels: One channel per pair, usually the one the pair's remaining occupant is in.
+        """
+        await asyncio.gather(
+            *(
+                self._apply_overwrites(channel, self._pair_overwrites([user_id_map.get(uid) for uid in pair]))
+                for channel, pair in zip(channels, pairs)
+            )
+        )
+        return await self.move_pairs_to_channels(pairs, user_id_map, channels, progress)
 
     async def return_users_to_lobby(
-        self, users: List[discord.Member], lobby_channel: Union[discord.VoiceChannel, discord.StageChannel]
-    ):
-        tasks = []
-        for user in users:
-            if user.voice:
-                tasks.append(user.move_to(lobby_channel))
+        self,
+        users: List[discord.Member],
+        lobby_channel: Union[discord.VoiceChannel, discord.StageChannel],
+        progress: Optional[ProgressCallback] = None,
+    ) -> MoveReport:
+        return await self.mover.move([(user, lobby_channel) for user in users], MovePriority.RETURN, progress)
+
+    async def switch_rounds(
+        self,
+        old_pairs: List[Tuple[int, int]],
+        old_channels: List[Optional[discord.VoiceChannel]],
+        new_pairs: List[Tuple[int, int]],
+        new_channels: List[Optional[discord.VoiceChannel]],
+        user_id_map: Dict[int, discord.Member],
+        lobby_channel: VoiceTarget,
+        progress: Optional[ProgressCallback] = None,
+    ) -> MoveReport:
+        """
+        Moves everyone straight from their old channel to their new one (anyone without a new pair goes
+        to the lobby) and releases each old channel the moment its last occupant is out.
+        """
+        targets: Dict[int, discord.VoiceChannel] = {}  # Member id -> new channel
+        for channel, pair in zip(new_channels, new_pairs):
+            for uid in pair:
+                if channel and uid in user_id_map:
+                    targets[uid] = channel
+
+        remaining: Dict[int, int] = {}  # Old channel id -> occupants not moved out yet
+        source: Dict[int, discord.VoiceChannel] = {}  # Member id -> old channel they are moved out of
+        leaving: Dict[int, discord.Member] = {}
+
+        for channel, pair in zip(old_channels, old_pairs):
+            if not channel:
+                continue
+            occupants = {m.id: m for m in channel.members}
+            for uid in pair:
+                member = user_id_map.get(uid)
+                if member:
+                    occupants[member.id] = member
+            occupants = {mid: m for mid, m in occupants.items() if mid not in source}
+
+            remaining[channel.id] = len(occupants)
+            for member in occupants.values():
+                source[member.id] = channel
+                leaving[member.id] = member
+
+        pair_moves = [(user_id_map[uid], channel) for uid, channel in targets.items()]
+        lobby_moves = [(m, lobby_channel) for mid, m in leaving.items() if mid not in targets]
+
+        old = [ch for ch in old_channels if ch]
+        releases = [asyncio.create_task(self._release(ch)) for ch in old if not remaining.get(ch.id)]
+
+        def on_moved(member: discord.Member, error: Optional[Exception]):
+            channel = source.get(member.id)
+            if channel is None:
+                return
+            remaining[channel.id] -= 1
+            if remaining[channel.id] == 0:
+                releases.append(asyncio.create_task(self._release(channel)))
+
+        done = [0, 0]
+        total = len(pair_moves) + len(lobby_moves)
+
+        def track(i: int) -> Optional[ProgressCallback]:
+            if not progress:
+                return None
+
+            async def report_progress(batch_done: int, _batch_total: int):
+                done[i] = batch_done
+                await progress(sum(done), total)
 
-        await asyncio.gather(*tasks)
+            return report_progress
+
+        try:
+            reports = await asyncio.gather(
+                self.mover.move(pair_moves, MovePriority.PAIR, track(0), on_moved=on_moved),
+                self.mover.move(lobby_moves, MovePriority.RETURN, track(1), on_moved=on_moved),
+            )
+            return MoveReport.combine(reports)
+        finally:
+            await asyncio.gather(*releases, return_exceptions=True)
+            # Old channels whose moves failed or were cancelled
+            await self.release(old)
+
+    async def teardown(
+        self,
+        pairs: List[Tuple[int, int]],
+        user_id_map: Dict[int, discord.Member],
+        lobby_channel: VoiceTarget,
+        channels: Optional[List[Optional[discord.VoiceChannel]]] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> MoveReport:
+        """
+        Pipelined end of round: everyone is moved back to the lobby and each channel is released
+        the moment its last occupant is out, while the other channels are still emptying.
+        :param channels: What prepare_channels(pairs, ...) returned, if it got that far.
+        """
+        try:
+            return await self.switch_rounds(pairs, channels or [], [], [], user_id_map, lobby_channel, progress)
+        finally:
+            await self.cleanup()
 
     async def cleanup(self):
-        for channel in self.temp_channels:
+        """Returns every channel in use to the pool, then deletes channels idle for longer than idle_timeout."""
+        await self.release(list(self.temp_channels))
+        await self.trim_idle()
+
+    async def release(self, channels: List[discord.VoiceChannel]):
+        await asyncio.gather(*(self._release(channel) for channel in channels))
+
+    async def _release(self, channel: discord.VoiceChannel):
+        """Hands one channel back to the pool, or deletes it right away when nothing is kept."""
+        if channel not in self.temp_channels:
+            return  # Already released
+        self.temp_channels.remove(channel)
+        number = next((n for n, ch in self.pool.items() if ch.id == channel.id), None)
+
+        if self.idle_timeout <= 0:
+            if number is not None:
+                self.pool.pop(number)
+                self._last_used.pop(number, None)
+            await self._delete(channel)
+            return
+
+        if number is not None:
+            self._last_used[number] = time.monotonic()
+        await self._reset_permissions([channel])
+
+    async def trim_idle(self):
+        """Deletes free pooled channels not used for idle_timeout seconds."""
+        in_use = {channel.id for channel in self.temp_channels}
+        deadline = time.monotonic() - self.idle_timeout
+        idle = [
+            number
+            for number, channel in self.pool.items()
+            if channel.id not in in_use and self._last_used.get(number, 0) <= deadline
+        ]
+
+        channels = [self.pool.pop(number) for number in idle]
+        for number in idle:
+            self._last_used.pop(number, None)
+
+        await asyncio.gather(*(self._delete(channel) for channel in channels))
+
+    async def _reset_permissions(self, channels: List[discord.VoiceChannel]):
+        """Drops per-member overwrites by syncing with the category (one call per channel that needs it)."""
+        to_reset = [ch for ch in channels if ch.category and ch.overwrites != ch.category.overwrites]
+
+        async def reset(channel: discord.VoiceChannel):
+            started = time.perf_counter()
             try:
-                await channel.delete()
+                await self.limiter.run(lambda: channel.edit(sync_permissions=True))
             except discord.NotFound:
                 pass
+            DISCORD_CALL_SECONDS.observe(time.perf_counter() - started, call="reset_permissions")
+
+        await asyncio.gather(*(reset(channel) for channel in to_reset))
+
+    async def _delete(self, channel: discord.VoiceChannel):
+        started = time.perf_counter()
+        try:
+            await self.limiter.run(lambda: channel.delete())
+        except discord.NotFound:
+            pass
+        DISCORD_CALL_SECONDS.observe(time.perf_counter() - started, call="delete_channel")
 
-        self.temp_channels = []
+    @classmethod
+    def _session_number(cls, name: str) -> Optional[int]:
+        if not name.startswith(cls.SESSION_PREFIX):
+            return None
+        suffix = name[len(cls.SESSION_PREFIX) :]
+        return int(suffix) if suffix.isdigit() else None
@@ -0,0 +1,13 @@
+import os
+
+# config.settings is read at import time; the database modules only need it to build their (lazy) engine
+for _name, _value in {
+    "DISCORD_TOKEN": "test",
+    "ALLOWED_ROLE_ID": "1",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+}.items():
+    os.environ.setdefault(_name, _value)
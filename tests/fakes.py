@@ -0,0 +1,188 @@
+"""Minimal in-memory stand-ins for the discord.py objects the bot touches, and for its database session."""
+
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+import discord
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from database.base import Base
+
+_ids = itertools.count(1000)
+
+
+class FakeGuild:
+    def __init__(self, latency: float = 0.0):
+        """:param latency: Simulated REST round trip in seconds for every API call."""
+        self.id = next(_ids)
+        self.latency = latency
+        self.channels: Dict[int, object] = {}
+        self.api_calls: List[str] = []
+
+    @property
+    def categories(self) -> List["FakeCategory"]:
+        return [c for c in self.channels.values() if isinstance(c, FakeCategory)]
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def api(self, name: str):
+        self.api_calls.append(name)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_category(self, name: str) -> "FakeCategory":
+        await self.api("create_category")
+        category = FakeCategory(self, name)
+        self.channels[category.id] = category
+        return category
+
+    async def create_voice_channel(self, name: str, category=None, overwrites=None) -> "FakeVoiceChannel":
+        await self.api("create_voice_channel")
+        channel = FakeVoiceChannel(self, name, category, overwrites)
+        self.channels[channel.id] = channel
+        return channel
+
+
+class FakeCategory:
+    def __init__(self, guild: FakeGuild, name: str):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.overwrites: Dict = {}
+
+    @property
+    def voice_channels(self) -> List["FakeVoiceChannel"]:
+        return [c for c in self.guild.channels.values() if isinstance(c, FakeVoiceChannel) and c.category is self]
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild: FakeGuild, name: str, category: Optional[FakeCategory], overwrites=None):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.category = category
+        self.overwrites: Dict = dict(overwrites or {})
+        self.members: List["FakeMember"] = []
+
+    @property
+    def mention(self) -> str:
+        return f"<#{self.id}>"
+
+    async def edit(self, sync_permissions: bool = False, overwrites=None):
+        await self.guild.api("edit_channel")
+        if sync_permissions:
+            self.overwrites = dict(self.category.overwrites)
+        if overwrites is not None:
+            self.overwrites = dict(overwrites)
+
+    async def set_permissions(self, target, **permissions):
+        await self.guild.api("set_permissions")
+        self.overwrites[target] = permissions
+
+    async def delete(self):
+        await self.guild.api("delete_channel")
+        self.guild.channels.pop(self.id, None)
+
+    async def send(self, content: str):
+        await self.guild.api("send_message")
+
+
+class FakeVoiceState:
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakeMember:
+    def __init__(self, guild: FakeGuild, member_id: Optional[int] = None, channel=None):
+        self.id = member_id or next(_ids)
+        self.guild = guild
+        self.bot = False
+        self.name = f"user{self.id}"
+        self.display_name = self.name
+        self.mention = f"<@{self.id}>"
+        self.voice = None
+        if channel is not None:
+            self._join(channel)
+
+    def _join(self, channel):
+        if self.voice and self in self.voice.channel.members:
+            self.voice.channel.members.remove(self)
+        self.voice = FakeVoiceState(channel)
+        channel.members.append(self)
+
+    async def move_to(self, channel):
+        await self.guild.api("move_member")
+        self._join(channel)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeMember) and other.id == self.id
+
+
+class FakeInteractionResponse:
+    def __init__(self):
+        self.sent: List[str] = []
+        self.edits: List[Dict] = []
+
+    async def send_message(self, content: str, ephemeral: bool = False):
+        self.sent.append(content)
+
+    async def edit_message(self, **fields):
+        self.edits.append(fields)
+
+
+class FakeInteraction:
+    """What a button callback gets: who clicked, and the response to answer through."""
+
+    def __init__(self, user):
+        self.user = user
+        self.response = FakeInteractionResponse()
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.reason = "fake"
+        self.headers = headers or {}
+
+
+def http_error(status, headers=None) -> discord.HTTPException:
+    return discord.HTTPException(FakeResponse(status, headers), "fake error")
+
+
+def sqlite_engine() -> Engine:
+    """An in-memory database with the bot's schema, for the queries that are plain enough to run on SQLite."""
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def add_functions(connection, _):
+        connection.create_function("greatest", 2, max)
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+class SqliteSession:
+    """The part of AsyncSession the repositories use, over a synchronous SQLite session."""
+
+    def __init__(self, engine: Engine):
+        self.session = Session(engine)
+        self.statements = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.session.close()
+
+    async def execute(self, stmt):
+        self.statements += 1
+        return self.session.execute(stmt)
+
+    async def commit(self):
+        self.session.commit()
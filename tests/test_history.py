@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import unittest
+from unittest import mock
+from sqlalchemy.orm import Session
+
+from bot import views
+from bot.views import HistoryView, fetch_history_page
+from database.models import Meeting, Round, User
+from database.repository import MeetingRepository
+from tests.fakes import FakeGuild, FakeInteraction, FakeMember, SqliteSession, sqlite_engine
+
+USER = 1
+
+
+def history_database():
+    """
+    USER met partners 2..9 over six rounds, on both sides of the meeting, with two meetings in round 4
+    (a rematch). Round 3 belongs to other people.
+    Returns: (engine, USER's meeting ids, newest first)
+    """
+    engine = sqlite_engine()
+    started = datetime(2026, 10, 1, 18, 0, tzinfo=timezone.utc)
+    meetings = [(1, USER, 2), (2, 3, USER), (3, 4, 5), (4, USER, 4), (4, 5, USER), (5, USER, 6), (6, 7, USER)]
+
+    with Session(engine) as session:
+        session.add_all(User(id=uid, username=f"user{uid}") for uid in range(1, 10))
+        session.add_all(
+            Round(id=r, guild_id=1, round_number=r, started_at=started + timedelta(minutes=10 * r)) for r in range(1, 7)
+        )
+        session.flush()
+        rows = [Meeting(round_id=r, user_1_id=u1, user_2_id=u2) for r, u1, u2 in meetings]
+        session.add_all(rows)
+        session.commit()
+        own = [m.id for m in rows if USER in (m.user_1_id, m.user_2_id)]
+
+    return engine, own[::-1]
+
+
+class TestUserHistory(unittest.TestCase):
+    def setUp(self):
+        self.engine, self.expected = history_database()
+
+    def page(self, limit, before=None):
+        async def read():
+            async with SqliteSession(self.engine) as session:
+                return await MeetingRepository(session).get_user_history(USER, limit=limit, before=before)
+
+        return asyncio.run(read())
+
+    def test_newest_first_from_both_sides(self):
+        entries = self.page(limit=10)
+
+        self.assertEqual([e.meeting_id for e in entries], self.expected)
+        self.assertEqual([e.partner_id for e in entries], [7, 6, 5, 4, 3, 2])
+        self.assertEqual(entries[0].partner_name, "user7")
+        self.assertEqual([e.cursor for e in entries[:2]], [(6, entries[0].meeting_id), (5, entries[1].meeting_id)])
+
+    def test_pages_split_inside_a_round(self):
+        for limit in (1, 2, 3, 4):
+            seen, before = [], None
+            while True:
+                entries = self.page(limit, before)
+                if not entries:
+                    break
+                seen += [e.meeting_id for e in entries]
+                before = entries[-1].cursor
+
+            self.assertEqual(seen, self.expected, f"limit={limit}")
+
+    def test_cursor_excludes_its_own_meeting(self):
+        first = self.page(limit=3)  # Ends with the newer of the two meetings of round 4
+        self.assertEqual(first[-1].round_id, 4)
+
+        rest = self.page(limit=10, before=first[-1].cursor)
+
+        self.assertEqual([e.meeting_id for e in rest], self.expected[3:])
+        self.assertEqual(rest[0].round_id, 4)
+
+
+class TestHistoryView(unittest.TestCase):
+    def setUp(self):
+        self.engine, self.expected = history_database()
+        patcher = mock.patch.object(views, "async_session_factory", lambda: SqliteSession(self.engine))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = FakeMember(FakeGuild(), member_id=USER)
+
+    def test_next_page_walks_to_the_end(self):
+        async def main():
+            entries, has_more = await fetch_history_page(USER, 4)
+            view = HistoryView(USER, 4, entries, has_more)
+            self.assertFalse(view.next_page.disabled)
+
+            interaction = FakeInteraction(self.owner)
+            await view.next_page.callback(interaction)
+            return view, interaction
+
+        view, interaction = asyncio.run(main())
+
+        [edit] = interaction.response.edits
+        self.assertIn("**Your Meetings 5-6:**", edit["content"])
+        self.assertIn("user3", edit["content"])
+        self.assertIn("user2", edit["content"])
+        self.assertTrue(view.next_page.disabled)
+        self.assertEqual(view.next_index, 7)
+
+    def test_exact_last_page_disables_the_button(self):
+        async def main():
+            entries, has_more = await fetch_history_page(USER, 3)
+            view = HistoryView(USER, 3, entries, has_more)
+            interaction = FakeInteraction(self.owner)
+            await view.next_page.callback(interaction)
+            return view, interaction
+
+        view, interaction = asyncio.run(main())
+
+        self.assertIn("**Your Meetings 4-6:**", interaction.response.edits[0]["content"])
+        self.assertTrue(view.next_page.disabled)
+
+    def test_only_the_owner_can_page(self):
+        async def main():
+            entries, has_more = await fetch_history_page(USER, 2)
+            view = HistoryView(USER, 2, entries, has_more)
+            interaction = FakeInteraction(FakeMember(FakeGuild()))
+            await view.next_page.callback(interaction)
+            return view, interaction
+
+        view, interaction = asyncio.run(main())
+
+        self.assertEqual(interaction.response.sent, ["This is not your history."])
+        self.assertEqual(interaction.response.edits, [])
+        self.assertEqual(view.next_index, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+from services.history_cache import PairHistoryCache
+from services.pair_history import PairHistory
+
+
+class FakeLoader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def __call__(self, user_ids):
+        self.calls.append(sorted(user_ids))
+        wanted = set(user_ids)
+        return PairHistory.from_rows([r for r in self.rows if r[0] in wanted or r[1] in wanted])
+
+
+class TestPairHistoryCache(unittest.TestCase):
+    def setUp(self):
+        self.loader = FakeLoader([(1, 2, 100), (2, 3, 200), (3, 9, 300)])
+
+    def test_second_round_hits_cache_only(self):
+        cache = PairHistoryCache()
+
+        first = asyncio.run(cache.get_history([1, 2, 3], self.loader))
+        second = asyncio.run(cache.get_history([1, 2, 3], self.loader))
+
+        self.assertEqual(self.loader.calls, [[1, 2, 3]])
+        self.assertEqual(sorted(first.pairs()), [(1, 2, 100), (2, 3, 200)])
+        self.assertEqual(sorted(second.pairs()), sorted(first.pairs()))
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_lazy_load_of_new_user_sees_cached_partners(self):
+        cache = PairHistoryCache()
+        asyncio.run(cache.get_history([1, 2], self.loader))
+
+        history = asyncio.run(cache.get_history([1, 2, 9], self.loader))
+
+        self.assertEqual(self.loader.calls[-1], [9])
+        self.assertEqual(sorted(history.pairs()), [(1, 2, 100)])
+
+    def test_write_through(self):
+        cache = PairHistoryCache()
+        asyncio.run(cache.get_history([1, 2, 3], self.loader))
+
+        cache.record([(1, 3)], 500)
+        history = asyncio.run(cache.get_history([1, 2, 3], self.loader))
+
+        self.assertEqual(len(self.loader.calls), 1)
+        self.assertEqual(history.get(1, 3), 500)
+
+    def test_lru_eviction(self):
+        cache = PairHistoryCache(max_users=2)
+
+        asyncio.run(cache.get_history([1, 2, 3], self.loader))
+
+        self.assertEqual(len(cache), 2)
+        asyncio.run(cache.get_history([1], self.loader))
+        self.assertEqual(self.loader.calls[-1], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
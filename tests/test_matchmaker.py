@@ -1,6 +1,9 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
+import random
 import unittest
-from services.matchmaker import MatchmakerService
+from services.matching import MatchingEngine, partition_users
+from services.matchmaker import WEIGHT_NEVER_MET, MatchmakerService
 
 
 class TestMatchmakerService(unittest.TestCase):
@@ -75,6 +78,213 @@ class TestMatchmakerService(unittest.TestCase):
         self.assertIn((3, 4), pairs, "Should pick the oldest pair (3, 4)")
         self.assertIn((1, 2), pairs, "Should pick (1, 2) as the best remaining option")
 
+    def test_weight_matrix_from_history(self):
+        users = [30, 10, 20]
+        history = {(10, 30): self.now - timedelta(hours=1), (20, 99): self.now - timedelta(hours=1)}
+
+        weights = self.service.build_weight_matrix(users, history, now=self.now)
+
+        self.assertEqual(weights[0, 1], 3600)
+        self.assertEqual(weights[1, 0], 3600)
+        self.assertEqual(weights[0, 2], WEIGHT_NEVER_MET)
+        self.assertEqual(weights[1, 2], WEIGHT_NEVER_MET)
+        self.assertEqual(weights[2, 2], 0)
+
+    def test_approximate_engines_match_exact_on_small_lobby(self):
+        users = list(range(1, 11))
+        history = {(u, u + 1): self.now - timedelta(hours=u) for u in range(1, 10)}
+
+        exact = self.service.match(users, history, engine=MatchingEngine.EXACT)
+
+        for engine in (MatchingEngine.GREEDY, MatchingEngine.ANYTIME):
+            result = MatchmakerService(engine=engine, time_budget_ms=20).match(users, history)
+            self.assertEqual(result.engine, engine)
+            self.assertEqual(len(result.pairs), 5)
+            self.assertEqual(result.optimal_weight, exact.total_weight)
+            self.assertLessEqual(result.optimality_gap, 0.01)
+
+    def test_anytime_engine_keeps_its_time_budget(self):
+        users = list(range(1, 1502))
+        history = {(u, u + k): self.now - timedelta(hours=k) for u in users for k in (1, 2, 3) if u + k <= 1501}
+
+        result = MatchmakerService(engine=MatchingEngine.ANYTIME, time_budget_ms=30, gap_check_limit=0).match(
+            users, history
+        )
+
+        self.assertEqual(len(result.pairs), 750)
+        self.assertEqual(len(result.unmatched), 1)
+        self.assertLess(result.elapsed_ms, 200)  # Matrix build included; before the deadline-aware start: ~340ms
+
+    def test_greedy_odd_lobby_leaves_one_unmatched(self):
+        users = [1, 2, 3, 4, 5]
+        history = {(1, 2): self.now, (3, 4): self.now}
+
+        pairs, unmatched = MatchmakerService(engine=MatchingEngine.GREEDY).create_pairs(users, history)
+
+        self.assertEqual(len(pairs), 2)
+        self.assertEqual(len(unmatched), 1)
+        self.assertNotIn((1, 2), pairs)
+        self.assertNotIn((3, 4), pairs)
+
+    def test_sparse_engine_avoids_past_pairs(self):
+        users = [1, 2, 3, 4, 5, 6]
+        history = {(1, 2): self.now, (1, 3): self.now, (2, 3): self.now, (4, 5): self.now}
+
+        result = MatchmakerService(engine=MatchingEngine.SPARSE).match(users, history)
+
+        self.assertEqual(result.engine, MatchingEngine.SPARSE)
+        self.assertEqual(len(result.pairs), 3)
+        self.assertEqual(result.optimality_gap, 0.0)
+        for pair in history:
+            self.assertNotIn(pair, result.pairs)
+
+    def test_sparse_engine_prefers_older_meeting_when_forced(self):
+        history = {
+            (1, 2): self.now - timedelta(hours=1),
+            (3, 4): self.now - timedelta(days=3650),
+            (1, 3): self.now - timedelta(minutes=1),
+            (1, 4): self.now - timedelta(minutes=1),
+            (2, 3): self.now - timedelta(minutes=1),
+            (2, 4): self.now - timedelta(minutes=1),
+        }
+
+        pairs, _ = MatchmakerService(engine=MatchingEngine.SPARSE).create_pairs([1, 2, 3, 4], history)
+
+        self.assertIn((3, 4), pairs)
+        self.assertIn((1, 2), pairs)
+
+    def test_schedule_never_repeats_a_pair(self):
+        users = list(range(1, 12))
+        history = {(1, 2): self.now, (3, 4): self.now - timedelta(days=1)}
+
+        plan = MatchmakerService().plan_schedule(users, history, rounds=20)
+
+        self.assertEqual(len(plan), 11)  # Odd lobby: one more round, someone else sits out each time
+        pairs = [pair for round_pairs in plan.rounds for pair in round_pairs]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertEqual(len(pairs), 11 * 10 // 2)
+        sitters = [u for round_pairs in plan.rounds for u in users if all(u not in p for p in round_pairs)]
+        self.assertCountEqual(sitters, users)
+
+        # Dense history: the polish must not trade a fresh pair for one planned in another round
+        service = MatchmakerService(schedule_budget_ms=20)
+        for seed in range(15):
+            rng = random.Random(seed)
+            for n, rounds in ((8, 5), (16, 8), (20, 5)):
+                users = list(range(1, n + 1))
+                history = {
+                    (u, v): self.now - timedelta(seconds=rng.randint(60, 10**7))
+                    for u in users
+                    for v in users
+                    if u < v and rng.random() < 0.8
+                }
+                plan = service.plan_schedule(users, history, rounds)
+
+                pairs = [pair for round_pairs in plan.rounds for pair in round_pairs]
+                self.assertEqual(len(pairs), len(set(pairs)), f"seed={seed}, n={n}")
+
+    def test_schedule_avoids_history(self):
+        users = list(range(1, 21))
+        history = {(u, v): self.now for u in users for v in users if u < v and (u + v) % 7 == 0}
+
+        plan = MatchmakerService().plan_schedule(users, history, rounds=4)
+
+        for round_pairs in plan.rounds:
+            self.assertEqual(len(round_pairs), 10)
+            for pair in round_pairs:
+                self.assertNotIn(pair, history)
+
+    def test_scheduled_round_fits_roster_changes(self):
+        users = list(range(1, 11))
+        service = MatchmakerService()
+        plan = service.plan_schedule(users, {}, rounds=3, key="guild")
+        (a, b), (c, d) = plan.rounds[1][:2]
+
+        # a and c left, 11 joined: their partners are re-matched, the other planned pairs stay
+        lobby = [u for u in users if u not in (a, c)] + [11]
+        result = service.scheduled_round("guild", 1, lobby)
+
+        self.assertTrue(result.scheduled)
+        self.assertEqual(set(plan.rounds[1][2:]) - set(result.pairs), set())
+        self.assertCountEqual([u for pair in result.pairs for u in pair] + result.unmatched, lobby)
+        self.assertFalse(set(result.pairs) & (plan.planned - set(plan.rounds[1])))
+        self.assertIsNone(service.scheduled_round("guild", 3, lobby))
+        service.forget("guild")
+        self.assertIsNone(service.scheduled_round("guild", 0, lobby))
+
+    def test_partition_spreads_history_groups_across_clusters(self):
+        # Two groups of 10 where everyone met everyone else in their group
+        users = list(range(1, 21))
+        history = {(u, v): self.now for u in users for v in users if u < v and (u - 1) // 10 == (v - 1) // 10}
+        pair_idx, ages = MatchmakerService.compact_history(users, history)
+
+        clusters = partition_users(len(users), pair_idx, ages, size=10)
+
+        self.assertEqual(sorted(len(members) for members in clusters), [10, 10])
+        for members in clusters:
+            self.assertEqual(sum(1 for i in members if i < 10), 5)
+
+        result = MatchmakerService(engine=MatchingEngine.PARTITIONED, partition_size=10).match(users, history)
+        self.assertEqual(len(result.pairs), 10)
+        self.assertEqual(result.optimality_gap, 0.0)
+
+    def test_partitioned_engine_close_to_exact(self):
+        users = list(range(1, 42))
+        history = {
+            (u, v): self.now - timedelta(hours=u + v) for u in users for v in users if u < v and (u * v) % 3 == 0
+        }
+
+        result = MatchmakerService(engine=MatchingEngine.PARTITIONED, partition_size=8).match(users, history)
+
+        self.assertEqual(result.engine, MatchingEngine.PARTITIONED)
+        self.assertEqual(len(result.pairs), 20)
+        self.assertEqual(len(result.unmatched), 1)
+        self.assertLessEqual(result.optimality_gap, 0.01)
+
+    def test_partitioned_engine_in_worker_processes(self):
+        users = list(range(1, 26))
+        history = {(u, u + 1): self.now for u in range(1, 25)}
+
+        service = MatchmakerService(engine=MatchingEngine.PARTITIONED, partition_size=6, inline_max_users=0)
+        try:
+            result = asyncio.run(service.match_async(users, history))
+        finally:
+            service.shutdown()
+
+        self.assertEqual(len(result.pairs), 12)
+        self.assertCountEqual([u for pair in result.pairs for u in pair] + result.unmatched, users)
+        for pair in history:
+            self.assertNotIn(pair, result.pairs)
+
+    def test_match_async_in_worker_pools(self):
+        users = [1, 2, 3, 4, 5, 6]
+        history = {(1, 2): self.now, (3, 4): self.now, (5, 6): self.now}
+
+        for executor in ("thread", "process"):
+            service = MatchmakerService(executor=executor, inline_max_users=0)
+            try:
+                result = asyncio.run(service.match_async(users, history))
+            finally:
+                service.shutdown()
+
+            self.assertEqual(len(result.pairs), 3)
+            for pair in history:
+                self.assertNotIn(pair, result.pairs)
+
+    def test_auto_executor_uses_processes_for_every_engine(self):
+        users = [1, 2, 3, 4, 5, 6]
+        history = {(1, 2): self.now, (3, 4): self.now, (5, 6): self.now}
+
+        for engine in (MatchingEngine.GREEDY, MatchingEngine.ANYTIME):
+            service = MatchmakerService(engine=engine, executor="auto", inline_max_users=0)
+            try:
+                result = asyncio.run(service.match_async(users, history))
+                self.assertEqual(list(service._executors), ["process"])
+            finally:
+                service.shutdown()
+
+            self.assertEqual(len(result.pairs), 3)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from services.metrics import MEMBER_MOVE_RETRIES, MEMBER_MOVES, MetricsRegistry, MetricsServer
+from services.move_scheduler import MoveScheduler
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel, http_error
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge_text_format(self):
+        moves = self.registry.counter("moves_total", "Moves.", ["outcome"])
+        rounds = self.registry.gauge("active_rounds", "Rounds.")
+        running = [3]
+        moves.inc(outcome="moved")
+        moves.inc(2, outcome='say "hi"')
+        rounds.set_function(lambda: running[0])
+        running[0] = 4  # Read when rendered, not when set
+
+        text = self.registry.render()
+
+        self.assertIn("# TYPE moves_total counter\n", text)
+        self.assertIn('moves_total{outcome="moved"} 1\n', text)
+        self.assertIn('moves_total{outcome="say \\"hi\\""} 2\n', text)
+        self.assertIn("# TYPE active_rounds gauge\nactive_rounds 4\n", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        phase = self.registry.histogram("phase_seconds", "Phases.", ["phase"], buckets=(0.1, 1))
+        for seconds in (0.05, 0.1, 0.5, 3):
+            phase.observe(seconds, phase="moves")
+
+        text = self.registry.render()
+
+        self.assertIn('phase_seconds_bucket{phase="moves",le="0.1"} 2\n', text)
+        self.assertIn('phase_seconds_bucket{phase="moves",le="1"} 3\n', text)
+        self.assertIn('phase_seconds_bucket{phase="moves",le="+Inf"} 4\n', text)
+        self.assertIn('phase_seconds_sum{phase="moves"} 3.65\n', text)
+        self.assertIn('phase_seconds_count{phase="moves"} 4\n', text)
+        self.assertEqual(phase.count(phase="moves"), 4)
+
+    def test_labels_must_match(self):
+        moves = self.registry.counter("moves_total", "Moves.", ["outcome"])
+
+        with self.assertRaises(ValueError):
+            moves.inc()
+        with self.assertRaises(ValueError):
+            self.registry.counter("moves_total", "Again.")
+
+    def test_server_answers_scrapes(self):
+        self.registry.counter("scrapes_total", "Scrapes.").inc()
+        server = MetricsServer(self.registry)
+
+        async def get(path: str) -> bytes:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+        async def main():
+            await server.start("127.0.0.1", 0)
+            try:
+                return await get("/metrics"), await get("/")
+            finally:
+                await server.stop()
+
+        metrics, other = asyncio.run(main())
+
+        self.assertTrue(metrics.startswith(b"HTTP/1.0 200 OK\r\n"))
+        self.assertIn(b"text/plain; version=0.0.4", metrics)
+        self.assertTrue(metrics.endswith(b"scrapes_total 1\n"))
+        self.assertTrue(other.startswith(b"HTTP/1.0 404"))
+
+
+class TestMoveMetrics(unittest.TestCase):
+    def test_moves_are_counted_by_outcome(self):
+        guild = FakeGuild()
+        lobby = FakeVoiceChannel(guild, "Lobby", None)
+        target = FakeVoiceChannel(guild, "Target", None)
+        moving = FakeMember(guild, channel=lobby)
+        already_there = FakeMember(guild, channel=target)
+        scheduler = MoveScheduler(rate=1000, burst=10, base_delay=0.01)
+
+        class Flaky(FakeMember):
+            attempts = 0
+
+            async def move_to(self, channel):
+                Flaky.attempts += 1
+                if Flaky.attempts == 1:
+                    raise http_error(503)
+                await super().move_to(channel)
+
+        flaky = Flaky(guild, channel=lobby)
+        before = {outcome: MEMBER_MOVES.value(outcome=outcome) for outcome in ("moved", "skipped")}
+        retries = MEMBER_MOVE_RETRIES.value()
+
+        async def main():
+            await scheduler.move([(moving, target), (already_there, target), (flaky, target)])
+            await scheduler.close()
+
+        asyncio.run(main())
+
+        self.assertEqual(MEMBER_MOVES.value(outcome="moved") - before["moved"], 2)
+        self.assertEqual(MEMBER_MOVES.value(outcome="skipped") - before["skipped"], 1)
+        self.assertEqual(MEMBER_MOVE_RETRIES.value() - retries, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+import unittest
+import discord
+from services.move_scheduler import MovePriority, MoveScheduler
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel, http_error
+
+
+class FlakyMember(FakeMember):
+    def __init__(self, guild, channel, errors):
+        super().__init__(guild, channel=channel)
+        self.errors = list(errors)
+
+    async def move_to(self, channel):
+        if self.errors:
+            await self.guild.api("move_member")
+            raise self.errors.pop(0)
+        await super().move_to(channel)
+
+
+def make_lobby(guild, count):
+    lobby = FakeVoiceChannel(guild, "Lobby", None)
+    return lobby, [FakeMember(guild, channel=lobby) for _ in range(count)]
+
+
+class TestMoveScheduler(unittest.TestCase):
+    def test_moves_everyone_within_the_rate(self):
+        guild = FakeGuild(latency=0.005)
+        lobby, members = make_lobby(guild, 200)
+        target = FakeVoiceChannel(guild, "Target", None)
+        scheduler = MoveScheduler(rate=1000, burst=20, workers=20)
+
+        async def main():
+            report = await scheduler.move([(m, target) for m in members])
+            await scheduler.close()
+            return report
+
+        report = asyncio.run(main())
+
+        self.assertEqual(report.moved, 200)
+        self.assertEqual(len(target.members), 200)
+        self.assertEqual(lobby.members, [])
+
+    def test_token_bucket_paces_moves(self):
+        guild = FakeGuild()
+        _, members = make_lobby(guild, 30)
+        target = FakeVoiceChannel(guild, "Target", None)
+        scheduler = MoveScheduler(rate=100, burst=10, workers=10)
+
+        async def main():
+            started = time.perf_counter()
+            await scheduler.move([(m, target) for m in members])
+            await scheduler.close()
+            return time.perf_counter() - started
+
+        # 10 from the burst, then 20 at 100/s
+        self.assertGreaterEqual(asyncio.run(main()), 0.18)
+
+    def test_transient_errors_are_retried_and_permanent_ones_reported(self):
+        guild = FakeGuild()
+        lobby = FakeVoiceChannel(guild, "Lobby", None)
+        target = FakeVoiceChannel(guild, "Target", None)
+        flaky = FlakyMember(guild, lobby, [http_error(503), http_error(429, {"Retry-After": "0.01"})])
+        denied = FlakyMember(guild, lobby, [discord.Forbidden(http_error(403).response, "denied")])
+        scheduler = MoveScheduler(base_delay=0.01)
+
+        async def main():
+            report = await scheduler.move([(flaky, target), (denied, target)])
+            await scheduler.close()
+            return report
+
+        report = asyncio.run(main())
+
+        self.assertEqual(report.moved, 1)
+        self.assertEqual(flaky.voice.channel, target)
+        self.assertEqual([m for m, _ in report.failed], [denied])
+        self.assertEqual(scheduler.retries, 2)
+
+    def test_higher_priority_moves_go_first(self):
+        guild = FakeGuild()
+        lobby, members = make_lobby(guild, 6)
+        target = FakeVoiceChannel(guild, "Target", None)
+        scheduler = MoveScheduler(rate=1000, burst=1, workers=1)
+        order = []
+
+        for member in members:
+            original = member.move_to
+
+            async def move_to(channel, member=member, original=original):
+                order.append(member)
+                await original(channel)
+
+            member.move_to = move_to
+
+        async def main():
+            bulk = asyncio.create_task(scheduler.move([(m, target) for m in members[:3]], MovePriority.BULK))
+            pairs = asyncio.create_task(scheduler.move([(m, target) for m in members[3:]], MovePriority.PAIR))
+            await asyncio.gather(bulk, pairs)
+            await scheduler.close()
+
+        asyncio.run(main())
+
+        # Both batches are queued before the worker starts
+        self.assertEqual(order, members[3:] + members[:3])
+
+    def test_progress_ends_with_the_total_and_skips_disconnected(self):
+        guild = FakeGuild()
+        lobby, members = make_lobby(guild, 4)
+        target = FakeVoiceChannel(guild, "Target", None)
+        members[0].voice = None
+        updates = []
+
+        async def progress(done, total):
+            updates.append((done, total))
+
+        async def main():
+            scheduler = MoveScheduler(progress_interval=0)
+            report = await scheduler.move([(m, target) for m in members], progress=progress)
+            await scheduler.close()
+            return report
+
+        report = asyncio.run(main())
+
+        self.assertEqual((report.moved, report.skipped), (3, 1))
+        self.assertEqual(updates[-1], (4, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
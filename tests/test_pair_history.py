@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+import unittest
+from services.matchmaker import MatchmakerService
+from services.pair_history import PairHistory
+
+
+class TestPairHistory(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime.now(timezone.utc)
+
+    def test_from_rows_lookup(self):
+        history = PairHistory.from_rows([(1, 2, 1_000), (3, 7, 2_000)])
+
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history.get(1, 2), 1_000)
+        self.assertEqual(history.get(7, 3), 2_000)
+        self.assertIsNone(history.get(1, 3))
+        self.assertIn((2, 1), history)
+
+    def test_empty(self):
+        history = PairHistory.from_rows([])
+
+        self.assertEqual(len(history), 0)
+        self.assertIsNone(history.get(1, 2))
+
+    def test_from_mapping_normalizes_order(self):
+        last_met = self.now - timedelta(days=1)
+        history = PairHistory.from_mapping({(5, 2): last_met})
+
+        self.assertEqual(history.user_low.tolist(), [2])
+        self.assertEqual(history.user_high.tolist(), [5])
+        self.assertEqual(history.get(2, 5), int(last_met.timestamp()))
+
+    def test_matchmaker_accepts_both_formats(self):
+        users = [1, 2, 3, 4]
+        mapping = {(1, 2): self.now - timedelta(hours=1), (3, 4): self.now - timedelta(hours=2)}
+        history = PairHistory.from_mapping(mapping)
+
+        weights_from_mapping = MatchmakerService.build_weight_matrix(users, mapping, now=self.now)
+        weights_from_history = MatchmakerService.build_weight_matrix(users, history, now=self.now)
+
+        self.assertTrue((weights_from_mapping == weights_from_history).all())
+        self.assertEqual(weights_from_history[2, 3], 7200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+import discord
+from services.rate_limit import AdaptiveLimiter
+from tests.fakes import http_error
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_concurrency_is_bounded(self):
+        limiter = AdaptiveLimiter(limit=3)
+        active = 0
+        peak = 0
+
+        async def call():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return True
+
+        async def main():
+            return await asyncio.gather(*(limiter.run(call) for _ in range(12)))
+
+        results = asyncio.run(main())
+
+        self.assertEqual(results, [True] * 12)
+        self.assertLessEqual(peak, 3)
+
+    def test_rate_limit_is_retried_and_backs_off(self):
+        limiter = AdaptiveLimiter(limit=4, base_delay=0.001)
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise http_error(429, {"Retry-After": "0.01"})
+            return "ok"
+
+        result = asyncio.run(limiter.run(call))
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(limiter.rate_limited, 1)
+        self.assertEqual(limiter.retries, 1)
+
+    def test_permanent_error_is_raised(self):
+        limiter = AdaptiveLimiter(base_delay=0.001)
+
+        async def call():
+            raise http_error(403)
+
+        with self.assertRaises(discord.HTTPException):
+            asyncio.run(limiter.run(call))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timezone
+import unittest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database.models import Meeting, PairLastMet, Round, User
+from database.repository import MeetingRepository
+from tests.fakes import SqliteSession, sqlite_engine
+
+
+class RepositoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlite_engine()
+
+    def run_repo(self, work):
+        """Runs work(repository) in one session and commits. Returns: (result, statements executed)"""
+
+        async def main():
+            async with SqliteSession(self.engine) as session:
+                result = await work(MeetingRepository(session))
+                await session.commit()
+                return result, session.statements
+
+        return asyncio.run(main())
+
+    def rows(self, *columns):
+        with Session(self.engine) as session:
+            return session.execute(select(*columns)).all()
+
+    def pair_last_met(self):
+        return {
+            (low, high): count
+            for low, high, count in self.rows(PairLastMet.user_low, PairLastMet.user_high, PairLastMet.meet_count)
+        }
+
+
+class TestPairLastMet(RepositoryTestCase):
+    def test_meetings_upsert_one_row_per_pair(self):
+        users = [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+        self.run_repo(lambda repo: repo.create_round(1, 5, users, [(2, 1), (3, 4)], "r1"))
+        self.run_repo(lambda repo: repo.create_round(1, 5, users, [(1, 2), (4, 1)], "r2"))
+
+        self.assertEqual(self.pair_last_met(), {(1, 2): 2, (3, 4): 1, (1, 4): 1})
+        self.assertEqual(len(self.rows(Meeting.id)), 4)
+
+    def test_a_replayed_older_round_keeps_the_later_meeting(self):
+        later = datetime(2099, 1, 1, tzinfo=timezone.utc)
+        with Session(self.engine) as session:
+            session.add_all([User(id=1, username="a"), User(id=2, username="b")])
+            session.add(PairLastMet(user_low=1, user_high=2, last_met_at=later, meet_count=1))
+            session.commit()
+
+        self.run_repo(lambda repo: repo.create_round(1, 5, [(1, "a"), (2, "b")], [(1, 2)], "replayed"))
+
+        [(last_met_at, count)] = self.rows(PairLastMet.last_met_at, PairLastMet.meet_count)
+        self.assertEqual(last_met_at.replace(tzinfo=timezone.utc), later)
+        self.assertEqual(count, 2)
+
+    def test_history_reads(self):
+        users = [(uid, f"user{uid}") for uid in range(1, 6)]
+        self.run_repo(lambda repo: repo.create_round(1, 5, users, [(1, 2), (3, 4)], "r1"))
+        self.run_repo(lambda repo: repo.create_round(1, 5, users, [(1, 5), (2, 3)], "r2"))
+
+        lobby, _ = self.run_repo(lambda repo: repo.get_past_meetings_with_time([1, 2, 3]))
+        full, _ = self.run_repo(lambda repo: repo.get_full_history([3]))
+
+        # Only pairs inside the lobby, but every partner for the cache
+        self.assertEqual(sorted((u, v) for u, v, _ in lobby.pairs()), [(1, 2), (2, 3)])
+        self.assertEqual(sorted((u, v) for u, v, _ in full.pairs()), [(2, 3), (3, 4)])
+        self.assertIsNotNone(lobby.get(2, 1))
+
+
+class TestCreateRound(RepositoryTestCase):
+    def test_constant_number_of_statements(self):
+        small = [(1, "a"), (2, "b")]
+        large = [(uid, f"user{uid}") for uid in range(10, 50)]
+
+        _, small_statements = self.run_repo(lambda repo: repo.create_round(1, 5, small, [(1, 2)], "small"))
+        _, large_statements = self.run_repo(
+            lambda repo: repo.create_round(1, 5, large, [(u, u + 1) for u in range(10, 50, 2)], "large")
+        )
+
+        self.assertEqual(small_statements, 4)  # Users, round, meetings, pair_last_met
+        self.assertEqual(large_statements, small_statements)
+        self.assertEqual(len(self.rows(Meeting.id)), 21)
+
+    def test_a_ref_is_written_once(self):
+        users = [(1, "a"), (2, "b")]
+        first, _ = self.run_repo(lambda repo: repo.create_round(1, 5, users, [(1, 2)], "same"))
+        again, statements = self.run_repo(lambda repo: repo.create_round(1, 5, users, [(1, 2)], "same"))
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(again)
+        self.assertEqual(statements, 2)  # No meetings for a round that was not written
+        self.assertEqual(self.rows(func.count(Round.id)), [(1,)])
+        self.assertEqual(self.pair_last_met(), {(1, 2): 1})
+
+    def test_usernames_are_updated(self):
+        self.run_repo(lambda repo: repo.create_round(1, 5, [(1, "old"), (2, "b")], [(1, 2)], "r1"))
+        self.run_repo(lambda repo: repo.create_round(1, 5, [(1, "new"), (2, "b")], [(1, 2)], "r2"))
+
+        self.assertEqual(sorted(self.rows(User.id, User.username)), [(1, "new"), (2, "b")])
+
+    def test_meetings_added_mid_round(self):
+        self.run_repo(lambda repo: repo.create_round(1, 5, [(1, "a"), (2, "b"), (3, "c")], [(1, 2)], "r1"))
+
+        added, _ = self.run_repo(lambda repo: repo.add_round_meetings("r1", [(3, "c"), (4, "d")], [(4, 3)]))
+        missing, _ = self.run_repo(lambda repo: repo.add_round_meetings("nope", [(3, "c")], [(3, 1)]))
+
+        self.assertTrue(added)
+        self.assertFalse(missing)
+        meetings = self.rows(Meeting.round_id, Meeting.user_1_id, Meeting.user_2_id)
+        self.assertEqual(sorted(meetings), [(1, 1, 2), (1, 4, 3)])
+        self.assertEqual(self.pair_last_met(), {(1, 2): 1, (3, 4): 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
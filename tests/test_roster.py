@@ -0,0 +1,55 @@
+import unittest
+from services.roster import VoiceRoster
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel
+
+
+class TestVoiceRoster(unittest.TestCase):
+    def setUp(self):
+        self.guild = FakeGuild()
+        self.lobby = FakeVoiceChannel(self.guild, "Lobby", None)
+        self.session = FakeVoiceChannel(self.guild, "Session 1", None)
+        self.members = [FakeMember(self.guild, channel=self.lobby) for _ in range(3)]
+        self.roster = VoiceRoster()
+        self.roster.watch(self.lobby)
+
+    def test_watch_seeds_from_the_channel_once(self):
+        newcomer = FakeMember(self.guild, channel=self.lobby)
+
+        self.roster.watch(self.lobby)  # Already watched: the channel is not read again
+
+        self.assertEqual(self.roster.members(self.lobby.id), self.members)
+        self.assertFalse(self.roster.contains(self.lobby.id, newcomer.id))
+
+    def test_updates_follow_joins_moves_and_departures(self):
+        self.roster.watch(self.session)
+        newcomer = FakeMember(self.guild)
+
+        self.assertTrue(self.roster.update(newcomer, None, self.lobby))
+        self.assertTrue(self.roster.update(self.members[0], self.lobby, self.session))
+        self.assertTrue(self.roster.update(self.members[1], self.lobby, None))
+
+        self.assertEqual(self.roster.members(self.lobby.id), [self.members[2], newcomer])
+        self.assertEqual(self.roster.members(self.session.id), [self.members[0]])
+        self.assertEqual(self.roster.count(self.session.id), 1)
+
+    def test_unwatched_channels_are_ignored(self):
+        elsewhere = FakeVoiceChannel(self.guild, "General", None)
+        stranger = FakeMember(self.guild)
+
+        self.assertFalse(self.roster.update(stranger, None, elsewhere))
+        self.assertEqual(self.roster.members(elsewhere.id), [])
+        self.assertEqual(self.roster.count(elsewhere.id), 0)
+
+    def test_retain_and_resync(self):
+        self.roster.watch(self.session)
+        self.members[0].voice.channel.members.remove(self.members[0])  # Left while no events arrived
+
+        self.roster.retain([self.lobby.id])
+        self.roster.resync()
+
+        self.assertFalse(self.roster.is_watched(self.session.id))
+        self.assertEqual(self.roster.members(self.lobby.id), self.members[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
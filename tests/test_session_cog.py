@@ -0,0 +1,193 @@
+import asyncio
+import unittest
+from unittest import mock
+from bot.cogs.session_cog import SessionCog
+from config import settings
+from services.session_registry import RoundPlan
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel
+
+ROUND_SECONDS = 0.3
+
+
+class FakeContext:
+    def __init__(self, guild, author):
+        self.guild = guild
+        self.author = author
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+    async def reply(self, content):
+        self.sent.append(content)
+
+
+class FakeBot:
+    guilds = []
+
+
+class TestSessionLifecycle(unittest.TestCase):
+    def setUp(self):
+        # One-minute rounds, the next one prepared 0.1 s after the current one starts
+        patcher = mock.patch.object(settings, "SESSION_PREPARE_LEAD_SECONDS", 60 - ROUND_SECONDS / 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.guild = FakeGuild()
+        self.guild.voice_client = None
+        self.lobby = FakeVoiceChannel(self.guild, "Lobby", None)
+        self.members = [FakeMember(self.guild, channel=self.lobby) for _ in range(4)]
+        self.cog = SessionCog(FakeBot())
+        self.ctx = FakeContext(self.guild, self.members[0])
+        self.matched = []  # Participant ids of every match, in order
+
+        async def match(ctx, participants):
+            ids = sorted(m.id for m in participants)
+            self.matched.append(ids)
+            return [(ids[i], ids[i + 1]) for i in range(0, len(ids) - 1, 2)]
+
+        async def record(ctx, participants, duration_minutes, pairs):
+            return f"round-{len(self.matched)}"
+
+        async def update_status(round_ref, status):
+            pass
+
+        async def run_round(ctx, plan, duration_minutes):
+            await asyncio.sleep(ROUND_SECONDS)
+
+        self.cog._match_participants = match
+        self.cog._record_round = record
+        self.cog._update_round_status = update_status
+        self.cog._run_round = run_round
+
+    def test_next_round_is_prepared_late_with_who_is_there(self):
+        async def main():
+            session = self.cog.sessions.get(self.guild.id)
+            session.roster.watch(self.lobby)
+            participants, sitter, user_map = self.cog._prepare_participants(self.ctx, self.members)
+            plan = RoundPlan(await self.cog._match_participants(self.ctx, participants), sitter, user_map, participants)
+            task = asyncio.create_task(self.cog._session_lifecycle(self.ctx, plan, self.lobby, 2, 1, 0.0))
+
+            await asyncio.sleep(ROUND_SECONDS / 6)
+            late = FakeMember(self.guild, channel=self.lobby)
+            session.roster.update(late, None, self.lobby)
+            late_joiner_id = late.id
+            await asyncio.sleep(ROUND_SECONDS / 6)
+            channels_before_lead = self.guild.api_calls.count("create_voice_channel")
+
+            await task
+            await self.cog.sessions.close()
+            return late_joiner_id, channels_before_lead
+
+        late_joiner_id, channels_before_lead = asyncio.run(main())
+
+        self.assertEqual(channels_before_lead, 2)  # Only the running round's channels
+        self.assertEqual(len(self.matched), 2)
+        self.assertIn(late_joiner_id, self.matched[1])
+        self.assertNotIn(self.members[0].id, self.matched[1])  # Five people: the author sits out
+
+
+class TestRematch(unittest.TestCase):
+    def setUp(self):
+        self.guild = FakeGuild()
+        self.lobby = FakeVoiceChannel(self.guild, "Lobby", None)
+        self.members = [FakeMember(self.guild, channel=self.lobby) for _ in range(8)]
+        self.sitter = FakeMember(self.guild, channel=self.lobby)
+        self.cog = SessionCog(FakeBot())
+        self.ctx = FakeContext(self.guild, self.members[0])
+        self.candidates = []  # Participant ids of every match
+        self.recorded = []  # (round ref, member ids, pairs) of every _record_meetings
+        self.next_pairs = []
+
+        async def match(ctx, participants):
+            self.candidates.append(sorted(m.id for m in participants))
+            return self.next_pairs
+
+        async def record_meetings(ctx, round_ref, members, pairs):
+            self.recorded.append((round_ref, sorted(m.id for m in members), pairs))
+
+        self.cog._match_participants = match
+        self.cog._record_meetings = record_meetings
+
+    async def start_round(self) -> RoundPlan:
+        """Four pairs in their channels and the sitter in the lobby. Returns: the live plan"""
+        pairs = [(self.members[i].id, self.members[i + 1].id) for i in range(0, 8, 2)]
+        user_map = {m.id: m for m in self.members}
+        service = self.cog._get_voice_service(self.guild)
+        channels = await service.prepare_channels(pairs, user_map)
+        await service.move_pairs_to_channels(pairs, user_map, channels)
+
+        session = self.cog.sessions.get(self.guild.id)
+        for channel in channels:
+            session.roster.watch(channel)
+        session.plan = RoundPlan(pairs, self.sitter, user_map, self.members + [self.sitter], "round-1", channels, True)
+        return session.plan
+
+    def leave(self, member):
+        channel = member.voice.channel
+        channel.members.remove(member)
+        member.voice = None
+        self.cog.sessions.get(self.guild.id).roster.update(member, channel, None)
+
+    def rematch(self, orphaned):
+        """Starts a round, runs orphaned(plan), then !rematch. Returns: the plan"""
+
+        async def main():
+            plan = await self.start_round()
+            orphaned(plan)
+            await self.cog.rematch.callback(self.cog, self.ctx)  # The cog is not added to a bot
+            await self.cog.sessions.close()
+            return plan
+
+        return asyncio.run(main())
+
+    def test_orphans_and_the_sitter_are_paired_in_an_orphans_channel(self):
+        a, b, c, d, e, f, g, h = self.members
+        self.next_pairs = [(h.id, c.id), (e.id, self.sitter.id)]
+
+        # c, e and h are left alone in channels 1, 2 and 3
+        plan = self.rematch(lambda plan: [self.leave(member) for member in (d, f, g)])
+
+        self.assertEqual(self.candidates, [sorted([c.id, e.id, h.id, self.sitter.id])])
+        self.assertEqual(plan.pairs, [(a.id, b.id), (h.id, c.id), (e.id, self.sitter.id), (g.id, h.id)])
+        self.assertEqual({m.id for m in plan.channels[1].members}, {c.id, h.id})  # The lower of their channels
+        self.assertEqual({m.id for m in plan.channels[2].members}, {e.id, self.sitter.id})
+        self.assertEqual(plan.channels[3].members, [])
+        self.assertIsNone(plan.sitter)
+        self.assertIs(plan.user_map[self.sitter.id], self.sitter)
+        self.assertEqual(self.recorded, [("round-1", sorted([c.id, e.id, h.id, self.sitter.id]), self.next_pairs)])
+        self.assertEqual(self.ctx.sent, ["Rematched 4 people."])
+
+    def test_sitter_stays_out_when_paired_orphans_suffice(self):
+        a, b, c, d = self.members[:4]
+        self.next_pairs = [(a.id, c.id)]  # The matcher left the sitter out again
+
+        plan = self.rematch(lambda plan: [self.leave(member) for member in (b, d)])
+
+        self.assertEqual(self.candidates, [sorted([a.id, c.id, self.sitter.id])])
+        self.assertEqual(plan.pairs[0], (a.id, c.id))
+        self.assertEqual({m.id for m in plan.channels[0].members}, {a.id, c.id})
+        self.assertIs(plan.sitter, self.sitter)
+        self.assertEqual(self.recorded, [("round-1", sorted([a.id, c.id]), self.next_pairs)])
+
+    def test_nobody_to_rematch(self):
+        a, b, c, d = self.members[:4]
+
+        def orphaned(plan):
+            self.leave(b)  # a is alone, but the sitter has left voice
+            self.leave(self.sitter)
+            self.leave(c)
+            self.leave(d)
+            bot = FakeMember(self.guild, channel=plan.channels[1])  # A bot alone is never rematched
+            bot.bot = True
+            self.cog.sessions.get(self.guild.id).roster.update(bot, None, plan.channels[1])
+
+        plan = self.rematch(orphaned)
+
+        self.assertEqual(self.candidates, [])
+        self.assertEqual(self.ctx.sent, ["Nobody to rematch."])
+        self.assertEqual(plan.pairs[0], (a.id, b.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
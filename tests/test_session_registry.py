@@ -0,0 +1,108 @@
+import asyncio
+import random
+import unittest
+from services.move_scheduler import MoveScheduler
+from services.session_registry import SessionRegistry
+from services.voice_service import VoiceService
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel
+
+
+class TestGuildSession(unittest.TestCase):
+    def test_second_start_in_the_same_guild_is_rejected(self):
+        registry = SessionRegistry()
+
+        async def main():
+            session = registry.get(1)
+            session.start(asyncio.sleep(1))
+            with self.assertRaises(RuntimeError):
+                session.start(asyncio.sleep(1))
+            other = registry.get(2)
+            other.start(asyncio.sleep(1))
+            running = registry.running
+            await registry.close()
+            return running
+
+        self.assertEqual(asyncio.run(main()), 2)
+        self.assertEqual(registry.running, 0)
+
+    def test_stop_only_cancels_its_own_guild(self):
+        registry = SessionRegistry()
+
+        async def main():
+            first = registry.get(1).start(asyncio.sleep(1))
+            second = registry.get(2).start(asyncio.sleep(1))
+            self.assertTrue(registry.get(1).stop())
+            await asyncio.sleep(0)
+            result = first.cancelled(), second.cancelled(), registry.get(1).is_running, registry.get(2).is_running
+            await registry.close()
+            return result
+
+        self.assertEqual(asyncio.run(main()), (True, False, False, True))
+
+
+class TestSessionRegistryStress(unittest.TestCase):
+    def test_many_guilds_start_and_stop_rounds_concurrently(self):
+        guild_count = 40
+        rounds_per_guild = 3
+        rng = random.Random(7)
+        registry = SessionRegistry()
+        guilds = [FakeGuild(latency=0.001) for _ in range(guild_count)]
+        lobbies = {}
+        outcomes = []
+        rejected = 0
+
+        async def run_round(guild, pairs, user_map):
+            voice = registry.get(guild.id).voice
+            channels = None
+            try:
+                channels = await voice.prepare_channels(pairs, user_map)
+                await voice.move_pairs_to_channels(pairs, user_map, channels)
+                await asyncio.sleep(rng.uniform(0.01, 0.05))
+                outcomes.append((guild.id, "completed"))
+            except asyncio.CancelledError:
+                outcomes.append((guild.id, "cancelled"))
+                raise
+            finally:
+                await voice.teardown(pairs, user_map, lobbies[guild.id], channels)
+
+        async def host(guild):
+            nonlocal rejected
+            session = registry.get(guild.id)
+            session.mover = MoveScheduler(rate=10_000, burst=50, workers=10)
+            session.voice = VoiceService(guild, mover=session.mover)
+            lobby = lobbies[guild.id] = FakeVoiceChannel(guild, "Lobby", None)
+            members = [FakeMember(guild, channel=lobby) for _ in range(2 * rng.randint(1, 8))]
+            pairs = [(members[i].id, members[i + 1].id) for i in range(0, len(members), 2)]
+            user_map = {m.id: m for m in members}
+
+            for _ in range(rounds_per_guild):
+                async with session.lock:
+                    task = session.start(run_round(guild, pairs, user_map))
+                # A second !start while the round runs is refused
+                if session.is_busy:
+                    rejected += 1
+                if rng.random() < 0.5:
+                    await asyncio.sleep(0.005)
+                    session.stop()
+                await asyncio.gather(task, return_exceptions=True)
+
+            return lobby, members
+
+        async def main():
+            results = await asyncio.gather(*(host(guild) for guild in guilds))
+            await registry.close()
+            return results
+
+        results = asyncio.run(main())
+
+        self.assertEqual(len(outcomes), guild_count * rounds_per_guild)
+        self.assertEqual(rejected, guild_count * rounds_per_guild)
+        self.assertEqual(registry.running, 0)
+        for guild, (lobby, members) in zip(guilds, results):
+            self.assertEqual(sorted(m.id for m in lobby.members), sorted(m.id for m in members))
+            self.assertTrue(all(not c.overwrites for c in registry.get(guild.id).voice.pool.values()))
+            self.assertEqual(registry.get(guild.id).voice.temp_channels, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import asyncio
+import time
+import unittest
+from services.signaling import MESSAGE_LIMIT, SignalingService, chunk_mentions
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel
+
+
+class TestChunkMentions(unittest.TestCase):
+    def test_chunks_fit_the_limit_and_keep_every_mention(self):
+        mentions = [f"<@{100000000000000000 + i}>" for i in range(300)]
+        footer = "**30 seconds remaining!**"
+
+        messages = chunk_mentions(mentions, footer)
+
+        self.assertGreater(len(messages), 1)
+        self.assertTrue(all(len(m) <= MESSAGE_LIMIT for m in messages))
+        self.assertTrue(all(m.endswith(footer) for m in messages))
+        sent = [word for m in messages for word in m.split("\n")[0].split(" ")]
+        self.assertEqual(sent, mentions)
+
+    def test_small_lobby_is_one_message(self):
+        self.assertEqual(chunk_mentions(["<@1>", "<@2>"], "end"), ["<@1> <@2>\nend"])
+        self.assertEqual(chunk_mentions([], "end"), ["end"])
+
+
+class TestSignalingService(unittest.TestCase):
+    def test_all_channels_are_signaled_concurrently(self):
+        guild = FakeGuild(latency=0.05)
+        channels = [FakeVoiceChannel(guild, f"Session {i}", None) for i in range(1, 21)]
+        for channel in channels:
+            FakeMember(guild, channel=channel)
+        announced = []
+
+        async def announce(message):
+            announced.append(message)
+
+        async def main():
+            signaling = SignalingService()
+            started = time.perf_counter()
+            await signaling.warn(guild, channels, ["<@1>", "<@2>"], announce, "30s left")
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(main())
+
+        self.assertEqual(guild.api_calls.count("send_message"), 20)
+        self.assertEqual(announced, ["<@1> <@2>\n30s left"])
+        # 20 channels, 5 at a time: four round trips, not twenty
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+import asyncio
+import unittest
+from services.move_scheduler import MoveScheduler
+from services.voice_service import VoiceService
+from tests.fakes import FakeGuild, FakeMember, FakeVoiceChannel
+
+
+def make_pairs(guild: FakeGuild, count: int):
+    lobby = FakeVoiceChannel(guild, "Lobby", None)
+    members = [FakeMember(guild, channel=lobby) for _ in range(2 * count)]
+    pairs = [(members[i].id, members[i + 1].id) for i in range(0, len(members), 2)]
+    return pairs, {m.id: m for m in members}
+
+
+class TestVoiceServicePool(unittest.TestCase):
+    def test_channels_are_reused_between_rounds(self):
+        guild = FakeGuild()
+        service = VoiceService(guild)
+
+        async def main():
+            first = await service.prepare_channels(*make_pairs(guild, 3))
+            await service.cleanup()
+            second = await service.prepare_channels(*make_pairs(guild, 2))
+            await service.cleanup()
+            return first, second
+
+        first, second = asyncio.run(main())
+
+        self.assertEqual([c.name for c in first], ["Session 1", "Session 2", "Session 3"])
+        self.assertEqual([c.id for c in second], [c.id for c in first[:2]])
+        self.assertEqual(guild.api_calls.count("create_voice_channel"), 3)
+        self.assertEqual(guild.api_calls.count("delete_channel"), 0)
+
+    def test_pool_is_rediscovered_after_restart(self):
+        guild = FakeGuild()
+
+        async def main():
+            await VoiceService(guild).prepare_channels(*make_pairs(guild, 2))
+            restarted = VoiceService(guild)
+            return await restarted.prepare_channels(*make_pairs(guild, 3))
+
+        channels = asyncio.run(main())
+
+        self.assertEqual([c.name for c in channels], ["Session 1", "Session 2", "Session 3"])
+        self.assertEqual(guild.api_calls.count("create_voice_channel"), 3)
+        self.assertEqual(guild.api_calls.count("create_category"), 1)
+
+    def test_zero_idle_timeout_deletes_after_round(self):
+        guild = FakeGuild()
+        service = VoiceService(guild, idle_timeout=0)
+
+        async def main():
+            await service.prepare_channels(*make_pairs(guild, 2))
+            await service.cleanup()
+
+        asyncio.run(main())
+
+        self.assertEqual(service.pool, {})
+        self.assertEqual(guild.api_calls.count("delete_channel"), 2)
+
+
+class TestVoiceServiceOverwrites(unittest.TestCase):
+    def test_new_channels_are_created_with_pair_overwrites(self):
+        guild = FakeGuild()
+        service = VoiceService(guild)
+        pairs, user_map = make_pairs(guild, 2)
+
+        async def main():
+            channels = await service.prepare_channels(pairs, user_map)
+            await service.move_pairs_to_channels(pairs, user_map, channels)
+            return channels
+
+        channels = asyncio.run(main())
+
+        for channel, pair in zip(channels, pairs):
+            self.assertEqual(set(channel.overwrites), {user_map[uid] for uid in pair})
+            self.assertTrue(channel.overwrites[user_map[pair[0]]].connect)
+            self.assertEqual({m.id for m in channel.members}, set(pair))
+        self.assertNotIn("set_permissions", guild.api_calls)
+        self.assertNotIn("edit_channel", guild.api_calls)
+
+    def test_reused_channels_get_a_single_edit(self):
+        guild = FakeGuild()
+        service = VoiceService(guild)
+
+        async def main():
+            await service.prepare_channels(*make_pairs(guild, 3))
+            await service.cleanup()
+            guild.api_calls.clear()
+            pairs, user_map = make_pairs(guild, 3)
+            channels = await service.prepare_channels(pairs, user_map)
+            return channels, pairs, user_map
+
+        channels, pairs, user_map = asyncio.run(main())
+
+        self.assertEqual(guild.api_calls, ["edit_channel"] * 3)
+        for channel, pair in zip(channels, pairs):
+            self.assertEqual(set(channel.overwrites), {user_map[uid] for uid in pair})
+
+
+class TestVoiceServiceTeardown(unittest.TestCase):
+    def test_channels_are_deleted_as_soon_as_they_empty(self):
+        guild = FakeGuild(latency=0.01)
+        service = VoiceService(guild, idle_timeout=0, mover=MoveScheduler(rate=1000, burst=1, workers=1))
+        pairs, user_map = make_pairs(guild, 3)
+        lobby = next(iter(user_map.values())).voice.channel
+
+        async def main():
+            channels = await service.prepare_channels(pairs, user_map)
+            await service.move_pairs_to_channels(pairs, user_map, channels)
+            guild.api_calls.clear()
+            report = await service.teardown(pairs, user_map, lobby, channels)
+            await service.mover.close()
+            return report
+
+        report = asyncio.run(main())
+
+        self.assertEqual(report.moved, 6)
+        self.assertEqual(len(lobby.members), 6)
+        self.assertEqual(service.pool, {})
+        self.assertEqual(service.temp_channels, [])
+        self.assertEqual(guild.api_calls.count("delete_channel"), 3)
+        # The first channel is gone while later pairs are still being moved
+        self.assertLess(guild.api_calls.index("delete_channel"), len(guild.api_calls) - 3)
+
+    def test_pooled_channels_are_released_with_reset_permissions(self):
+        guild = FakeGuild()
+        service = VoiceService(guild)
+        pairs, user_map = make_pairs(guild, 2)
+        lobby = next(iter(user_map.values())).voice.channel
+
+        async def main():
+            channels = await service.prepare_channels(pairs, user_map)
+            await service.move_pairs_to_channels(pairs, user_map, channels)
+            await service.teardown(pairs, user_map, lobby, channels)
+            return channels
+
+        channels = asyncio.run(main())
+
+        self.assertEqual(len(service.pool), 2)
+        self.assertEqual([c.overwrites for c in channels], [{}, {}])
+        self.assertNotIn("delete_channel", guild.api_calls)
+
+    def test_leftover_channels_are_swept_at_startup(self):
+        guild = FakeGuild()
+
+        async def main():
+            await VoiceService(guild).prepare_channels(*make_pairs(guild, 3))
+            restarted = VoiceService(guild, idle_timeout=0)
+            await restarted.discover()
+            return restarted
+
+        restarted = asyncio.run(main())
+
+        self.assertEqual(restarted.pool, {})
+        self.assertEqual(guild.api_calls.count("delete_channel"), 3)
+
+    def test_discovery_leaves_channels_in_use_alone(self):
+        guild = FakeGuild()
+        service = VoiceService(guild, idle_timeout=0)
+        pairs, user_map = make_pairs(guild, 4)
+
+        async def main():
+            live = await service.prepare_channels(pairs[:2], user_map)
+            await service.move_pairs_to_channels(pairs[:2], user_map, live)
+            upcoming = await service.prepare_channels(pairs[2:], user_map)  # Empty until the switch
+            guild.api_calls.clear()
+
+            await service.discover()  # on_ready after a failed resume
+            service._discovered = False
+            await service.discover()  # A sweep must skip them as well
+            return live + upcoming
+
+        channels = asyncio.run(main())
+
+        for channel, pair in zip(channels, pairs):
+            self.assertEqual(set(channel.overwrites), {user_map[uid] for uid in pair})
+        self.assertEqual(guild.api_calls, [])
+        self.assertEqual(sorted(service.pool), [1, 2, 3, 4])
+        self.assertEqual(len(service.temp_channels), 4)
+
+
+class TestVoiceServiceSwitchRounds(unittest.TestCase):
+    def test_pairs_move_straight_into_the_next_rounds_channels(self):
+        guild = FakeGuild()
+        service = VoiceService(guild)
+        pairs, user_map = make_pairs(guild, 2)
+        lobby = next(iter(user_map.values())).voice.channel
+        a, b, c, d = [uid for pair in pairs for uid in pair]
+        next_pairs = [(a, c), (b, d)]
+
+        async def main():
+            channels = await service.prepare_channels(pairs, user_map)
+            await service.move_pairs_to_channels(pairs, user_map, channels)
+            # Provisioned while the first round is still running
+            next_channels = await service.prepare_channels(next_pairs, user_map)
+            guild.api_calls.clear()
+            report = await service.switch_rounds(pairs, channels, next_pairs, next_channels, user_map, lobby)
+            return channels, next_channels, report
+
+        channels, next_channels, report = asyncio.run(main())
+
+        self.assertEqual([c.name for c in next_channels], ["Session 3", "Session 4"])
+        self.assertEqual(report.moved, 4)
+        self.assertEqual(guild.api_calls.count("move_member"), 4)
+        self.assertEqual({m.id for m in next_channels[0].members}, {a, c})
+        self.assertEqual(lobby.members, [])
+        self.assertEqual(service.temp_channels, next_channels)
+        self.assertEqual([ch.overwrites for ch in channels], [{}, {}])
+
+
+class TestVoiceServiceRematch(unittest.TestCase):
+    def test_orphan_is_joined_in_their_channel(self):
+        guild = FakeGuild()
+        service = VoiceService(guild)
+        pairs, user_map = make_pairs(guild, 2)
+        lobby = next(iter(user_map.values())).voice.channel
+        sitter = FakeMember(guild, channel=lobby)
+        a, b, c, d = [uid for pair in pairs for uid in pair]
+
+        async def main():
+            channels = await service.prepare_channels(pairs, user_map)
+            await service.move_pairs_to_channels(pairs, user_map, channels)
+            user_map[b].voice.channel.members.remove(user_map[b])  # b left mid-round
+            user_map[b].voice = None
+            guild.api_calls.clear()
+            report = await service.rematch([(a, sitter.id)], {**user_map, sitter.id: sitter}, channels[:1])
+            return channels, report
+
+        channels, report = asyncio.run(main())
+
+        self.assertEqual(report.moved, 1)
+        self.assertEqual(report.skipped, 1)  # a is already there
+        self.assertEqual(guild.api_calls, ["edit_channel", "move_member"])
+        self.assertEqual(set(channels[0].overwrites), {user_map[a], sitter})
+        self.assertEqual({m.id for m in channels[0].members}, {a, sitter.id})
+        self.assertEqual({m.id for m in channels[1].members}, {c, d})
+
+
+if __name__ == "__main__":
+    unittest.main()
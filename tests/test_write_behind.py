@@ -0,0 +1,240 @@
+import asyncio
+from datetime import datetime, timezone
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from database import write_behind
+from database.models import Meeting, PairLastMet, Round, RoundStatus
+from database.write_behind import RoundWriter
+from tests.fakes import SqliteSession, sqlite_engine
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.rows = []  # Committed (kind, ref) in commit order
+        self.down = False  # Every commit fails with a transient error
+        self.bad_refs = set()  # Rounds whose insert fails permanently
+
+    def session(self):
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.staged = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        if self.db.down:
+            raise OperationalError("COMMIT", {}, Exception("connection refused"))
+        self.db.rows.extend(self.staged)
+
+
+class FakeRepository:
+    def __init__(self, session: FakeSession):
+        self.session = session
+
+    async def create_round(self, guild_id, duration_minutes, users, pairs, ref, started_at=None):
+        if ref in self.session.db.bad_refs:
+            raise IntegrityError("INSERT", {}, Exception("violates check constraint"))
+        self.session.staged.append(("round", ref))
+
+    async def add_round_meetings(self, ref, users, pairs, met_at=None):
+        self.session.staged.append(("meetings", ref))
+        return True
+
+    async def update_round_status(self, ref, status):
+        self.session.staged.append(("status", ref, status.value))
+        return True
+
+
+class TestRoundWriter(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.spool_path = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+        patcher = mock.patch.object(write_behind, "MeetingRepository", FakeRepository)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_writer(self, batch_size: int = 100) -> RoundWriter:
+        return RoundWriter(self.db.session, self.spool_path, batch_size=batch_size, retry_delay=0.01)
+
+    def spool(self):
+        with open(self.spool_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_jobs_land_in_submit_order(self):
+        async def main():
+            writer = self.make_writer()
+            await writer.start()
+            ref = await writer.submit_round(1, 5, [(10, "a"), (11, "b")], [(10, 11)])
+            await writer.submit_meetings(ref, [(12, "c")], [(11, 12)])
+            await writer.submit_status(ref, RoundStatus.COMPLETED)
+            await writer.drain()
+            await writer.stop()
+            return ref
+
+        ref = asyncio.run(main())
+
+        self.assertEqual(self.db.rows, [("round", ref), ("meetings", ref), ("status", ref, "completed")])
+
+    def test_spool_is_compacted_once_everything_is_acknowledged(self):
+        async def main():
+            writer = self.make_writer()
+            await writer.start()
+            await writer.submit_round(1, 5, [], [])
+            await writer.drain()
+            await asyncio.sleep(0.05)  # Compaction follows the ack
+            size = os.path.getsize(self.spool_path)
+            await writer.stop()
+            return size
+
+        self.assertEqual(asyncio.run(main()), 0)
+
+    def test_unacknowledged_jobs_are_replayed_after_a_restart(self):
+        self.db.down = True
+
+        async def first_run():
+            writer = self.make_writer()
+            await writer.start()
+            ref = await writer.submit_round(1, 5, [], [])
+            await writer.submit_status(ref, RoundStatus.CANCELLED)
+            await writer.stop(timeout=0.05)
+            return ref
+
+        async def second_run():
+            writer = self.make_writer()
+            await writer.start()
+            await writer.drain()
+            await writer.stop()
+
+        ref = asyncio.run(first_run())
+        self.assertEqual(self.db.rows, [])
+
+        self.db.down = False
+        asyncio.run(second_run())
+
+        self.assertEqual(self.db.rows, [("round", ref), ("status", ref, "cancelled")])
+
+    def test_stale_ack_never_covers_new_jobs(self):
+        # Crash after the ack of job 1 was written but before the spool was truncated
+        with open(self.spool_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": "status", "ref": "old", "status": "completed", "seq": 1}) + "\n")
+            f.write(json.dumps({"ack": 1}) + "\n")
+        self.db.down = True
+
+        async def run(submit: bool):
+            writer = self.make_writer()
+            await writer.start()
+            ref = await writer.submit_round(1, 5, [], []) if submit else None
+            await writer.stop(timeout=0.05)
+            return ref
+
+        ref = asyncio.run(run(submit=True))
+        self.assertGreater(self.spool()[-1]["seq"], 1)
+
+        self.db.down = False
+        asyncio.run(run(submit=False))
+
+        self.assertEqual(self.db.rows, [("round", ref)])
+
+    def test_permanent_error_drops_only_its_job(self):
+        async def main():
+            writer = self.make_writer()
+            await writer.start()
+            writer._task.cancel()  # Hold the consumer so all three jobs form one batch
+            refs = [await writer.submit_round(1, 5, [], []) for _ in range(3)]
+            self.db.bad_refs.add(refs[1])
+            writer._task = asyncio.create_task(writer._run())
+            await writer.drain()
+            await writer.stop()
+            return refs
+
+        refs = asyncio.run(main())
+
+        self.assertEqual(self.db.rows, [("round", refs[0]), ("round", refs[2])])
+
+
+class TestRoundWriterReplay(unittest.TestCase):
+    """Replays against the real repository: a crash between a commit and its ack must not write anything twice."""
+
+    def setUp(self):
+        self.engine = sqlite_engine()
+        self.spool_path = os.path.join(tempfile.mkdtemp(), "spool.jsonl")
+
+    def replay(self, jobs):
+        with open(self.spool_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(job) + "\n" for job in jobs)
+
+        async def main():
+            writer = RoundWriter(lambda: SqliteSession(self.engine), self.spool_path, retry_delay=0.01)
+            await writer.start()
+            await writer.drain()
+            await writer.stop()
+
+        asyncio.run(main())
+
+        with Session(self.engine) as session:
+            meetings = session.execute(select(Meeting.round_id, Meeting.user_1_id, Meeting.user_2_id)).all()
+            counts = session.execute(select(PairLastMet.user_low, PairLastMet.user_high, PairLastMet.meet_count)).all()
+        return sorted(meetings), sorted(counts)
+
+    def test_replayed_jobs_are_written_once(self):
+        users = [[10, "a"], [11, "b"], [12, "c"], [13, "d"]]
+        round_job = {"kind": "round", "ref": "r1", "guild_id": 1, "duration_minutes": 5, "users": users}
+        jobs = [
+            {**round_job, "pairs": [[10, 11]], "seq": 1},
+            {"kind": "meetings", "ref": "r1", "users": users, "pairs": [[13, 12]], "seq": 2},
+            {"kind": "status", "ref": "r1", "status": "completed", "seq": 3},
+        ]
+
+        first = self.replay(jobs)
+        again = self.replay(jobs)  # The ack never made it to the spool
+
+        self.assertEqual(first, ([(1, 10, 11), (1, 13, 12)], [(10, 11, 1), (12, 13, 1)]))
+        self.assertEqual(again, first)
+
+    def test_late_writes_keep_the_time_of_the_round(self):
+        users = [[10, "a"], [11, "b"], [12, "c"], [13, "d"]]
+        first, second, rematch = [datetime(2026, 10, 1, 18, minute, tzinfo=timezone.utc) for minute in (0, 5, 7)]
+        round_job = {"kind": "round", "guild_id": 1, "duration_minutes": 5, "users": users}
+        # Both rounds and the rematch land in the same batch, long after they happened
+        self.replay(
+            [
+                {**round_job, "ref": "r1", "pairs": [[10, 11]], "started_at": first.timestamp(), "seq": 1},
+                {**round_job, "ref": "r2", "pairs": [[10, 12]], "started_at": second.timestamp(), "seq": 2},
+                {"kind": "meetings", "ref": "r2", "users": users, "pairs": [[11, 13]], "met_at": rematch.timestamp()}
+                | {"seq": 3},
+            ]
+        )
+
+        with Session(self.engine) as session:
+            started = session.execute(select(Round.ref, Round.started_at).order_by(Round.ref)).all()
+            last_met = session.execute(
+                select(PairLastMet.user_low, PairLastMet.user_high, PairLastMet.last_met_at)
+            ).all()
+
+        # SQLite drops the offset
+        self.assertEqual(
+            [(ref, at.replace(tzinfo=timezone.utc)) for ref, at in started], [("r1", first), ("r2", second)]
+        )
+        self.assertEqual(
+            {(low, high): at.replace(tzinfo=timezone.utc) for low, high, at in last_met},
+            {(10, 11): first, (10, 12): second, (11, 13): rematch},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()